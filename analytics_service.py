@@ -9,6 +9,7 @@ import base64
 from typing import Dict, List, Optional, Tuple
 import numpy as np
 from collections import defaultdict
+from operator import itemgetter
 import json
 
 logger = logging.getLogger(__name__)
@@ -595,19 +596,20 @@ class AnalyticsService:
                 except ValueError: return datetime.min 
             return val if isinstance(val,datetime) else datetime.min
 
-        valid_s = [s for s in sessions if s.get('session_date')]
-        sorted_valid_s = sorted(valid_s, key=get_date)
-        sorted_valid_s = [s for s in sorted_valid_s if get_date(s) != datetime.min]
+        # Parse each session date once, then sort on the parsed value.
+        parsed = [(get_date(s), s) for s in sessions if s.get('session_date')]
+        parsed = [p for p in parsed if p[0] != datetime.min]
+        parsed.sort(key=itemgetter(0))
+        dates = [p[0] for p in parsed]
 
-        if not sorted_valid_s: latest_s_obj=None; dates=[]
-        else: latest_s_obj=sorted_valid_s[-1]; dates=[get_date(s) for s in sorted_valid_s]
+        latest_s_obj = parsed[-1][1] if parsed else None
         
         duration=0
         if dates: duration=(dates[-1]-dates[0]).days
         
         emotion,intensity,latest_date_iso = 'N/A','N/A',None
         if latest_s_obj:
-            latest_date_iso = get_date(latest_s_obj).isoformat() if get_date(latest_s_obj) != datetime.min else None
+            latest_date_iso = dates[-1].isoformat()
             e_data=latest_s_obj.get('emotional_analysis',{}); 
             if isinstance(e_data,str): e_data=json.loads(e_data or '{}')
             if not isinstance(e_data,dict): e_data={}
@@ -637,8 +639,9 @@ class AnalyticsService:
             insights.append("Experiencing varied emotional states, which may indicate active processing or exploration.")
         
         if len(intensities) >= 3:
-            recent_avg = sum(intensities[-3:]) / 3 if len(intensities[-3:]) > 0 else 0
-            early_avg = sum(intensities[:3]) / 3 if len(intensities[:3]) > 0 else 0
+            intensity_arr = np.asarray(intensities, dtype=np.float64)
+            recent_avg = intensity_arr[-3:].mean()
+            early_avg = intensity_arr[:3].mean()
             
             if recent_avg < early_avg - 0.2: 
                 insights.append("Emotional intensity appears to be decreasing over recent sessions, potentially indicating progress in regulation.")
@@ -672,14 +675,14 @@ class AnalyticsService:
             logger.info("Not enough weekly data to identify intensity patterns.")
             return patterns
         
-        intensities = list(weekly_data.values())
+        intensities = np.fromiter(weekly_data.values(), dtype=np.float64, count=len(weekly_data))
         num_weeks = len(intensities)
         
         high_intensity_threshold = 0.7
         low_intensity_threshold = 0.3
 
-        high_weeks_count = sum(1 for intensity in intensities if intensity >= high_intensity_threshold)
-        low_weeks_count = sum(1 for intensity in intensities if intensity <= low_intensity_threshold)
+        high_weeks_count = int((intensities >= high_intensity_threshold).sum())
+        low_weeks_count = int((intensities <= low_intensity_threshold).sum())
 
         if high_weeks_count / num_weeks >= 0.3: 
             patterns.append("Recurring periods of high emotional intensity noted.")
@@ -692,8 +695,8 @@ class AnalyticsService:
             second_half_len = num_weeks - first_half_len
             
             if first_half_len > 0 and second_half_len > 0:
-                first_half_avg = sum(intensities[:first_half_len]) / first_half_len
-                second_half_avg = sum(intensities[first_half_len:]) / second_half_len
+                first_half_avg = intensities[:first_half_len].mean()
+                second_half_avg = intensities[first_half_len:].mean()
                 
                 if second_half_avg < first_half_avg - 0.15: 
                     patterns.append("Overall trend suggests a decrease in average emotional intensity over time.")
@@ -13,12 +13,6 @@ class DropboxService:
     def __init__(self):
         """Initialize Dropbox service with API token"""
         try:
-            # Force reload of environment variables
-            import os
-            from importlib import reload
-            import config
-            reload(config)
-
             self.access_token = os.environ.get('DROPBOX_ACCESS_TOKEN') or Config.DROPBOX_ACCESS_TOKEN
             self.monitor_folder = getattr(Config, 'DROPBOX_MONITOR_FOLDER', '/apps/otter')
 
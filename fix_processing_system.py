@@ -29,7 +29,7 @@ def process_files_efficiently():
         print(f'Already processed: {len(processed_paths)} files')
         
         # Get new files
-        new_files = dropbox_service.scan_for_new_files(list(processed_paths))
+        new_files = dropbox_service.scan_for_new_files(processed_paths)
         print(f'New files detected: {len(new_files)}')
         
         # Process only the most recent June 2025 files first
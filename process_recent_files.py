@@ -28,7 +28,7 @@ def process_recent_files():
         processed_paths = {t.dropbox_path for t in Transcript.query.all()}
         
         # Get new files
-        new_files = dropbox_service.scan_for_new_files(list(processed_paths))
+        new_files = dropbox_service.scan_for_new_files(processed_paths)
         
         # Focus on June 2025 files only
         june_files = [f for f in new_files if '6-2-2025' in f['name'] or '6-3-2025' in f['name']]
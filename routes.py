@@ -11,6 +11,7 @@ from services.email_summary_service import EmailSummaryService
 from services.manual_upload_service import ManualUploadService
 from services.enhanced_session_summary import EnhancedSessionSummaryService
 from sqlalchemy import func, or_, text, literal_column
+from sqlalchemy.orm import joinedload, load_only
 from datetime import datetime, timezone
 import logging
 import json
@@ -219,7 +220,7 @@ def manual_scan():
     try:
         if not dropbox_service:
             return make_error_response("Dropbox service not available", error_code="SERVICE_UNAVAILABLE", status_code=503)
-        processed_files = [t.dropbox_path for t in db.session.query(Transcript).all() if t.dropbox_path]
+        processed_files = {t.dropbox_path for t in db.session.query(Transcript).all() if t.dropbox_path}
         new_files = dropbox_service.scan_for_new_files(processed_files)
         new_files_data = [f.get('name', 'Unknown') for f in new_files] if new_files else []
 
@@ -261,19 +262,20 @@ def reprocess_transcript(transcript_id):
         # Perform comprehensive AI analysis using your clinical prompts
         from services.clinical_ai_service import ClinicalAIService
         clinical_ai_service = ClinicalAIService()
+        transcript_content = clinical_ai_service.trim_transcript(transcript.raw_content)
         
         # Run OpenAI analysis
-        openai_result = clinical_ai_service.analyze_with_openai(transcript.raw_content, client_name)
+        openai_result = clinical_ai_service.analyze_with_openai(transcript_content, client_name)
         if not openai_result.get('error'):
             transcript.openai_analysis = openai_result
         
         # Run Anthropic analysis
-        anthropic_result = clinical_ai_service.analyze_with_anthropic(transcript.raw_content, client_name)
+        anthropic_result = clinical_ai_service.analyze_with_anthropic(transcript_content, client_name)
         if not anthropic_result.get('error'):
             transcript.anthropic_analysis = anthropic_result
         
         # Run Gemini analysis
-        gemini_result = clinical_ai_service.analyze_with_gemini(transcript.raw_content, client_name)
+        gemini_result = clinical_ai_service.analyze_with_gemini(transcript_content, client_name)
         if not gemini_result.get('error'):
             transcript.gemini_analysis = gemini_result
         
@@ -343,7 +345,7 @@ def scan_dropbox():
     try:
         if not dropbox_service:
             return make_error_response("Dropbox service not available", error_code="SERVICE_UNAVAILABLE", status_code=503)
-        processed_files = [t.dropbox_path for t in db.session.query(Transcript).all() if t.dropbox_path]
+        processed_files = {t.dropbox_path for t in db.session.query(Transcript).all() if t.dropbox_path}
         new_files = dropbox_service.scan_for_new_files(processed_files)
         new_files_data = [f.get('name', 'Unknown') for f in new_files] if new_files else []
         return make_success_response(
@@ -554,7 +556,16 @@ def send_email_summary(transcript_id):
     # No changes needed for its core success/failure reporting mechanism.
     from services.email_summary_service import ServiceNotConfiguredError # Moved import here
     try:
-        transcript = db.session.get(Transcript, transcript_id)
+        # Only the columns the summary reads; raw_content can be hundreds of KB
+        transcript = db.session.execute(
+            db.select(Transcript)
+            .options(
+                load_only(Transcript.client_id, Transcript.session_date, Transcript.original_filename,
+                          Transcript.openai_analysis, Transcript.anthropic_analysis, Transcript.gemini_analysis),
+                joinedload(Transcript.client).load_only(Client.name),
+            )
+            .where(Transcript.id == transcript_id)
+        ).scalar_one_or_none()
         if not transcript:
             flash('Transcript not found', 'error')
             return redirect(url_for('dashboard'))
@@ -76,10 +76,10 @@ class BackgroundScheduler:
         try:
             with app.app_context():
                 # Get already processed files
-                processed_files = []
+                processed_files = set()
                 try:
                     transcripts = db.session.query(Transcript).all()
-                    processed_files = [t.dropbox_path for t in transcripts if t.dropbox_path]
+                    processed_files = {t.dropbox_path for t in transcripts if t.dropbox_path}
                 except Exception as e:
                     logger.error(f"Error getting processed files: {str(e)}")
                     return
@@ -90,9 +90,13 @@ class BackgroundScheduler:
                 if new_files and len(new_files) > 0:
                     logger.info(f"Found {len(new_files)} new files to process")
 
-                    for file_info in new_files[:5]:  # Process max 5 files at a time
+                    batch = new_files[:5]  # Process max 5 files at a time
+                    # Download the whole batch concurrently before processing
+                    downloads = dict(self.dropbox_service.download_files([file_info['path'] for file_info in batch]))
+
+                    for file_info in batch:
                         try:
-                            self._process_file(file_info)
+                            self._process_file(file_info, downloads.get(file_info['path']))
                         except Exception as e:
                             logger.error(f"Error processing file {file_info.get('name', 'unknown')}: {str(e)}")
                 else:
@@ -101,8 +105,8 @@ class BackgroundScheduler:
         except Exception as e:
             logger.error(f"Error checking for new files: {str(e)}")
 
-    def _process_file(self, file_info):
-        """Process a single file"""
+    def _process_file(self, file_info, file_content=None):
+        """Process a single file, downloading it unless file_content is given"""
         try:
             with app.app_context():
                 # Extract client name and session date from filename
@@ -127,7 +131,8 @@ class BackgroundScheduler:
 
                 # Download and extract file content
                 file_path = file_info.get('path', filename)
-                file_content = self.dropbox_service.download_file(file_path)
+                if file_content is None:
+                    file_content = self.dropbox_service.download_file(file_path)
 
                 if not file_content:
                     logger.error(f"Could not download file content for {filename}")
@@ -253,9 +258,10 @@ def process_new_files():
 
                     # Download file content if needed
                     if not transcript.raw_content and transcript.dropbox_path:
-                        file_content = dropbox_service.download_file(transcript.dropbox_path)
-                        if file_content:
-                            doc_result = doc_processor.process_document(file_content, transcript.original_filename)
+                        file_stream = dropbox_service.download_file_to_stream(transcript.dropbox_path)
+                        if file_stream:
+                            with file_stream:
+                                doc_result = doc_processor.process_document(file_stream, transcript.original_filename)
                             transcript.raw_content = doc_result.get('cleaned_content', '')
 
                     # Process with AI if we have content
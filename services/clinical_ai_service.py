@@ -3,6 +3,8 @@ Clinical AI Service - Implements specific therapeutic prompts for comprehensive
 """
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Optional, List
 import os
 from openai import OpenAI
@@ -11,6 +13,48 @@ import google.generativeai as genai
 
 logger = logging.getLogger(__name__)
 
+# Token budget for the transcript portion of each provider prompt
+TRANSCRIPT_TOKEN_BUDGET = 3500
+# Character cap used when tiktoken is not installed (the historical limit)
+FALLBACK_CHAR_BUDGET = 4000
+# Concurrent Gemini requests issued by analyze_with_gemini_batch
+GEMINI_BATCH_WORKERS = 4
+# Transcripts shorter than this (ignoring whitespace) are not sent to providers
+MIN_TRANSCRIPT_CHARS = 50
+ANALYSIS_KEYS = ('openai_analysis', 'anthropic_analysis', 'gemini_analysis')
+
+
+@lru_cache(maxsize=1)
+def _get_token_encoder():
+    """Load the tiktoken encoder once; None if tiktoken is unavailable"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except ImportError:
+        logger.info("tiktoken not available, trimming transcripts to %d characters", FALLBACK_CHAR_BUDGET)
+    except Exception as e:
+        logger.warning(f"Failed to load tiktoken encoding, falling back to character trimming: {e}")
+    return None
+
+
+def _has_sufficient_content(text: str) -> bool:
+    """Check whether a transcript is long enough to be worth analyzing"""
+    return bool(text) and len(text.strip()) >= MIN_TRANSCRIPT_CHARS
+
+
+def _trim_to_tokens(text: str, max_tokens: int = TRANSCRIPT_TOKEN_BUDGET) -> str:
+    """Trim text to at most max_tokens tokens, returning it unchanged if it already fits"""
+    if not text:
+        return ''
+    encoder = _get_token_encoder()
+    if encoder is None:
+        return text[:FALLBACK_CHAR_BUDGET]
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoder.decode(tokens[:max_tokens])
+
+
 class ClinicalAIService:
     """Advanced AI service implementing specific clinical prompts"""
     
@@ -85,10 +129,19 @@ class ClinicalAIService:
 
 Provide a clinically sophisticated analysis that demonstrates expert-level therapeutic reasoning and would meet the highest standards of professional documentation."""
 
+    def trim_transcript(self, transcript_content: str) -> str:
+        """Trim a transcript to the provider prompt token budget"""
+        return _trim_to_tokens(transcript_content)
+
     def analyze_with_openai(self, transcript_content: str, client_name: str = None) -> Dict:
-        """Analyze transcript using OpenAI with comprehensive clinical prompt"""
+        """Analyze transcript using OpenAI with comprehensive clinical prompt
+
+        Expects content already trimmed with trim_transcript().
+        """
         if not self.openai_client:
             return {"error": "OpenAI client not available"}
+        if not _has_sufficient_content(transcript_content):
+            return {"error": "insufficient_content"}
         
         try:
             prompt = self.get_comprehensive_clinical_prompt(client_name)
@@ -97,7 +150,7 @@ Provide a clinically sophisticated analysis that demonstrates expert-level thera
                 model="gpt-4o",  # Latest OpenAI model
                 messages=[
                     {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Please analyze this therapy session transcript:\n\n{transcript_content[:4000]}"}
+                    {"role": "user", "content": f"Please analyze this therapy session transcript:\n\n{transcript_content}"}
                 ],
                 max_tokens=3000,
                 temperature=0.3
@@ -120,9 +173,14 @@ Provide a clinically sophisticated analysis that demonstrates expert-level thera
             return {"error": f"OpenAI analysis failed: {str(e)}"}
 
     def analyze_with_anthropic(self, transcript_content: str, client_name: str = None) -> Dict:
-        """Analyze transcript using Anthropic with comprehensive clinical prompt"""
+        """Analyze transcript using Anthropic with comprehensive clinical prompt
+
+        Expects content already trimmed with trim_transcript().
+        """
         if not self.anthropic_client:
             return {"error": "Anthropic client not available"}
+        if not _has_sufficient_content(transcript_content):
+            return {"error": "insufficient_content"}
         
         try:
             prompt = self.get_comprehensive_clinical_prompt(client_name)
@@ -132,7 +190,7 @@ Provide a clinically sophisticated analysis that demonstrates expert-level thera
                 max_tokens=3000,
                 temperature=0.3,
                 messages=[
-                    {"role": "user", "content": f"{prompt}\n\nPlease analyze this therapy session transcript:\n\n{transcript_content[:4000]}"}
+                    {"role": "user", "content": f"{prompt}\n\nPlease analyze this therapy session transcript:\n\n{transcript_content}"}
                 ]
             )
             
@@ -153,15 +211,20 @@ Provide a clinically sophisticated analysis that demonstrates expert-level thera
             return {"error": f"Anthropic analysis failed: {str(e)}"}
 
     def analyze_with_gemini(self, transcript_content: str, client_name: str = None) -> Dict:
-        """Analyze transcript using Gemini with comprehensive clinical prompt"""
+        """Analyze transcript using Gemini with comprehensive clinical prompt
+
+        Expects content already trimmed with trim_transcript().
+        """
         if not self.gemini_client:
             return {"error": "Gemini client not available"}
+        if not _has_sufficient_content(transcript_content):
+            return {"error": "insufficient_content"}
         
         try:
             prompt = self.get_comprehensive_clinical_prompt(client_name)
             
             response = self.gemini_client.generate_content(
-                f"{prompt}\n\nPlease analyze this therapy session transcript:\n\n{transcript_content[:4000]}"
+                f"{prompt}\n\nPlease analyze this therapy session transcript:\n\n{transcript_content}"
             )
             
             analysis = response.text
@@ -180,11 +243,32 @@ Provide a clinically sophisticated analysis that demonstrates expert-level thera
             logger.error(f"Gemini analysis error: {e}")
             return {"error": f"Gemini analysis failed: {str(e)}"}
 
+    def analyze_with_gemini_batch(self, contents: List[str], client_names: List[str]) -> List[Dict]:
+        """Analyze several transcripts with Gemini, overlapping the request round-trips
+
+        Expects contents already trimmed with trim_transcript(). Results are
+        returned in the same order as contents.
+        """
+        if not self.gemini_client:
+            return [{"error": "Gemini client not available"} for _ in contents]
+        if len(contents) <= 1:
+            return [self.analyze_with_gemini(c, n) for c, n in zip(contents, client_names)]
+
+        workers = min(GEMINI_BATCH_WORKERS, len(contents))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.analyze_with_gemini, contents, client_names))
+
     def complete_analysis_for_transcript(self, transcript_data: Dict) -> Dict:
         """Complete comprehensive analysis for a single transcript"""
         results = {}
         client_name = transcript_data.get('client_name', 'Client')
-        content = transcript_data.get('raw_content', '')
+        raw_content = transcript_data.get('raw_content', '')
+        if not _has_sufficient_content(raw_content):
+            return {key: {"error": "insufficient_content"} for key in ANALYSIS_KEYS
+                    if not transcript_data.get(key)}
+
+        # Trim once and share the prefix across all three providers
+        content = self.trim_transcript(raw_content)
         
         # OpenAI Analysis
         if not transcript_data.get('openai_analysis'):
@@ -203,6 +287,45 @@ Provide a clinically sophisticated analysis that demonstrates expert-level thera
         
         return results
 
+    def complete_analysis_batch(self, transcripts: List[Dict]) -> List[Dict]:
+        """Complete comprehensive analysis for several transcripts
+
+        OpenAI and Anthropic run per transcript; Gemini requests for the whole
+        batch are issued together via analyze_with_gemini_batch.
+        """
+        batch_results = []
+        gemini_indexes, gemini_contents, gemini_names = [], [], []
+
+        for index, transcript_data in enumerate(transcripts):
+            raw_content = transcript_data.get('raw_content', '')
+            if not _has_sufficient_content(raw_content):
+                batch_results.append({key: {"error": "insufficient_content"} for key in ANALYSIS_KEYS
+                                      if not transcript_data.get(key)})
+                continue
+
+            results = {}
+            client_name = transcript_data.get('client_name', 'Client')
+            content = self.trim_transcript(raw_content)
+
+            if not transcript_data.get('openai_analysis'):
+                results['openai_analysis'] = self.analyze_with_openai(content, client_name)
+
+            if not transcript_data.get('anthropic_analysis'):
+                results['anthropic_analysis'] = self.analyze_with_anthropic(content, client_name)
+
+            if not transcript_data.get('gemini_analysis'):
+                gemini_indexes.append(index)
+                gemini_contents.append(content)
+                gemini_names.append(client_name)
+
+            batch_results.append(results)
+
+        gemini_results = self.analyze_with_gemini_batch(gemini_contents, gemini_names)
+        for index, gemini_result in zip(gemini_indexes, gemini_results):
+            batch_results[index]['gemini_analysis'] = gemini_result
+
+        return batch_results
+
     def extract_themes_from_analysis(self, analysis_data: Dict) -> List[str]:
         """Extract key themes from AI analysis"""
         themes = []
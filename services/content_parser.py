@@ -4,40 +4,99 @@ Content parsing service for extracting client names and dates from transcripts
 
 import re
 import logging
+import string
 from datetime import datetime, date
 from typing import Dict, Optional, Tuple
-import dateutil.parser
 
 logger = logging.getLogger(__name__)
 
+# Common name patterns in therapy transcripts
+NAME_PATTERNS = tuple(
+    re.compile(p, re.IGNORECASE | re.MULTILINE) for p in (
+        r"Client[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+        r"Patient[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+        r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)[:\s]+(?:I|My|The|Today)",
+        r"Session with[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+        r"Therapy session[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+        r"Progress note for[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+        r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)'s therapy session",
+        r"Comprehensive Clinical Progress Note for[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)'s",
+    )
+)
+
+# Date patterns for various formats
+DATE_PATTERN_SOURCES = (
+    r"(\d{4}-\d{2}-\d{2})",  # YYYY-MM-DD
+    r"(\d{2}/\d{2}/\d{4})",  # MM/DD/YYYY
+    r"(\d{2}-\d{2}-\d{4})",  # MM-DD-YYYY
+    r"(\d{1,2}/\d{1,2}/\d{4})",  # M/D/YYYY
+    r"(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}",
+    r"(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4}",
+    r"Session on[:\s]+([^.\n]+)",
+    r"Date[:\s]+([^.\n]+)",
+    r"Therapy Session on[:\s]+([^.\n]+)",
+)
+# strptime format for each date pattern's captured text; None goes through dateutil
+DATE_PATTERN_FORMATS = (
+    '%Y-%m-%d',
+    '%m/%d/%Y',
+    '%m-%d-%Y',
+    '%m/%d/%Y',
+    None,
+    None,
+    None,
+    None,
+    None,
+)
+ISO_DATE_FORMAT = '%Y-%m-%d'
+# Content is searched case-insensitively, filenames case-sensitively
+DATE_PATTERNS = tuple(re.compile(p, re.IGNORECASE | re.MULTILINE) for p in DATE_PATTERN_SOURCES)
+FILENAME_DATE_PATTERNS = tuple(re.compile(p) for p in DATE_PATTERN_SOURCES)
+
+
+# Client names and session dates almost always sit in the transcript header
+HEADER_WINDOW = 4096
+
+
+def _header(text: str) -> str:
+    """Return the leading HEADER_WINDOW characters, cut back to a line boundary"""
+    if len(text) <= HEADER_WINDOW:
+        return text
+    head = text[:HEADER_WINDOW]
+    return head.rpartition('\n')[0] or head
+
+
+# Common filename patterns: "ClientName_YYYY-MM-DD", "YYYY-MM-DD_ClientName", etc.
+# (pattern, date_first) pairs tried in priority order; every one needs an
+# ISO date, so filenames without one skip the loop entirely
+FILENAME_PATTERNS = tuple(
+    (re.compile(p), date_first) for p, date_first in (
+        (r"([A-Z][a-z]+(?:_[A-Z][a-z]+)*)[_\s-]+(\d{4}-\d{2}-\d{2})", False),
+        (r"(\d{4}-\d{2}-\d{2})[_\s-]+([A-Z][a-z]+(?:_[A-Z][a-z]+)*)", True),
+        (r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)[_\s-]+(\d{4}-\d{2}-\d{2})", False),
+        (r"(\d{4}-\d{2}-\d{2})[_\s-]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)", True),
+    )
+)
+FILENAME_NAME_PATTERN = re.compile(r'([A-Z][a-z]+(?:[_\s][A-Z][a-z]+)*)')
+ISO_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+NAME_CHARACTERS = frozenset(string.ascii_letters + string.whitespace + "'-")
+
+# Common therapy-related words that might be capitalized
+EXCLUDED_NAME_WORDS = frozenset({
+    'Therapist', 'Client', 'Patient', 'Session', 'Today', 'The', 'This',
+    'Therapy', 'Treatment', 'Progress', 'Note', 'Assessment', 'Plan',
+    'Objective', 'Subjective', 'Clinical', 'Comprehensive', 'Analysis'
+})
+
 class ContentParser:
     """Service for parsing client information and dates from transcript content"""
+
+    # Stateless: instances carry no per-object attributes
+    __slots__ = ()
     
-    def __init__(self):
-        # Common name patterns in therapy transcripts
-        self.name_patterns = [
-            r"Client[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-            r"Patient[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-            r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)[:\s]+(?:I|My|The|Today)",
-            r"Session with[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-            r"Therapy session[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-            r"Progress note for[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-            r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)'s therapy session",
-            r"Comprehensive Clinical Progress Note for[:\s]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)'s",
-        ]
-        
-        # Date patterns for various formats
-        self.date_patterns = [
-            r"(\d{4}-\d{2}-\d{2})",  # YYYY-MM-DD
-            r"(\d{2}/\d{2}/\d{4})",  # MM/DD/YYYY
-            r"(\d{2}-\d{2}-\d{4})",  # MM-DD-YYYY
-            r"(\d{1,2}/\d{1,2}/\d{4})",  # M/D/YYYY
-            r"(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}",
-            r"(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4}",
-            r"Session on[:\s]+([^.\n]+)",
-            r"Date[:\s]+([^.\n]+)",
-            r"Therapy Session on[:\s]+([^.\n]+)",
-        ]
+    # Compiled once at import and shared by every instance
+    name_patterns = NAME_PATTERNS
+    date_patterns = DATE_PATTERNS
     
     def extract_client_and_date_from_filename(self, filename: str) -> Tuple[Optional[str], Optional[date]]:
         """Extract client name and date from filename"""
@@ -47,39 +106,28 @@ class ContentParser:
         # Remove file extension
         name_part = filename.rsplit('.', 1)[0] if '.' in filename else filename
         
-        # Common filename patterns: "ClientName_YYYY-MM-DD", "YYYY-MM-DD_ClientName", etc.
-        patterns = [
-            r"([A-Z][a-z]+(?:_[A-Z][a-z]+)*)[_\s-]+(\d{4}-\d{2}-\d{2})",
-            r"(\d{4}-\d{2}-\d{2})[_\s-]+([A-Z][a-z]+(?:_[A-Z][a-z]+)*)",
-            r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)[_\s-]+(\d{4}-\d{2}-\d{2})",
-            r"(\d{4}-\d{2}-\d{2})[_\s-]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, name_part)
-            if match:
-                part1, part2 = match.groups()
-                # Determine which part is the name and which is the date
-                if re.match(r'\d{4}-\d{2}-\d{2}', part1):
-                    session_date = self._parse_date(part1)
-                    client_name = part2.replace('_', ' ')
-                elif re.match(r'\d{4}-\d{2}-\d{2}', part2):
-                    client_name = part1.replace('_', ' ')
-                    session_date = self._parse_date(part2)
-                break
+        if ISO_DATE_PATTERN.search(name_part):
+            for pattern, date_first in FILENAME_PATTERNS:
+                match = pattern.search(name_part)
+                if match:
+                    # The pattern itself says which group is the date
+                    name_str, date_str = match.groups()[::-1] if date_first else match.groups()
+                    client_name = name_str.replace('_', ' ')
+                    session_date = self._parse_date(date_str, ISO_DATE_FORMAT)
+                    break
         
         # If no structured pattern, try to extract any date and name separately
         if not client_name or not session_date:
             # Look for dates in filename
-            for pattern in self.date_patterns:
-                match = re.search(pattern, name_part)
+            for pattern, date_format in zip(FILENAME_DATE_PATTERNS, DATE_PATTERN_FORMATS):
+                match = pattern.search(name_part)
                 if match and not session_date:
-                    session_date = self._parse_date(match.group(1))
+                    session_date = self._parse_date(match.group(1), date_format)
                     break
             
             # Look for potential names (capitalized words)
             if not client_name:
-                name_match = re.search(r'([A-Z][a-z]+(?:[_\s][A-Z][a-z]+)*)', name_part)
+                name_match = FILENAME_NAME_PATTERN.search(name_part)
                 if name_match:
                     client_name = name_match.group(1).replace('_', ' ')
         
@@ -87,66 +135,76 @@ class ContentParser:
     
     def extract_client_and_date_from_content(self, content: str) -> Tuple[Optional[str], Optional[date]]:
         """Extract client name and date from transcript content"""
-        client_name = None
-        session_date = None
+        # Scan the header first and only fall back to the full transcript
+        head = _header(content)
+        client_name = self._find_client_name(head)
+        session_date = self._find_session_date(head)
+        
+        if len(head) < len(content):
+            if client_name is None:
+                client_name = self._find_client_name(content)
+            if session_date is None:
+                session_date = self._find_session_date(content)
         
-        # Look for client name in content
+        return client_name, session_date
+    
+    def _find_client_name(self, text: str) -> Optional[str]:
+        """Return the first valid client name matched in text"""
         for pattern in self.name_patterns:
-            match = re.search(pattern, content, re.IGNORECASE | re.MULTILINE)
+            match = pattern.search(text)
             if match:
                 potential_name = match.group(1).strip()
                 # Validate it looks like a real name (not common words)
                 if self._is_valid_name(potential_name):
-                    client_name = potential_name
-                    break
-        
-        # Look for session date in content
-        for pattern in self.date_patterns:
-            match = re.search(pattern, content, re.IGNORECASE | re.MULTILINE)
+                    return potential_name
+        return None
+    
+    def _find_session_date(self, text: str) -> Optional[date]:
+        """Return the first parseable session date matched in text"""
+        for pattern, date_format in zip(self.date_patterns, DATE_PATTERN_FORMATS):
+            match = pattern.search(text)
             if match:
                 date_str = match.group(1) if match.groups() else match.group(0)
-                session_date = self._parse_date(date_str)
+                session_date = self._parse_date(date_str, date_format)
                 if session_date:
-                    break
-        
-        return client_name, session_date
+                    return session_date
+        return None
     
     def _is_valid_name(self, name: str) -> bool:
         """Validate if a string looks like a person's name"""
-        if not name or len(name) < 2:
+        # Should be at least two characters and start with a capital letter
+        if not name or len(name) < 2 or not name[0].isupper():
             return False
         
-        # Exclude common therapy-related words that might be capitalized
-        excluded_words = {
-            'Therapist', 'Client', 'Patient', 'Session', 'Today', 'The', 'This', 
-            'Therapy', 'Treatment', 'Progress', 'Note', 'Assessment', 'Plan',
-            'Objective', 'Subjective', 'Clinical', 'Comprehensive', 'Analysis'
-        }
-        
-        words = name.split()
-        for word in words:
-            if word in excluded_words:
-                return False
-        
         # Must contain only letters, spaces, and common name characters
-        if not re.match(r'^[A-Za-z\s\'-]+$', name):
+        if not NAME_CHARACTERS.issuperset(name):
             return False
         
-        # Should start with capital letter
-        if not name[0].isupper():
-            return False
-        
-        return True
+        # Exclude common therapy-related words that might be capitalized
+        return EXCLUDED_NAME_WORDS.isdisjoint(name.split())
     
-    def _parse_date(self, date_str: str) -> Optional[date]:
-        """Parse various date formats into a date object"""
+    def _parse_date(self, date_str: str, date_format: Optional[str] = None) -> Optional[date]:
+        """Parse various date formats into a date object
+
+        date_format is the exact strptime format when the matching pattern
+        already determines it; dateutil handles everything else.
+        """
         if not date_str:
             return None
         
+        # Clean up the date string
+        date_str = date_str.strip()
+        
+        if date_format:
+            try:
+                return datetime.strptime(date_str, date_format).date()
+            except ValueError:
+                pass
+        
+        # Imported on first use; the strptime path above never needs it
+        import dateutil.parser
+        
         try:
-            # Clean up the date string
-            date_str = date_str.strip()
-            
             # Try parsing with dateutil (handles most formats)
             parsed_date = dateutil.parser.parse(date_str, fuzzy=True)
             return parsed_date.date()
@@ -1,17 +1,244 @@
+import codecs
 import os
 import logging
 import io
-from typing import Dict, Optional, Tuple
-import PyPDF2
-import docx
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
 from datetime import datetime
 import re
 
 logger = logging.getLogger(__name__)
 
+# PDFs with at least this many pages are extracted on a thread pool
+PDF_PARALLEL_MIN_PAGES = 8
+PDF_EXTRACT_WORKERS = 4
+
+# Leading bytes inspected when guessing a BOM-less UTF-16 file
+UTF16_SNIFF_BYTES = 64
+
+# Text files are decoded from their stream in chunks of this size
+TEXT_DECODE_CHUNK_BYTES = 64 * 1024
+
+# Session dates and client identifiers almost always sit in the transcript header
+HEADER_WINDOW = 4096
+
+# Page markers may contain any whitespace run, since whitespace is collapsed
+# in the same pass
+CLEAN_TEXT_PATTERN = re.compile(r'(---\s+Page\s+\d+\s+---)|(\s+)')
+
+
+def _clean_replacement(match) -> str:
+    """Drop page markers and collapse whitespace runs to a single space"""
+    return '' if match.lastindex == 1 else ' '
+
+
+class _PrintableTable(dict):
+    """str.translate table that drops non-printable characters, built lazily per code point"""
+
+    def __init__(self, code_points=()):
+        super().__init__()
+        for code_point in code_points:
+            self.__missing__(code_point)
+
+    def __missing__(self, code_point: int):
+        char = chr(code_point)
+        value = code_point if char.isprintable() or char in '\n\t' else None
+        self[code_point] = value
+        return value
+
+
+# ASCII, including the C0 controls, is filled in up front; other code points
+# are added the first time they are seen
+PRINTABLE_TABLE = _PrintableTable(range(128))
+
+# Common date patterns in therapy transcripts
+SESSION_DATE_PATTERNS = tuple(
+    re.compile(p, re.IGNORECASE) for p in (
+        r'(?:Session|Date|Meeting):\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+        r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+        r'(\w+\s+\d{1,2},?\s+\d{4})',  # "January 15, 2024"
+        r'(\d{4}-\d{2}-\d{2})',  # ISO format
+    )
+)
+
+SESSION_DATE_FORMATS = (
+    '%m/%d/%Y', '%m-%d-%Y', '%m/%d/%y', '%m-%d-%y',
+    '%B %d, %Y', '%B %d %Y', '%Y-%m-%d',
+)
+
+CLIENT_ID_PATTERNS = tuple(
+    re.compile(p, re.IGNORECASE) for p in (
+        r'(?:Client|Patient):\s*([A-Za-z\s]+)',
+        r'(?:Name|Client ID):\s*([A-Za-z0-9\s]+)',
+    )
+)
+
+# Therapy-related keywords scanned for in validate_content
+THERAPY_KEYWORDS = (
+    'session', 'therapy', 'therapist', 'client', 'patient', 'counseling',
+    'feelings', 'thoughts', 'emotions', 'discussion', 'talk', 'share'
+)
+THERAPY_KEYWORD_THRESHOLD = 3
+# One pass over the text; the lookahead reports overlapping keyword hits too
+THERAPY_KEYWORD_PATTERN = re.compile(
+    '(?=(' + '|'.join(re.escape(k) for k in sorted(THERAPY_KEYWORDS, key=len, reverse=True)) + '))',
+    re.IGNORECASE
+)
+
+DIALOGUE_PATTERNS = (
+    r'\b(therapist|counselor|doctor):\s',
+    r'\b(client|patient):\s',
+    r'\b(t:|c:|p:)\s',
+    r'"[^"]*"',  # Quoted speech
+)
+DIALOGUE_THRESHOLD = 2
+# Each pattern sits in a named lookahead so matches never consume text another
+# pattern could start in; match.lastgroup names the pattern that matched
+DIALOGUE_PATTERN = re.compile(
+    '|'.join(f'(?=(?P<dialogue{n}>{p}))' for n, p in enumerate(DIALOGUE_PATTERNS)),
+    re.IGNORECASE
+)
+
+TIME_PATTERNS = (
+    r'\d{1,2}:\d{2}',  # Time stamps
+    r'(?:beginning|middle|end) of session',
+    r'(?:minutes|hour) into',
+)
+TIME_PATTERN = re.compile('|'.join(TIME_PATTERNS), re.IGNORECASE)
+
+def _header(text: str) -> str:
+    """Return the leading HEADER_WINDOW characters, cut back to a line boundary"""
+    if len(text) <= HEADER_WINDOW:
+        return text
+    head = text[:HEADER_WINDOW]
+    return head.rpartition('\n')[0] or head
+
+
+def _extract_pdf_page(pdf_reader, page_num: int) -> Optional[str]:
+    """Extract one page's text, logging and skipping pages that fail"""
+    try:
+        return pdf_reader.pages[page_num].extract_text()
+    except Exception as e:
+        logger.warning(f"Error extracting text from PDF page {page_num + 1}: {str(e)}")
+        return None
+
+
+def _as_stream(file_content: Union[bytes, BinaryIO]) -> BinaryIO:
+    """Wrap raw bytes in a stream; file objects are rewound and used as-is"""
+    if isinstance(file_content, (bytes, bytearray)):
+        return io.BytesIO(file_content)
+    file_content.seek(0)
+    return file_content
+
+
+def _extract_pdf_pages_parallel(file_content: bytes, page_count: int) -> List[Optional[str]]:
+    """Extract page texts on a thread pool, in page order
+
+    PdfReader seeks a shared stream while resolving objects, so each worker
+    thread parses the document with its own reader.
+    """
+    import PyPDF2
+
+    local = threading.local()
+
+    def extract(page_num: int) -> Optional[str]:
+        reader = getattr(local, 'reader', None)
+        if reader is None:
+            reader = local.reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+        return _extract_pdf_page(reader, page_num)
+
+    with ThreadPoolExecutor(max_workers=min(PDF_EXTRACT_WORKERS, page_count)) as executor:
+        return list(executor.map(extract, range(page_count)))
+
+
+def _read_decoded(stream: BinaryIO, encoding: str, errors: str = 'strict') -> str:
+    """Decode a stream from its current position in TEXT_DECODE_CHUNK_BYTES chunks"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    parts = [decoder.decode(chunk) for chunk in iter(lambda: stream.read(TEXT_DECODE_CHUNK_BYTES), b'')]
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
+
+def _decode_text(stream: BinaryIO) -> Tuple[str, str]:
+    """Decode a text stream, picking the encoding from the BOM or leading bytes
+
+    Returns the decoded text and the encoding used. At most one strict UTF-8
+    pass is made before settling on a single replacing decode.
+    """
+    start = stream.tell()
+    head = stream.read(UTF16_SNIFF_BYTES)
+    stream.seek(start)
+
+    if head.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    elif head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = 'utf-16'
+    else:
+        try:
+            return _read_decoded(stream, 'utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            stream.seek(start)
+        # BOM-less UTF-16 shows up as NUL bytes in most odd or even positions
+        half = len(head) // 2
+        if half and head[1::2].count(0) * 2 >= half:
+            encoding = 'utf-16-le'
+        elif half and head[0::2].count(0) * 2 >= half:
+            encoding = 'utf-16-be'
+        else:
+            encoding = 'cp1252'
+    return _read_decoded(stream, encoding, errors='replace'), encoding
+
+
+class ProcessedDocument(Mapping):
+    """Read-only result of process_document
+
+    Behaves like the result dict callers already use. Fields given as lazy
+    factories (cleaned content, word count, session date) are computed on
+    first access and then stored, so callers that only need raw_content skip
+    those passes over the text. Safe to read from several threads; each
+    lazy field is computed once.
+
+    It is not a dict: callers must not assign to it or pass it to
+    json.dumps. Use to_dict() for a plain dict of every field.
+    """
+
+    __slots__ = ('_values', '_lazy', '_keys', '_lock')
+
+    def __init__(self, values: Dict[str, Any], lazy: Dict[str, Callable[[], Any]]):
+        self._values = values
+        self._lazy = lazy
+        self._keys = tuple(values) + tuple(lazy)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        with self._lock:
+            # Another thread may have filled the field while this one waited;
+            # unknown keys raise KeyError from the pop
+            if key not in self._values:
+                self._values[key] = self._lazy.pop(key)()
+            return self._values[key]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self._keys}
+
+
 class DocumentProcessor:
     """Service for processing different document types"""
 
+    __slots__ = ('supported_types',)
+
     def __init__(self):
         self.supported_types = {
             '.pdf': self._process_pdf,
@@ -19,8 +246,14 @@ class DocumentProcessor:
             '.docx': self._process_docx
         }
 
-    def process_document(self, file_content: bytes, filename: str) -> Dict:
-        """Process a document and extract text content"""
+    def process_document(self, file_content: Union[bytes, BinaryIO], filename: str) -> ProcessedDocument:
+        """Process a document and extract text content
+
+        Accepts the raw file bytes or a seekable binary file object, such as the
+        spooled file returned by DropboxService.download_file_to_stream.
+        Returns a read-only ProcessedDocument; call to_dict() on it before
+        modifying or serializing the result.
+        """
         try:
             file_ext = os.path.splitext(filename)[1].lower()
 
@@ -31,46 +264,58 @@ class DocumentProcessor:
             processor = self.supported_types[file_ext]
             text_content = processor(file_content)
 
-            if not text_content or len(text_content.strip()) == 0:
+            if not text_content or text_content.isspace():
                 raise ValueError("No text content extracted from document")
 
-            # Extract metadata and clean content
-            processed_data = {
-                'raw_content': text_content,
-                'cleaned_content': self._clean_text(text_content),
-                'word_count': len(text_content.split()),
-                'character_count': len(text_content),
-                'file_type': file_ext[1:],  # Remove the dot
-                'extracted_date': self._extract_session_date(text_content),
-                'processing_metadata': {
-                    'processed_at': datetime.utcnow().isoformat(),
-                    'processor_version': '1.0',
-                    'extraction_method': file_ext[1:]
+            # Cleaning, word counting and date extraction each walk the whole
+            # text, so they only run for callers that read those fields
+            processed_data = ProcessedDocument(
+                {
+                    'raw_content': text_content,
+                    'character_count': len(text_content),
+                    'file_type': file_ext[1:],  # Remove the dot
+                    'processing_metadata': {
+                        'processed_at': datetime.utcnow().isoformat(),
+                        'processor_version': '1.0',
+                        'extraction_method': file_ext[1:]
+                    }
+                },
+                {
+                    'cleaned_content': lambda: self._clean_text(text_content),
+                    'word_count': lambda: len(text_content.split()),
+                    'extracted_date': lambda: self._extract_session_date(text_content),
                 }
-            }
+            )
 
-            logger.info(f"Successfully processed {filename}: {processed_data['word_count']} words extracted")
+            logger.info(f"Successfully processed {filename}: {processed_data['character_count']} characters extracted")
             return processed_data
 
         except Exception as e:
             logger.error(f"Error processing document {filename}: {str(e)}")
             raise
 
-    def _process_pdf(self, file_content: bytes) -> str:
+    def _process_pdf(self, file_content: Union[bytes, BinaryIO]) -> str:
         """Extract text from PDF file"""
+        import PyPDF2
+
         try:
-            pdf_file = io.BytesIO(file_content)
+            pdf_file = _as_stream(file_content)
             pdf_reader = PyPDF2.PdfReader(pdf_file)
-
-            text_content = ""
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content += f"\n--- Page {page_num + 1} ---\n{page_text}"
-                except Exception as e:
-                    logger.warning(f"Error extracting text from PDF page {page_num + 1}: {str(e)}")
-                    continue
+            page_count = len(pdf_reader.pages)
+
+            if page_count >= PDF_PARALLEL_MIN_PAGES:
+                # Worker threads each need their own reader over the raw bytes
+                if not isinstance(file_content, (bytes, bytearray)):
+                    pdf_file.seek(0)
+                    file_content = pdf_file.read()
+                page_texts = _extract_pdf_pages_parallel(file_content, page_count)
+            else:
+                page_texts = [_extract_pdf_page(pdf_reader, page_num) for page_num in range(page_count)]
+
+            text_content = "".join(
+                f"\n--- Page {page_num + 1} ---\n{page_text}"
+                for page_num, page_text in enumerate(page_texts) if page_text
+            )
 
             if not text_content.strip():
                 raise ValueError("No text could be extracted from PDF")
@@ -81,46 +326,42 @@ class DocumentProcessor:
             logger.error(f"Error processing PDF: {str(e)}")
             raise
 
-    def _process_txt(self, file_content: bytes) -> str:
+    def _process_txt(self, file_content: Union[bytes, BinaryIO]) -> str:
         """Extract text from TXT file"""
         try:
-            # Try different encodings
-            encodings = ['utf-8', 'utf-16', 'latin-1', 'cp1252']
-
-            for encoding in encodings:
-                try:
-                    text_content = file_content.decode(encoding)
-                    logger.info(f"Successfully decoded TXT file using {encoding} encoding")
-                    return text_content
-                except UnicodeDecodeError:
-                    continue
-
-            raise ValueError("Could not decode text file with any supported encoding")
+            text_content, encoding = _decode_text(_as_stream(file_content))
+            logger.info(f"Successfully decoded TXT file using {encoding} encoding")
+            return text_content
 
         except Exception as e:
             logger.error(f"Error processing TXT file: {str(e)}")
             raise
 
-    def _process_docx(self, file_content: bytes) -> str:
+    def _process_docx(self, file_content: Union[bytes, BinaryIO]) -> str:
         """Extract text from DOCX file"""
+        import docx
+
         try:
-            docx_file = io.BytesIO(file_content)
-            doc = docx.Document(docx_file)
+            doc = docx.Document(_as_stream(file_content))
 
-            text_content = ""
+            chunks = []
 
             # Extract text from paragraphs
             for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_content += paragraph.text + "\n"
+                paragraph_text = paragraph.text
+                if paragraph_text.strip():
+                    chunks.append(paragraph_text + "\n")
 
             # Extract text from tables
             for table in doc.tables:
                 for row in table.rows:
                     for cell in row.cells:
-                        if cell.text.strip():
-                            text_content += cell.text + " "
-                    text_content += "\n"
+                        cell_text = cell.text
+                        if cell_text.strip():
+                            chunks.append(cell_text + " ")
+                    chunks.append("\n")
+
+            text_content = "".join(chunks)
 
             if not text_content.strip():
                 raise ValueError("No text could be extracted from DOCX file")
@@ -136,46 +377,25 @@ class DocumentProcessor:
         if not text:
             return ""
 
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-
-        # Remove page markers
-        text = re.sub(r'--- Page \d+ ---', '', text)
+        # Collapse whitespace and remove page markers in one pass. Newlines are
+        # collapsed too, so no separate line-ending cleanup is needed.
+        text = CLEAN_TEXT_PATTERN.sub(_clean_replacement, text)
 
         # Remove non-printable characters except newlines and tabs
-        text = ''.join(char for char in text if char.isprintable() or char in '\n\t')
-
-        # Normalize line endings
-        text = text.replace('\r\n', '\n').replace('\r', '\n')
-
-        # Remove excessive newlines
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = text.translate(PRINTABLE_TABLE)
 
         return text.strip()
 
     def _extract_session_date(self, text: str) -> Optional[datetime]:
         """Extract session date from text content"""
         try:
-            # Common date patterns in therapy transcripts
-            date_patterns = [
-                r'(?:Session|Date|Meeting):\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-                r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-                r'(\w+\s+\d{1,2},?\s+\d{4})',  # "January 15, 2024"
-                r'(\d{4}-\d{2}-\d{2})',  # ISO format
-            ]
-
-            for pattern in date_patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                if matches:
-                    date_str = matches[0]
-
-                    # Try to parse the date
-                    for date_format in ['%m/%d/%Y', '%m-%d-%Y', '%m/%d/%y', '%m-%d-%y', 
-                                       '%B %d, %Y', '%B %d %Y', '%Y-%m-%d']:
-                        try:
-                            return datetime.strptime(date_str, date_format)
-                        except ValueError:
-                            continue
+            # Scan the header first and only fall back to the full text
+            head = _header(text)
+            session_date = self._find_session_date(head)
+            if session_date is None and len(head) < len(text):
+                session_date = self._find_session_date(text)
+            if session_date is not None:
+                return session_date
 
             logger.info("No recognizable date found in document")
             return None
@@ -184,6 +404,31 @@ class DocumentProcessor:
             logger.warning(f"Error extracting session date: {str(e)}")
             return None
 
+    def _find_session_date(self, text: str) -> Optional[datetime]:
+        """Return the first parseable session date matched in text"""
+        for pattern in SESSION_DATE_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                date_str = match.group(1)
+
+                # Try to parse the date
+                for date_format in SESSION_DATE_FORMATS:
+                    try:
+                        return datetime.strptime(date_str, date_format)
+                    except ValueError:
+                        continue
+        return None
+
+    def _find_client_identifier(self, text: str) -> Optional[str]:
+        """Return the first client identifier matched in text"""
+        for pattern in CLIENT_ID_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                client_id = match.group(1).strip()
+                if len(client_id) > 2:
+                    return client_id
+        return None
+
     def extract_client_identifier(self, text: str, filename: str) -> Optional[str]:
         """Extract client identifier from text or filename"""
         try:
@@ -195,18 +440,13 @@ class DocumentProcessor:
                 if potential_id and len(potential_id) > 2:
                     return potential_id
 
-            # Try to extract from text content
-            client_patterns = [
-                r'(?:Client|Patient):\s*([A-Za-z\s]+)',
-                r'(?:Name|Client ID):\s*([A-Za-z0-9\s]+)',
-            ]
-
-            for pattern in client_patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                if matches:
-                    client_id = matches[0].strip()
-                    if len(client_id) > 2:
-                        return client_id
+            # Try to extract from text content, header first
+            head = _header(text)
+            client_id = self._find_client_identifier(head)
+            if client_id is None and len(head) < len(text):
+                client_id = self._find_client_identifier(text)
+            if client_id is not None:
+                return client_id
 
             # Fallback: use filename without extension
             return os.path.splitext(filename)[0]
@@ -215,6 +455,24 @@ class DocumentProcessor:
             logger.warning(f"Error extracting client identifier: {str(e)}")
             return os.path.splitext(filename)[0]
 
+    def _count_therapy_keywords(self, text: str) -> int:
+        """Count distinct therapy keywords in text, stopping once the threshold is met"""
+        found = set()
+        for match in THERAPY_KEYWORD_PATTERN.finditer(text):
+            found.add(match.group(1).lower())
+            if len(found) >= THERAPY_KEYWORD_THRESHOLD:
+                break
+        return len(found)
+
+    def _count_dialogue_patterns(self, text: str) -> int:
+        """Count distinct dialogue patterns in text, stopping once the threshold is met"""
+        found = set()
+        for match in DIALOGUE_PATTERN.finditer(text):
+            found.add(match.lastgroup)
+            if len(found) >= DIALOGUE_THRESHOLD:
+                break
+        return len(found)
+
     def validate_content(self, text: str) -> Dict:
         """Validate if content appears to be a therapy transcript"""
         validation_result = {
@@ -229,33 +487,15 @@ class DocumentProcessor:
             validation_result['issues'].append("Content too short to be a meaningful transcript")
             return validation_result
 
-        # Check for therapy-related keywords
-        therapy_keywords = [
-            'session', 'therapy', 'therapist', 'client', 'patient', 'counseling',
-            'feelings', 'thoughts', 'emotions', 'discussion', 'talk', 'share'
-        ]
-
-        text_lower = text.lower()
-        keyword_count = sum(1 for keyword in therapy_keywords if keyword in text_lower)
+        # Check for therapy-related keywords (matched case-insensitively in place)
+        keyword_count = self._count_therapy_keywords(text)
 
-        if keyword_count >= 3:
+        if keyword_count >= THERAPY_KEYWORD_THRESHOLD:
             validation_result['characteristics'].append("Contains therapy-related terminology")
             validation_result['confidence'] += 0.3
 
         # Check for dialogue patterns
-        dialogue_patterns = [
-            r'\b(therapist|counselor|doctor):\s',
-            r'\b(client|patient):\s',
-            r'\b(t:|c:|p:)\s',
-            r'"[^"]*"',  # Quoted speech
-        ]
-
-        dialogue_count = 0
-        for pattern in dialogue_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                dialogue_count += 1
-
-        if dialogue_count >= 2:
+        if self._count_dialogue_patterns(text) >= DIALOGUE_THRESHOLD:
             validation_result['characteristics'].append("Contains dialogue structure")
             validation_result['confidence'] += 0.4
 
@@ -269,17 +509,9 @@ class DocumentProcessor:
             validation_result['confidence'] -= 0.1
 
         # Check for time markers
-        time_patterns = [
-            r'\d{1,2}:\d{2}',  # Time stamps
-            r'(?:beginning|middle|end) of session',
-            r'(?:minutes|hour) into',
-        ]
-
-        for pattern in time_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                validation_result['characteristics'].append("Contains time references")
-                validation_result['confidence'] += 0.1
-                break
+        if TIME_PATTERN.search(text):
+            validation_result['characteristics'].append("Contains time references")
+            validation_result['confidence'] += 0.1
 
         # Final validation
         validation_result['confidence'] = max(0.0, min(1.0, validation_result['confidence']))
@@ -304,14 +536,12 @@ class DocumentProcessor:
             return ""
 
     def extract_text_from_pdf(self, file_path: str) -> str:
+        import PyPDF2
+
         try:
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                text_content = ""
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text_content += page.extract_text() or ""
-                return text_content
+                return "".join(page.extract_text() or "" for page in pdf_reader.pages)
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {str(e)}")
             return ""
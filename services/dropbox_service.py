@@ -1,25 +1,227 @@
 import os
+import functools
+import json
 import logging
+import posixpath
+import tempfile
+import threading
+import time
 import dropbox
-from typing import List, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import BinaryIO, Iterable, Iterator, List, Dict, Optional, Tuple, Union
 from datetime import datetime, timezone
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Streamed downloads stay in memory up to this size, then spill to disk
+DOWNLOAD_SPOOL_BYTES = 8 * 1024 * 1024
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+# Shared pool for concurrent downloads; the SDK releases the GIL while
+# waiting on the network, so threads overlap the HTTPS round-trips
+DOWNLOAD_WORKERS = int(os.environ.get('DROPBOX_CONCURRENCY', '20'))
+_DOWNLOAD_EXECUTOR = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix='dropbox-download')
+
+# One keep-alive pool shared by every client, so TLS handshakes are paid once
+# per connection rather than once per DropboxService or worker thread. Only
+# connection failures are retried here; the SDK already retries 429 and 5xx.
+HTTP_POOL_SIZE = max(32, DOWNLOAD_WORKERS + 4)
+REQUEST_TIMEOUT_SECONDS = 60
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=HTTP_POOL_SIZE,
+    max_retries=Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.3),
+))
+
+# Opt-in: skip the users_get_current_account round-trip at construction; a
+# bad token is then discovered, and the client dropped, by the first real API call
+FAST_INIT = os.environ.get('DROPBOX_FAST_INIT', '0') == '1'
+
+# File metadata seen in listings, downloads and lookups is reused for this long
+METADATA_CACHE_SIZE = 4096
+METADATA_CACHE_TTL_SECONDS = 60
+
+# test_connection retries transient 5xx / rate-limit responses with backoff
+CONNECTION_ATTEMPTS = 3
+CONNECTION_MAX_BACKOFF_SECONDS = 8
+
+# The folder found by _validate_folder_path is remembered across restarts,
+# per Dropbox account and configured monitor folder, in a private
+# per-user cache directory
+FOLDER_CACHE_FILE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'therapy-transcript-pipeline', 'dropbox_folders.json',
+)
+FOLDER_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Largest page Dropbox serves, without per-entry extras the pipeline never
+# reads. Mounted folders stay included: app folders are mounted folders.
+LIST_FOLDER_OPTIONS = {
+    'recursive': False,
+    'limit': 2000,
+    'include_media_info': False,
+    'include_deleted': False,
+    'include_has_explicit_shared_members': False,
+    'include_non_downloadable_files': False,
+}
+
+# Limits applied by _is_valid_file
+MAX_FILE_SIZE_BYTES = Config.MAX_FILE_SIZE_MB << 20
+MAX_FILE_AGE_DAYS = 30
+
+# scan_for_new_files logs one summary line per scan, naming at most this many files
+SCAN_LOG_NAME_LIMIT = 20
+
+# Lower-cased once so per-entry extension checks are a hash lookup
+SUPPORTED_FILE_TYPES = frozenset(ext.lower() for ext in Config.SUPPORTED_FILE_TYPES)
+
+
+def _entry_to_dict(entry: dropbox.files.FileMetadata) -> Dict:
+    """Convert Dropbox file metadata to the file dict used by the pipeline"""
+    return {
+        'name': entry.name,
+        'path': entry.path_lower,
+        'size': entry.size,
+        'modified': entry.client_modified,
+        'content_hash': entry.content_hash
+    }
+
+
+def _file_extension(name: str) -> str:
+    """Lower-cased extension of a file name, matching os.path.splitext
+
+    Dropbox entry names never contain a path separator, so only the last dot
+    matters; leading dots mark hidden files rather than an extension.
+    """
+    dot = name.rfind('.')
+    if dot <= 0 or not name[:dot].lstrip('.'):
+        return ''
+    return name[dot:].lower()
+
+
+def _is_supported_entry(entry) -> bool:
+    """Check that a listing entry is a file with a supported extension"""
+    if not isinstance(entry, dropbox.files.FileMetadata):
+        return False
+    return _file_extension(entry.name) in SUPPORTED_FILE_TYPES
+
+
+def _is_listed_entry(entry) -> bool:
+    """Check that a listing entry is a supported file that is not a supervision file"""
+    return _is_supported_entry(entry) and 'supervision' not in entry.name.lower()
+
+def _auth_guard(on_auth_error=None):
+    """Decorate a DropboxService method to drop the client when the token is rejected
+
+    on_auth_error builds the value returned in that case, e.g. list.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except dropbox.exceptions.AuthError as e:
+                logger.error(f"Dropbox authentication failed in {method.__name__}: {str(e)}")
+                logger.error("Please check if your Dropbox access token is valid and not expired")
+                self.client = None
+                return on_auth_error() if on_auth_error else None
+        return wrapper
+    return decorator
+
+
+def _read_folder_cache() -> Dict:
+    """Read the folder cache, returning {} when it is missing or unreadable"""
+    try:
+        with open(FOLDER_CACHE_FILE) as f:
+            cached = json.load(f)
+        return cached if isinstance(cached, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_folder_cache(cached: Dict) -> None:
+    """Atomically replace the folder cache with a file only the owner can read"""
+    cache_dir = os.path.dirname(FOLDER_CACHE_FILE)
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        # mkstemp creates the file with mode 0600
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.dropbox_folders.', suffix='.tmp')
+    except OSError as e:
+        logger.debug(f"Could not write folder cache: {str(e)}")
+        return
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cached, f)
+        os.replace(tmp_path, FOLDER_CACHE_FILE)
+    except OSError as e:
+        logger.debug(f"Could not write folder cache: {str(e)}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _load_cached_folder(account_id: str, folder_path: str) -> Optional[str]:
+    """Return the folder previously validated for this account and folder_path if still fresh"""
+    try:
+        entry = _read_folder_cache()[account_id][folder_path]
+        if time.time() - entry['ts'] <= FOLDER_CACHE_TTL_SECONDS:
+            return entry['path']
+    except (KeyError, TypeError):
+        pass
+    return None
+
+
+def _store_cached_folder(account_id: str, folder_path: str, validated_path: str) -> None:
+    """Remember the folder validated for this account and folder_path"""
+    cached = _read_folder_cache()
+    folders = cached.get(account_id)
+    if not isinstance(folders, dict):
+        folders = cached[account_id] = {}
+    folders[folder_path] = {'path': validated_path, 'ts': time.time()}
+    _write_folder_cache(cached)
+
+
+def _clear_cached_folder(account_id: str, folder_path: str) -> None:
+    """Forget the cached folder so the next validation probes Dropbox again"""
+    cached = _read_folder_cache()
+    folders = cached.get(account_id)
+    if isinstance(folders, dict) and folders.pop(folder_path, None) is not None:
+        _write_folder_cache(cached)
+
+
 class DropboxService:
     """Service for interacting with Dropbox API"""
 
+    __slots__ = (
+        'access_token', 'monitor_folder', 'client', '_account_id', '_folder_validated', '_validated_folder',
+        '_listing_lock', '_listing_cursor', '_listing_files', '_thread_clients',
+        '_metadata_cache', '_metadata_cache_lock',
+    )
+
     def __init__(self):
         """Initialize Dropbox service with API token"""
-        try:
-            # Force reload of environment variables
-            import os
-            from importlib import reload
-            import config
-            reload(config)
+        # Monitor folder snapshot kept current from list_folder cursors
+        self._listing_lock = threading.Lock()
+        self._listing_cursor = None
+        self._listing_files = {}
+        # Download worker threads each get their own client over the shared session
+        self._thread_clients = threading.local()
+        # path_lower -> (expiry on the monotonic clock, file dict)
+        self._metadata_cache = OrderedDict()
+        self._metadata_cache_lock = threading.Lock()
+        # Looked up on first use when FAST_INIT skips the account check
+        self._account_id = None
 
-            self.access_token = os.environ.get('DROPBOX_ACCESS_TOKEN') or Config.DROPBOX_ACCESS_TOKEN
+        try:
+            self.access_token = self._reload_token()
             self.monitor_folder = getattr(Config, 'DROPBOX_MONITOR_FOLDER', '/apps/otter')
 
             logger.info(f"Initializing Dropbox service with folder: {self.monitor_folder}")
@@ -30,11 +232,15 @@ class DropboxService:
                 return
 
             # Initialize with fresh token
-            self.client = dropbox.Dropbox(self.access_token)
+            self.client = self._build_client()
+            if FAST_INIT:
+                logger.info("Dropbox service initialized; token is checked on first use")
+                return
 
             # Test the connection immediately
             try:
                 account = self.client.users_get_current_account()
+                self._account_id = account.account_id
                 logger.info(f"Dropbox service initialized and authenticated successfully for {account.name.display_name}")
             except dropbox.exceptions.AuthError as e:
                 logger.error(f"Dropbox authentication failed: {str(e)}")
@@ -46,26 +252,69 @@ class DropboxService:
             logger.error(f"Error initializing Dropbox service: {str(e)}")
             self.client = None
 
-    def test_connection(self):
-        """Test the Dropbox connection"""
-        try:
-            if not self.client:
-                logger.warning("Dropbox client not initialized")
-                return False
+    def _build_client(self) -> dropbox.Dropbox:
+        """Create a Dropbox client for the configured access token"""
+        return dropbox.Dropbox(self.access_token, session=_SESSION, timeout=REQUEST_TIMEOUT_SECONDS)
 
-            account = self.client.users_get_current_account()
-            logger.info(f"Dropbox connection successful. Account: {account.name.display_name}")
-            return True
+    @staticmethod
+    def _reload_token() -> Optional[str]:
+        """Read the access token, preferring the live environment over config"""
+        return os.environ.get('DROPBOX_ACCESS_TOKEN') or Config.DROPBOX_ACCESS_TOKEN
+
+    def refresh_token(self) -> bool:
+        """Re-read the access token and rebuild the client if it has changed
 
-        except dropbox.exceptions.AuthError as e:
-            logger.error(f"Dropbox authentication failed: {str(e)}")
-            # Try to reinitialize with fresh token
-            self.__init__()
+        Call this after rotating DROPBOX_ACCESS_TOKEN; returns True when a new
+        client was built.
+        """
+        token = self._reload_token()
+        if not token or token.startswith('your_') or token == self.access_token:
             return False
-        except Exception as e:
-            logger.error(f"Dropbox connection test failed: {str(e)}")
+        logger.info("Dropbox access token changed, rebuilding client")
+        self.access_token = token
+        self.client = self._build_client()
+        self._account_id = None
+        self._thread_clients = threading.local()
+        return True
+
+    def test_connection(self):
+        """Test the Dropbox connection
+
+        An auth failure re-reads the token once and retries with a rebuilt
+        client; server errors and rate limits are retried with backoff.
+        """
+        if not self.client:
+            logger.warning("Dropbox client not initialized")
             return False
 
+        refreshed = False
+        for attempt in range(CONNECTION_ATTEMPTS):
+            try:
+                account = self.client.users_get_current_account()
+                self._account_id = account.account_id
+                logger.info(f"Dropbox connection successful. Account: {account.name.display_name}")
+                return True
+
+            except dropbox.exceptions.AuthError as e:
+                logger.error(f"Dropbox authentication failed: {str(e)}")
+                if refreshed or not self.refresh_token():
+                    self.client = None
+                    return False
+                refreshed = True
+            except (dropbox.exceptions.InternalServerError, dropbox.exceptions.RateLimitError) as e:
+                if attempt + 1 == CONNECTION_ATTEMPTS:
+                    logger.error(f"Dropbox connection test failed after {CONNECTION_ATTEMPTS} attempts: {str(e)}")
+                    return False
+                delay = min(getattr(e, 'backoff', None) or 2 ** attempt, CONNECTION_MAX_BACKOFF_SECONDS)
+                logger.warning(f"Transient Dropbox error, retrying in {delay}s: {str(e)}")
+                time.sleep(delay)
+            except Exception as e:
+                logger.error(f"Dropbox connection test failed: {str(e)}")
+                return False
+
+        return False
+
+    @_auth_guard(list)
     def list_files(self, folder_path: str = None) -> List[Dict]:
         """List files in the specified folder"""
         if not self.client:
@@ -84,49 +333,20 @@ class DropboxService:
             return []
 
         try:
-            files = []
-            result = self.client.files_list_folder(folder_path)
-
-            for entry in result.entries:
-                if isinstance(entry, dropbox.files.FileMetadata):
-                    # Check if file type is supported and exclude supervision files
-                    file_ext = os.path.splitext(entry.name)[1].lower()
-                    if (file_ext in Config.SUPPORTED_FILE_TYPES and 
-                        'supervision' not in entry.name.lower() and
-                        'Supervision' not in entry.name):
-                        files.append({
-                            'name': entry.name,
-                            'path': entry.path_lower,
-                            'size': entry.size,
-                            'modified': entry.client_modified,
-                            'content_hash': entry.content_hash
-                        })
-
-            # Handle pagination if there are more files
-            while result.has_more:
-                result = self.client.files_list_folder_continue(result.cursor)
-                for entry in result.entries:
-                    if isinstance(entry, dropbox.files.FileMetadata):
-                        file_ext = os.path.splitext(entry.name)[1].lower()
-                        if (file_ext in Config.SUPPORTED_FILE_TYPES and 
-                            'supervision' not in entry.name.lower() and
-                            'Supervision' not in entry.name):
-                            files.append({
-                                'name': entry.name,
-                                'path': entry.path_lower,
-                                'size': entry.size,
-                                'modified': entry.client_modified,
-                                'content_hash': entry.content_hash
-                            })
+            files, _ = self._list_folder(folder_path)
 
             logger.info(f"Found {len(files)} supported files in folder: '{folder_path}'")
             if len(files) == 0:
-                logger.info(f"No files with supported extensions {Config.SUPPORTED_FILE_TYPES} found in '{folder_path}'")
+                logger.info(f"No files with supported extensions {sorted(SUPPORTED_FILE_TYPES)} found in '{folder_path}'")
             return files
 
+        except dropbox.exceptions.AuthError:
+            raise
         except dropbox.exceptions.ApiError as e:
             if "not_found" in str(e):
                 logger.warning(f"Folder {folder_path} not found, trying to create it or use root folder")
+                # The remembered folder is gone; probe again on the next call
+                self._forget_validated_folder()
                 # Try root folder as fallback
                 return self._list_files_fallback()
             logger.error(f"Dropbox API error while listing files: {str(e)}")
@@ -135,39 +355,230 @@ class DropboxService:
             logger.error(f"Unexpected error while listing files: {str(e)}")
             return []
 
-    def download_file(self, file_path: str) -> Optional[bytes]:
-        """Download a file from Dropbox"""
+    def _list_folder(self, folder_path: str) -> Tuple[List[Dict], str]:
+        """List supported, non-supervision files in a folder
+
+        Returns the file dicts and the cursor of the last page, which
+        files_list_folder_continue accepts to fetch later changes.
+        """
+        files = []
+        for page in self._iter_folder_pages(self.client.files_list_folder(folder_path, **LIST_FOLDER_OPTIONS)):
+            files.extend(_entry_to_dict(entry) for entry in page.entries if _is_listed_entry(entry))
+        self._cache_metadata(files)
+        return files, page.cursor
+
+    def _iter_folder_pages(self, result) -> Iterator:
+        """Yield each listing page, fetching the next page in the background"""
+        if not result.has_more:
+            yield result
+            return
+
+        # Cursors are sequential, so only one page can be in flight; fetching
+        # it while the caller filters the current page hides that round-trip
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            while True:
+                pending = executor.submit(self.client.files_list_folder_continue, result.cursor) if result.has_more else None
+                yield result
+                if pending is None:
+                    return
+                result = pending.result()
+
+    @_auth_guard(list)
+    def _list_monitor_folder(self) -> List[Dict]:
+        """List the monitor folder, fetching only the changes since the previous call
+
+        The first call lists the folder in full and keeps the final cursor with
+        a snapshot of the files. Later calls pass the cursor to
+        files_list_folder_continue, which returns only added, modified and
+        deleted entries, and apply them to the snapshot. An expired or reset
+        cursor falls back to a full listing.
+        """
+        if not self.client:
+            return self.list_files()
+
+        with self._listing_lock:
+            if self._listing_cursor:
+                try:
+                    return self._apply_folder_changes()
+                except dropbox.exceptions.ApiError as e:
+                    logger.info(f"Dropbox folder cursor is no longer valid, relisting: {str(e)}")
+                    self._listing_cursor = None
+
+            folder_path = self.monitor_folder
+            try:
+                folder_path = self._validate_folder_path(folder_path)
+                files, cursor = self._list_folder(folder_path)
+            except dropbox.exceptions.AuthError:
+                raise
+            except Exception as e:
+                logger.warning(f"Could not list '{folder_path}' for change tracking: {str(e)}")
+                return self.list_files()
+
+            self._listing_cursor = cursor
+            self._listing_files = {file_info['path']: file_info for file_info in files}
+            logger.info(f"Found {len(files)} supported files in folder: '{folder_path}'")
+            return files
+
+    def _apply_folder_changes(self) -> List[Dict]:
+        """Apply the entries changed since _listing_cursor to the folder snapshot
+
+        Changes are applied in place. Re-applying a change is harmless, so if
+        a page fails part-way the next call simply replays from the old cursor.
+        """
+        files = self._listing_files
+        change_count = 0
+        for page in self._iter_folder_pages(self.client.files_list_folder_continue(self._listing_cursor)):
+            for entry in page.entries:
+                change_count += 1
+                if _is_listed_entry(entry):
+                    files[entry.path_lower] = file_info = _entry_to_dict(entry)
+                    self._cache_metadata([file_info])
+                else:
+                    # Deleted, renamed away or no longer a supported file
+                    files.pop(entry.path_lower, None)
+                    self._forget_metadata(entry.path_lower)
+
+        self._listing_cursor = page.cursor
+        logger.info(f"Applied {change_count} Dropbox folder changes; {len(files)} supported files tracked")
+        return list(files.values())
+
+    def download_file(self, file_path: str) -> Optional[bytearray]:
+        """Download a file from Dropbox
+
+        Returns the body as a bytearray, which every bytes consumer in the
+        pipeline (decode, BytesIO, hashing) accepts without copying.
+        """
+        downloaded = self.download_file_with_hash(file_path)
+        return downloaded[0] if downloaded else None
+
+    @_auth_guard()
+    def download_file_with_hash(self, file_path: str) -> Optional[Tuple[bytearray, Optional[str]]]:
+        """Download a file from Dropbox along with its Dropbox content_hash
+
+        The hash comes from the metadata returned with the download, so callers
+        can deduplicate on it without hashing the bytes again.
+        """
         if not self.client:
             logger.error("Dropbox client not initialized")
             return None
-            
+
+        return self._download_with_client(self.client, file_path)
+
+    def download_files(self, file_paths: List[str]) -> Iterator[Tuple[str, Optional[bytearray]]]:
+        """Download files concurrently, yielding (path, content) as each one finishes
+
+        content is None for a failed download, as with download_file.
+        """
+        if not self.client:
+            logger.error("Dropbox client not initialized")
+            return
+
+        futures = {_DOWNLOAD_EXECUTOR.submit(self._download_in_worker, path): path for path in file_paths}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    @_auth_guard()
+    def _download_in_worker(self, file_path: str) -> Optional[bytearray]:
+        """Download on a pool thread using that thread's own client (sharing _SESSION)"""
+        client = getattr(self._thread_clients, 'client', None)
+        if client is None:
+            client = self._thread_clients.client = self._build_client()
+        downloaded = self._download_with_client(client, file_path)
+        return downloaded[0] if downloaded else None
+
+    def _download_with_client(self, client: dropbox.Dropbox, file_path: str) -> Optional[Tuple[bytearray, Optional[str]]]:
+        """Download a file with the given client, returning (content, content_hash)
+
+        Failures are logged and return None.
+
+        The body is streamed in DOWNLOAD_CHUNK_BYTES chunks into a buffer sized
+        from the file metadata, so the file is held in memory only once.
+        """
+        try:
+            metadata, response = client.files_download(file_path)
+            # The download carries current metadata, so a changed content_hash
+            # replaces any stale cached entry
+            self._cache_metadata([_entry_to_dict(metadata)])
+            with response:
+                content = bytearray(metadata.size)
+                view = memoryview(content)
+                offset = 0
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    end = offset + len(chunk)
+                    if end > metadata.size:
+                        raise ValueError(f"received more than the reported {metadata.size} bytes")
+                    view[offset:end] = chunk
+                    offset = end
+                view.release()
+
+            if offset < metadata.size:
+                raise ValueError(f"received {offset} of the reported {metadata.size} bytes")
+            if content:
+                logger.info(f"Downloaded file: {file_path} ({len(content)} bytes)")
+            else:
+                logger.warning(f"Downloaded file {file_path} has no content")
+            return content, metadata.content_hash
+        except dropbox.exceptions.AuthError:
+            raise
+        except dropbox.exceptions.ApiError as e:
+            logger.error(f"Dropbox API error while downloading {file_path}: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error while downloading {file_path}: {str(e)}")
+            return None
+
+    @_auth_guard()
+    def download_file_to_stream(self, file_path: str) -> Optional[BinaryIO]:
+        """Download a file from Dropbox into a spooled temporary file
+
+        The body is copied in DOWNLOAD_CHUNK_BYTES chunks rather than held as one
+        bytes object. The returned file is positioned at the start and should be
+        closed by the caller.
+        """
+        if not self.client:
+            logger.error("Dropbox client not initialized")
+            return None
+
+        stream = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_BYTES)
         try:
             _, response = self.client.files_download(file_path)
-            if response.content:
-                logger.info(f"Downloaded file: {file_path} ({len(response.content)} bytes)")
-                return response.content
+            with response:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    stream.write(chunk)
+            size = stream.tell()
+            stream.seek(0)
+            if size:
+                logger.info(f"Downloaded file: {file_path} ({size} bytes)")
             else:
                 logger.warning(f"Downloaded file {file_path} has no content")
-                return b""
+            return stream
+        except dropbox.exceptions.AuthError:
+            stream.close()
+            raise
         except dropbox.exceptions.ApiError as e:
+            stream.close()
             logger.error(f"Dropbox API error while downloading {file_path}: {str(e)}")
             return None
         except Exception as e:
+            stream.close()
             logger.error(f"Unexpected error while downloading {file_path}: {str(e)}")
             return None
 
+    @_auth_guard()
     def get_file_metadata(self, file_path: str) -> Optional[Dict]:
-        """Get metadata for a specific file"""
+        """Get metadata for a specific file, served from the metadata cache when fresh"""
+        cached = self._cached_metadata(file_path)
+        if cached is not None:
+            return cached
+
         try:
             metadata = self.client.files_get_metadata(file_path)
             if isinstance(metadata, dropbox.files.FileMetadata):
-                return {
-                    'name': metadata.name,
-                    'path': metadata.path_lower,
-                    'size': metadata.size,
-                    'modified': metadata.client_modified,
-                    'content_hash': metadata.content_hash
-                }
+                file_info = _entry_to_dict(metadata)
+                self._cache_metadata([file_info])
+                return file_info
+        except dropbox.exceptions.AuthError:
+            raise
         except dropbox.exceptions.ApiError as e:
             logger.error(f"Dropbox API error while getting metadata for {file_path}: {str(e)}")
             return None
@@ -175,79 +586,231 @@ class DropboxService:
             logger.error(f"Unexpected error while getting metadata for {file_path}: {str(e)}")
             return None
 
-    def scan_for_new_files(self, processed_files: List[str]) -> List[Dict]:
-        """Scan for new files that haven't been processed yet"""
+    def get_files_metadata(self, file_paths: Iterable[str]) -> Dict[str, Dict]:
+        """Get metadata for several files, keyed by lower-cased path
+
+        Fresh cache entries are used as-is. The rest are grouped by parent
+        folder: a folder with several wanted files is listed once instead of
+        looking each file up, and a single file is fetched directly. Files that
+        cannot be found are left out of the result.
+        """
+        results = {}
+        by_parent = defaultdict(set)
+        for file_path in file_paths:
+            path_lower = file_path.lower()
+            cached = self._cached_metadata(path_lower)
+            if cached is not None:
+                results[path_lower] = cached
+            else:
+                by_parent[posixpath.dirname(path_lower)].add(path_lower)
+
+        for parent, wanted in by_parent.items():
+            if len(wanted) == 1:
+                path_lower = next(iter(wanted))
+                file_info = self.get_file_metadata(path_lower)
+                if file_info is not None:
+                    results[path_lower] = file_info
+                continue
+
+            try:
+                # Dropbox names the root folder '' rather than '/'
+                listing = self.client.files_list_folder('' if parent == '/' else parent, **LIST_FOLDER_OPTIONS)
+                files = [
+                    _entry_to_dict(entry)
+                    for page in self._iter_folder_pages(listing)
+                    for entry in page.entries
+                    if isinstance(entry, dropbox.files.FileMetadata)
+                ]
+            except Exception as e:
+                logger.error(f"Error listing {parent} for file metadata: {str(e)}")
+                continue
+
+            self._cache_metadata(files)
+            results.update((f['path'], f) for f in files if f['path'] in wanted)
+
+        return results
+
+    def _cached_metadata(self, file_path: str) -> Optional[Dict]:
+        """Return a copy of the cached metadata for a path if it has not expired"""
+        key = file_path.lower()
+        with self._metadata_cache_lock:
+            cached = self._metadata_cache.get(key)
+            if cached is None:
+                return None
+            expires_at, file_info = cached
+            if expires_at <= time.monotonic():
+                del self._metadata_cache[key]
+                return None
+            self._metadata_cache.move_to_end(key)
+        return dict(file_info)
+
+    def _cache_metadata(self, files: List[Dict]) -> None:
+        """Store file dicts in the metadata cache, evicting the least recently used"""
+        expires_at = time.monotonic() + METADATA_CACHE_TTL_SECONDS
+        with self._metadata_cache_lock:
+            for file_info in files:
+                key = file_info['path']
+                self._metadata_cache[key] = (expires_at, dict(file_info))
+                self._metadata_cache.move_to_end(key)
+            while len(self._metadata_cache) > METADATA_CACHE_SIZE:
+                self._metadata_cache.popitem(last=False)
+
+    def _forget_metadata(self, path_lower: str) -> None:
+        """Drop a path from the metadata cache"""
+        with self._metadata_cache_lock:
+            self._metadata_cache.pop(path_lower, None)
+
+    def scan_for_new_files(self, processed_files: Union[Iterable[str], Mapping]) -> List[Dict]:
+        """Scan for new files that haven't been processed yet
+
+        processed_files is an iterable of processed paths, or a mapping of
+        path to the Dropbox content_hash recorded when it was processed. With
+        hashes, a processed path whose content changed is reported again, and a
+        file whose content matches an already processed file is skipped even
+        under a new path. Paths mapped to a false-y hash count as processed.
+        """
         try:
-            all_files = self.list_files()
+            processed_hashes = frozenset()
+            if isinstance(processed_files, Mapping):
+                processed_hashes = frozenset(h for h in processed_files.values() if h)
+            elif not isinstance(processed_files, (set, frozenset)):
+                # Hashed membership; callers may pass any iterable of paths
+                processed_files = frozenset(processed_files)
+
+            all_files = self._list_monitor_folder()
             new_files = []
+            skipped_count = 0
+            now_utc = datetime.now(timezone.utc)
 
             for file_info in all_files:
                 # Check if file has already been processed
-                if file_info['path'] not in processed_files:
-                    # Additional validation
-                    if self._is_valid_file(file_info):
-                        new_files.append(file_info)
-                        logger.info(f"Found new file: {file_info['name']}")
+                if file_info['path'] in processed_files:
+                    stored_hash = processed_files[file_info['path']] if processed_hashes else None
+                    if not stored_hash or stored_hash == file_info['content_hash']:
+                        continue
+                elif file_info['content_hash'] in processed_hashes:
+                    # Identical content was already processed under another path
+                    continue
+
+                # Additional validation
+                if self._is_valid_file(file_info, now_utc):
+                    new_files.append(file_info)
+                else:
+                    skipped_count += 1
 
+            if skipped_count:
+                logger.info(f"Skipped {skipped_count} unprocessed files that are too old, too large or unsupported")
             if len(new_files) == 0:
                 logger.info(f"No new files to process. Checked {len(all_files)} existing files against {len(processed_files)} processed files")
             else:
-                logger.info(f"Found {len(new_files)} new files to process out of {len(all_files)} total files")
+                names = ', '.join(file_info['name'] for file_info in new_files[:SCAN_LOG_NAME_LIMIT])
+                if len(new_files) > SCAN_LOG_NAME_LIMIT:
+                    names += ', ...'
+                logger.info(f"Found {len(new_files)} new files to process out of {len(all_files)} total files: {names}")
             return new_files
 
         except Exception as e:
             logger.error(f"Error scanning for new files: {str(e)}")
             return []
 
-    def _is_valid_file(self, file_info: Dict) -> bool:
-        """Validate if a file should be processed"""
+    def _is_valid_file(self, file_info: Dict, now_utc: Optional[datetime] = None) -> bool:
+        """Validate if a file should be processed
+
+        Callers checking many files pass one now_utc for the whole batch.
+        """
         # Check file size
-        max_size_bytes = Config.MAX_FILE_SIZE_MB * 1024 * 1024
-        if file_info['size'] > max_size_bytes:
+        if file_info['size'] > MAX_FILE_SIZE_BYTES:
             logger.warning(f"File {file_info['name']} is too large ({file_info['size']} bytes)")
             return False
 
         # Check file extension
-        file_ext = os.path.splitext(file_info['name'])[1].lower()
-        if file_ext not in Config.SUPPORTED_FILE_TYPES:
+        file_ext = _file_extension(file_info['name'])
+        if file_ext not in SUPPORTED_FILE_TYPES:
             logger.warning(f"File {file_info['name']} has unsupported extension: {file_ext}")
             return False
 
         # Check if file is recent (within last 30 days for initial processing)
-        if file_info['modified']:
-            # Ensure both datetimes are timezone-aware
-            now_utc = datetime.now(timezone.utc)
-            file_modified = file_info['modified']
-
-            # Convert to UTC if naive datetime
+        file_modified = file_info['modified']
+        if file_modified:
+            if now_utc is None:
+                now_utc = datetime.now(timezone.utc)
+            # Dropbox reports naive UTC times; compare them as UTC
             if file_modified.tzinfo is None:
                 file_modified = file_modified.replace(tzinfo=timezone.utc)
 
             days_old = (now_utc - file_modified).days
-            if days_old > 30:
-                logger.info(f"Skipping old file {file_info['name']} (modified {days_old} days ago)")
+            if days_old > MAX_FILE_AGE_DAYS:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Skipping old file {file_info['name']} (modified {days_old} days ago)")
                 return False
 
         return True
 
     def _validate_folder_path(self, folder_path: str) -> str:
-        """Validate and find the correct folder path"""
+        """Validate and find the correct folder path
+
+        A folder found for the same account and folder_path within the last
+        FOLDER_CACHE_TTL_SECONDS is reused from FOLDER_CACHE_FILE, so
+        restarted workers skip the probe round-trips.
+        """
         # If we already validated this folder path, return it
         if hasattr(self, '_validated_folder') and self._validated_folder is not None:
             return self._validated_folder
-            
+
+        account_id = self._get_account_id()
+        cached = _load_cached_folder(account_id, folder_path) if account_id else None
+        if cached is not None:
+            logger.info(f"Using cached folder path: '{cached}'")
+            self._validated_folder = cached
+            return cached
+
+        validated = self._find_folder_path(folder_path)
+        self._validated_folder = validated
+        # The root fallback means discovery failed, so it is retried next time
+        if validated and account_id:
+            _store_cached_folder(account_id, folder_path, validated)
+        return validated
+
+    def _get_account_id(self) -> Optional[str]:
+        """Return the Dropbox account id for the current token, looking it up once
+
+        Auth errors propagate to the caller's _auth_guard; other failures
+        return None so the folder cache is simply bypassed.
+        """
+        account_id = getattr(self, '_account_id', None)
+        if account_id is None:
+            try:
+                account_id = self._account_id = self.client.users_get_current_account().account_id
+            except dropbox.exceptions.AuthError:
+                raise
+            except Exception as e:
+                logger.debug(f"Could not look up Dropbox account id: {str(e)}")
+        return account_id
+
+    def _forget_validated_folder(self) -> None:
+        """Discard the validated folder in memory and on disk"""
+        self._validated_folder = None
+        account_id = getattr(self, '_account_id', None)
+        if account_id:
+            _clear_cached_folder(account_id, self.monitor_folder)
+
+    def _find_folder_path(self, folder_path: str) -> str:
+        """Probe Dropbox for the folder, creating it or trying common variations"""
         logger.info(f"Attempting to validate folder path: {folder_path}")
+        # Dropbox paths are case-insensitive, so each distinct lower-cased
+        # path needs probing at most once
+        probed = set()
 
         # Check if this is the first validation
         if not hasattr(self, '_folder_validated'):
             self._folder_validated = True
+            probed.add(folder_path.lower())
             
             # First try to create the folder if it doesn't exist
             try:
                 # Check if the folder exists
-                result = self.client.files_list_folder(folder_path)
+                self.client.files_list_folder(folder_path, limit=1)
                 logger.info(f"Valid folder path found: '{folder_path}'")
-                self._validated_folder = folder_path
                 return folder_path
             except dropbox.exceptions.ApiError as e:
                 if "not_found" in str(e).lower():
@@ -255,7 +818,6 @@ class DropboxService:
                     try:
                         self.client.files_create_folder_v2(folder_path)
                         logger.info(f"Successfully created folder: '{folder_path}'")
-                        self._validated_folder = folder_path
                         return folder_path
                     except dropbox.exceptions.ApiError as create_e:
                         logger.warning(f"Could not create folder '{folder_path}': {str(create_e)}")
@@ -275,11 +837,13 @@ class DropboxService:
         ]
 
         for variation in folder_variations:
+            if variation.lower() in probed:
+                continue
+            probed.add(variation.lower())
             try:
                 logger.info(f"Trying folder path: '{variation}'")
-                result = self.client.files_list_folder(variation)
+                self.client.files_list_folder(variation, limit=1)
                 logger.info(f"Valid folder path found: '{variation}'")
-                self._validated_folder = variation
                 return variation
             except dropbox.exceptions.ApiError as e:
                 logger.debug(f"Folder '{variation}' not accessible: {str(e)}")
@@ -288,26 +852,13 @@ class DropboxService:
         # As a last resort, use root folder but log this clearly
         logger.error(f"Could not find or create any valid folder for '{folder_path}'. Using root folder as fallback.")
         logger.error("This may indicate an issue with Dropbox permissions or the app folder setup.")
-        self._validated_folder = ''
         return ''
 
     def _list_files_fallback(self) -> List[Dict]:
         """Fallback method to list files from root folder"""
         try:
-            files = []
-            result = self.client.files_list_folder("")
-
-            for entry in result.entries:
-                if isinstance(entry, dropbox.files.FileMetadata):
-                    file_ext = os.path.splitext(entry.name)[1].lower()
-                    if file_ext in Config.SUPPORTED_FILE_TYPES:
-                        files.append({
-                            'name': entry.name,
-                            'path': entry.path_lower,
-                            'size': entry.size,
-                            'modified': entry.client_modified,
-                            'content_hash': entry.content_hash
-                        })
+            result = self.client.files_list_folder("", **LIST_FOLDER_OPTIONS)
+            files = [_entry_to_dict(entry) for entry in result.entries if _is_supported_entry(entry)]
 
             logger.info(f"Found {len(files)} supported files in root folder")
             return files
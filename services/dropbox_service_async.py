@@ -0,0 +1,142 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+from config import Config
+from services.dropbox_service import DropboxService, LIST_FOLDER_OPTIONS, SUPPORTED_FILE_TYPES, _file_extension
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.dropboxapi.com/2"
+CONTENT_URL = "https://content.dropboxapi.com/2"
+
+# Downloads in flight at once; Dropbox throttles well before TLS setup does
+ASYNC_DOWNLOAD_CONCURRENCY = 20
+REQUEST_TIMEOUT_SECONDS = 60
+
+# Dropbox reports client_modified as UTC with a trailing Z
+DROPBOX_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def _file_entry_to_dict(entry: Dict) -> Dict:
+    """Convert a list_folder JSON file entry to the file dict used by the pipeline
+
+    modified is a naive UTC datetime, as the Dropbox SDK returns it.
+    """
+    return {
+        'name': entry['name'],
+        'path': entry['path_lower'],
+        'size': entry['size'],
+        'modified': datetime.strptime(entry['client_modified'], DROPBOX_TIME_FORMAT),
+        'content_hash': entry.get('content_hash')
+    }
+
+
+def _is_listed_file(entry: Dict) -> bool:
+    """Check that a JSON entry is a supported file that is not a supervision file"""
+    if entry.get('.tag') != 'file':
+        return False
+    name = entry['name']
+    return _file_extension(name) in SUPPORTED_FILE_TYPES and 'supervision' not in name.lower()
+
+
+class AsyncDropboxService:
+    """asyncio counterpart of DropboxService for listing and downloading
+
+    Talks to the Dropbox v2 HTTP API directly through httpx, so pagination
+    and many downloads can be awaited together without worker threads. Use
+    it as an async context manager, e.g. from synchronous code:
+
+        async def fetch(paths):
+            async with AsyncDropboxService() as service:
+                return await service.download_files(paths)
+
+        contents = asyncio.run(fetch(paths))
+    """
+
+    def __init__(self, access_token: Optional[str] = None, monitor_folder: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.access_token = access_token or DropboxService._reload_token()
+        self.monitor_folder = monitor_folder or getattr(Config, 'DROPBOX_MONITOR_FOLDER', '/apps/otter')
+        self._transport = transport
+        self._client = None
+
+    async def __aenter__(self) -> 'AsyncDropboxService':
+        self._client = httpx.AsyncClient(
+            headers={'Authorization': f'Bearer {self.access_token}'},
+            timeout=REQUEST_TIMEOUT_SECONDS,
+            transport=self._transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._client.aclose()
+        self._client = None
+
+    async def _rpc(self, route: str, arguments: Dict) -> Dict:
+        """Call a JSON RPC-style endpoint and return the decoded response"""
+        response = await self._client.post(f"{API_URL}/{route}", json=arguments)
+        response.raise_for_status()
+        return response.json()
+
+    async def list_files(self, folder_path: Optional[str] = None) -> List[Dict]:
+        """List supported, non-supervision files in a folder"""
+        if folder_path is None:
+            folder_path = self.monitor_folder
+
+        try:
+            files = []
+            result = await self._rpc('files/list_folder', {'path': folder_path, **LIST_FOLDER_OPTIONS})
+            while True:
+                files.extend(_file_entry_to_dict(entry) for entry in result['entries'] if _is_listed_file(entry))
+                if not result['has_more']:
+                    break
+                result = await self._rpc('files/list_folder/continue', {'cursor': result['cursor']})
+
+            logger.info(f"Found {len(files)} supported files in folder: '{folder_path}'")
+            return files
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Dropbox API error while listing files: {e.response.status_code} {e.response.text}")
+            return []
+        except Exception as e:
+            logger.error(f"Unexpected error while listing files: {str(e)}")
+            return []
+
+    async def download_file(self, file_path: str) -> Optional[bytes]:
+        """Download a file from Dropbox"""
+        try:
+            # Dropbox-API-Arg must be ASCII; json.dumps escapes everything else
+            response = await self._client.post(
+                f"{CONTENT_URL}/files/download",
+                headers={'Dropbox-API-Arg': json.dumps({'path': file_path})},
+            )
+            response.raise_for_status()
+            logger.info(f"Downloaded file: {file_path} ({len(response.content)} bytes)")
+            return response.content
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Dropbox API error while downloading {file_path}: {e.response.status_code} {e.response.text}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error while downloading {file_path}: {str(e)}")
+            return None
+
+    async def download_files(self, file_paths: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """Download files concurrently, at most ASYNC_DOWNLOAD_CONCURRENCY at a time
+
+        Returns content keyed by path; failed downloads map to None.
+        """
+        semaphore = asyncio.Semaphore(ASYNC_DOWNLOAD_CONCURRENCY)
+
+        async def download(file_path: str) -> Optional[bytes]:
+            async with semaphore:
+                return await self.download_file(file_path)
+
+        file_paths = list(file_paths)
+        contents = await asyncio.gather(*(download(path) for path in file_paths))
+        return dict(zip(file_paths, contents))
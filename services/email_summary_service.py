@@ -3,13 +3,250 @@ Email Summary Service for Therapy Progress Notes
 Generates and sends comprehensive session summaries with action items
 """
 import os
+import json
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 import re
 
 logger = logging.getLogger(__name__)
 
+# Section headers that some patterns below start with. One pass over an
+# analysis finds where each first appears, so those patterns start searching
+# there and are skipped outright when their header is missing. The other
+# patterns are paired with a lower-case literal that every match contains,
+# and are skipped when a substring check finds it missing.
+SECTION_HEADERS = ('SUBJECTIVE', 'ASSESSMENT', 'PLAN', 'KEY POINTS', 'SIGNIFICANT QUOTES')
+SECTION_HEADER_PATTERN = re.compile('|'.join(SECTION_HEADERS), re.IGNORECASE)
+
+# Patterns used by the summary helpers, compiled once at import and paired
+# with the section header they start with or a literal they contain
+OVERVIEW_PATTERNS = tuple(
+    (header, re.compile(p, re.IGNORECASE | re.DOTALL)) for header, p in (
+        ('SUBJECTIVE', r'SUBJECTIVE\s*(.{200,800}?)(?=OBJECTIVE|ASSESSMENT|$)'),
+        ('session overview', r'Session Overview\s*(.{200,600}?)(?=\n\n|\n[A-Z])'),
+        ('comprehensive narrative summary', r'COMPREHENSIVE NARRATIVE SUMMARY\s*(.{200,800}?)(?=\n\n|$)'),
+    )
+)
+
+KEY_TOPIC_PATTERNS = tuple(
+    (header, re.compile(p, re.IGNORECASE | re.DOTALL)) for header, p in (
+        ('thematic analysis', r'Thematic Analysis.*?(?=\n\n|[A-Z]{2,})'),
+        ('KEY POINTS', r'KEY POINTS\s*(.*?)(?=\n\n|[A-Z]{2,})'),
+        ('major themes', r'Major themes.*?(?=\n\n|[A-Z]{2,})'),
+    )
+)
+
+INSIGHT_PATTERNS = tuple(
+    (header, re.compile(p, re.IGNORECASE | re.DOTALL)) for header, p in (
+        ('ASSESSMENT', r'ASSESSMENT\s*(.{100,500}?)(?=PLAN|$)'),
+        ('therapeutic', r'therapeutic.*?insights?\s*(.{100,400}?)(?=\n\n|[A-Z]{2,})'),
+        ('clinical', r'Clinical.*?observations?\s*(.{100,400}?)(?=\n\n|[A-Z]{2,})'),
+    )
+)
+
+ACTION_ITEM_PATTERNS = tuple(
+    (header, re.compile(p, re.IGNORECASE | re.DOTALL)) for header, p in (
+        ('PLAN', r'PLAN\s*(.*?)(?=\n\n|[A-Z]{2,}|$)'),
+        ('homework', r'homework.*?assignments?\s*(.*?)(?=\n\n|[A-Z]{2,})'),
+        ('action', r'action.*?items?\s*(.*?)(?=\n\n|[A-Z]{2,})'),
+        ('follow', r'follow-?up.*?appointments?\s*(.*?)(?=\n\n|[A-Z]{2,})'),
+    )
+)
+
+FOLLOW_UP_PATTERNS = tuple(
+    (literal, re.compile(p, re.IGNORECASE)) for literal, p in (
+        ('explore', r'explore.*?further\s*(.{50,200}?)(?=\.|,|\n)'),
+        ('follow', r'follow.*?up.*?on\s*(.{50,200}?)(?=\.|,|\n)'),
+        ('monitor', r'monitor.*?progress\s*(.{50,200}?)(?=\.|,|\n)'),
+    )
+)
+
+NEXT_SESSION_PATTERNS = tuple(
+    (literal, re.compile(p, re.IGNORECASE | re.DOTALL)) for literal, p in (
+        ('next', r'next.*?session.*?focus\s*(.{50,300}?)(?=\n\n|[A-Z]{2,})'),
+        ('continue', r'continue.*?working.*?on\s*(.{50,200}?)(?=\.|,|\n)'),
+        ('areas', r'areas.*?requiring.*?attention\s*(.{50,200}?)(?=\.|,|\n)'),
+    )
+)
+
+QUOTE_PATTERNS = tuple(
+    (header, re.compile(p, re.DOTALL)) for header, p in (
+        ('"', r'"([^"]{30,200})"'),
+        ('SIGNIFICANT QUOTES', r'SIGNIFICANT QUOTES\s*(.*?)(?=\n\n|[A-Z]{2,})'),
+    )
+)
+
+PROGRESS_PATTERNS = tuple(
+    (literal, re.compile(p, re.IGNORECASE)) for literal, p in (
+        ('progress', r'progress.*?noted\s*(.{50,200}?)(?=\.|,|\n)'),
+        ('improvement', r'improvement.*?in\s*(.{50,200}?)(?=\.|,|\n)'),
+        ('positive', r'positive.*?changes?\s*(.{50,200}?)(?=\.|,|\n)'),
+    )
+)
+
+# Literals the non-header patterns above are guarded by
+PATTERN_LITERALS = tuple(dict.fromkeys(
+    literal
+    for patterns in (OVERVIEW_PATTERNS, KEY_TOPIC_PATTERNS, INSIGHT_PATTERNS, ACTION_ITEM_PATTERNS,
+                     FOLLOW_UP_PATTERNS, NEXT_SESSION_PATTERNS, QUOTE_PATTERNS, PROGRESS_PATTERNS)
+    for literal, _ in patterns if literal not in SECTION_HEADERS
+))
+
+BULLET_CHARACTERS = '•-*'
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def _extract_bullets(text: str, max_length: int, limit: Optional[int] = None,
+                     min_length: int = 20) -> List[str]:
+    """Return the bulleted lines of text, without their bullet characters
+
+    Only lines starting with a bullet count, so a hyphen inside a sentence
+    does not. Items shorter than min_length are skipped and longer ones are
+    cut to max_length. Stops after limit items when a limit is given.
+    """
+    items = []
+    for line in text.splitlines():
+        line = line.lstrip()
+        if line[:1] and line[:1] in BULLET_CHARACTERS:
+            item = line[1:].strip()
+            if len(item) >= min_length:
+                items.append(item[:max_length])
+                if len(items) == limit:
+                    break
+    return items
+
+
+def _section_offsets(analysis: str) -> Dict[str, int]:
+    """Map each section header in analysis to the offset of its first appearance
+
+    Pattern literals found anywhere in analysis map to 0.
+    """
+    offsets = {}
+    for match in SECTION_HEADER_PATTERN.finditer(analysis):
+        offsets.setdefault(match.group().upper(), match.start())
+    lowered = analysis.lower()
+    for literal in PATTERN_LITERALS:
+        if literal in lowered:
+            offsets[literal] = 0
+    return offsets
+
+
+def _search_start(header: str, offsets: Dict[str, int]) -> Optional[int]:
+    """Where a pattern paired with header can first match, or None if it cannot
+
+    Offsets are found case-insensitively, so they are never past the first
+    match of a case-sensitive header pattern either.
+    """
+    return offsets.get(header)
+
+# Opening blocks of the summary email, filled with format_map in
+# generate_email_content; everything after them is appended per section
+HTML_HEADER_TEMPLATE = """
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 800px; margin: 0 auto; padding: 20px;">
+                <h1 style="color: #2c5aa0; border-bottom: 2px solid #2c5aa0; padding-bottom: 10px;">
+                    Therapy Session Summary
+                </h1>
+                
+                <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                    <h3 style="margin-top: 0; color: #2c5aa0;">Session Details</h3>
+                    <p><strong>Client:</strong> {client_name}</p>
+                    <p><strong>Date:</strong> {session_date}</p>
+                    <p><strong>Generated:</strong> {generated_at}</p>
+                </div>
+                
+                <h3 style="color: #2c5aa0;">Session Overview</h3>
+                <p style="background-color: #f8f9fa; padding: 15px; border-left: 4px solid #2c5aa0;">
+                    {session_overview}
+                </p>
+                
+                <h3 style="color: #2c5aa0;">Key Topics Discussed</h3>
+                <ul>
+        """
+
+TEXT_HEADER_TEMPLATE = """
+THERAPY SESSION SUMMARY
+
+Client: {client_name}
+Date: {session_date}
+Generated: {generated_at}
+
+SESSION OVERVIEW
+{session_overview}
+
+KEY TOPICS DISCUSSED
+"""
+
+# SendGrid v3 endpoint that SendGridAPIClient.send posts Mail payloads to
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+SENDGRID_TIMEOUT_SECONDS = 30
+
+SUMMARY_SENDER = {'name': "Therapy Notes System", 'email': "therapynotes@replit.app"}
+
+
+def _mail_payload(recipient_email: str, email_content: Dict) -> Dict:
+    """Build the v3 mail/send body for a summary email
+
+    This is the JSON the sendgrid Mail helper produces, written out directly
+    rather than assembled from Mail, Email, To and Content objects. SendGrid
+    requires the text/plain part before the text/html one.
+    """
+    # Only sending needs email.utils, which pulls in socket and calendar
+    from email.utils import parseaddr
+
+    name, address = parseaddr(recipient_email)
+    recipient = {'name': name, 'email': address} if name else {'email': address or recipient_email}
+    return {
+        'from': SUMMARY_SENDER,
+        'subject': email_content['subject'],
+        'personalizations': [{'to': [recipient]}],
+        'content': [
+            {'type': 'text/plain', 'value': email_content['text_content']},
+            {'type': 'text/html', 'value': email_content['html_content']},
+        ],
+    }
+
+
+class SendGridSession:
+    """A keep-alive connection to SendGrid shared by every email sent through it
+
+    SendGridAPIClient opens a new HTTPS connection, and so a new TLS
+    handshake, for each message. Posting the same Mail payloads through one
+    requests.Session pays that cost once per batch instead.
+    """
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._session = None
+
+    def __enter__(self) -> 'SendGridSession':
+        import requests
+
+        self._session = requests.Session()
+        self._session.headers.update({
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json',
+        })
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._session.close()
+        self._session = None
+
+    def send(self, payload: Dict) -> int:
+        """Send a v3 mail/send payload and return the HTTP status code
+
+        The body is encoded once, as compact UTF-8. requests' json= would
+        escape every non-ASCII character to six bytes and pad the separators.
+        """
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        response = self._session.post(SENDGRID_SEND_URL, data=body, timeout=SENDGRID_TIMEOUT_SECONDS)
+        return response.status_code
+
+
 class ServiceNotConfiguredError(Exception):
     """Raised when a required service is not properly configured"""
     pass
@@ -19,7 +256,12 @@ class EmailSummaryService:
         self.sendgrid_api_key = os.environ.get('SENDGRID_API_KEY')
         
     def extract_session_summary(self, transcript_data: Dict) -> Dict:
-        """Extract key information from AI analyses to create session summary"""
+        """Extract key information from AI analyses to create session summary
+
+        Results are deliberately not memoized: they quote client statements,
+        and a process-wide cache would keep that clinical text in memory long
+        after the request that needed it.
+        """
         try:
             # Combine all AI analyses - handle both string and dict formats
             openai_analysis = transcript_data.get('openai_analysis', '')
@@ -34,16 +276,24 @@ class EmailSummaryService:
             if isinstance(gemini_analysis, dict):
                 gemini_analysis = str(gemini_analysis)
             
+            # Locate the section headers of every analysis in a single pass each
+            offsets = {
+                analysis: _section_offsets(analysis)
+                for analysis in (openai_analysis, anthropic_analysis, gemini_analysis) if analysis
+            }
+
             # Extract key components using pattern matching
             summary_data = {
-                'session_overview': self._extract_session_overview(openai_analysis, anthropic_analysis),
-                'key_topics': self._extract_key_topics(openai_analysis, anthropic_analysis, gemini_analysis),
-                'therapeutic_insights': self._extract_therapeutic_insights(openai_analysis, anthropic_analysis),
-                'action_items': self._extract_action_items(openai_analysis, anthropic_analysis, gemini_analysis),
-                'follow_up_questions': self._generate_follow_up_questions(openai_analysis, anthropic_analysis),
-                'next_session_focus': self._identify_next_session_focus(openai_analysis, anthropic_analysis, gemini_analysis),
-                'significant_quotes': self._extract_significant_quotes(openai_analysis, anthropic_analysis),
-                'progress_indicators': self._extract_progress_indicators(openai_analysis, anthropic_analysis, gemini_analysis)
+                'session_overview': self._extract_session_overview(openai_analysis, anthropic_analysis, offsets),
+                'key_topics': self._extract_key_topics(openai_analysis, anthropic_analysis, gemini_analysis, offsets),
+                'therapeutic_insights': self._extract_therapeutic_insights(openai_analysis, anthropic_analysis, offsets),
+                'action_items': self._extract_action_items(openai_analysis, anthropic_analysis, gemini_analysis, offsets),
+                'follow_up_questions': self._generate_follow_up_questions(openai_analysis, anthropic_analysis, offsets),
+                'next_session_focus': self._identify_next_session_focus(openai_analysis, anthropic_analysis, gemini_analysis,
+                                                                        offsets),
+                'significant_quotes': self._extract_significant_quotes(openai_analysis, anthropic_analysis, offsets),
+                'progress_indicators': self._extract_progress_indicators(openai_analysis, anthropic_analysis, gemini_analysis,
+                                                                         offsets)
             }
             
             return summary_data
@@ -52,118 +302,101 @@ class EmailSummaryService:
             logger.error(f"Error extracting session summary: {str(e)}")
             return {}
     
-    def _extract_session_overview(self, openai_analysis: str, anthropic_analysis: str) -> str:
+    def _extract_session_overview(self, openai_analysis: str, anthropic_analysis: str,
+                                  offsets: Dict[str, Dict[str, int]]) -> str:
         """Extract concise session overview"""
-        # Look for subjective or assessment sections
-        patterns = [
-            r'SUBJECTIVE\s*(.{200,800}?)(?=OBJECTIVE|ASSESSMENT|$)',
-            r'Session Overview\s*(.{200,600}?)(?=\n\n|\n[A-Z])',
-            r'COMPREHENSIVE NARRATIVE SUMMARY\s*(.{200,800}?)(?=\n\n|$)'
-        ]
+        # Providers without an analysis are dropped once, not once per pattern
+        analyses = [analysis for analysis in (openai_analysis, anthropic_analysis) if analysis]
         
-        for pattern in patterns:
-            for analysis in [openai_analysis, anthropic_analysis]:
-                if analysis:
-                    match = re.search(pattern, analysis, re.IGNORECASE | re.DOTALL)
-                    if match:
-                        overview = match.group(1).strip()
-                        # Clean up and truncate
-                        overview = re.sub(r'\s+', ' ', overview)
-                        return overview[:400] + "..." if len(overview) > 400 else overview
+        # Look for subjective or assessment sections
+        for header, pattern in OVERVIEW_PATTERNS:
+            for analysis in analyses:
+                start = _search_start(header, offsets[analysis])
+                if start is None:
+                    continue
+                match = pattern.search(analysis, start)
+                if match:
+                    overview = match.group(1).strip()
+                    # Clean up and truncate
+                    overview = WHITESPACE_PATTERN.sub(' ', overview)
+                    return overview[:400] + "..." if len(overview) > 400 else overview
         
         return "Session focused on therapeutic progress and client concerns."
     
-    def _extract_key_topics(self, openai_analysis: str, anthropic_analysis: str, gemini_analysis: str) -> List[str]:
+    def _extract_key_topics(self, openai_analysis: str, anthropic_analysis: str, gemini_analysis: str,
+                            offsets: Dict[str, Dict[str, int]]) -> List[str]:
         """Extract key topics discussed in session"""
         topics = []
         
         # Look for thematic analysis sections
-        patterns = [
-            r'Thematic Analysis.*?(?=\n\n|[A-Z]{2,})',
-            r'KEY POINTS\s*(.*?)(?=\n\n|[A-Z]{2,})',
-            r'Major themes.*?(?=\n\n|[A-Z]{2,})'
-        ]
-        
         for analysis in [openai_analysis, anthropic_analysis, gemini_analysis]:
             if analysis:
-                for pattern in patterns:
-                    matches = re.findall(pattern, analysis, re.IGNORECASE | re.DOTALL)
+                for header, pattern in KEY_TOPIC_PATTERNS:
+                    start = _search_start(header, offsets[analysis])
+                    if start is None:
+                        continue
+                    matches = pattern.findall(analysis, start)
                     for match in matches:
                         # Extract bullet points or numbered items
-                        topic_items = re.findall(r'[•\-\*]\s*([^\n]{20,150})', match)
-                        topics.extend(topic_items[:3])  # Limit to top 3 per analysis
+                        topics.extend(_extract_bullets(match, 150, limit=3))  # Limit to top 3 per analysis
         
         # Remove duplicates and clean up
         unique_topics = []
         for topic in topics:
-            clean_topic = re.sub(r'\s+', ' ', topic.strip())
+            clean_topic = WHITESPACE_PATTERN.sub(' ', topic.strip())
             if clean_topic not in unique_topics and len(clean_topic) > 10:
                 unique_topics.append(clean_topic)
         
         return unique_topics[:6]  # Return top 6 topics
     
-    def _extract_therapeutic_insights(self, openai_analysis: str, anthropic_analysis: str) -> List[str]:
+    def _extract_therapeutic_insights(self, openai_analysis: str, anthropic_analysis: str,
+                                      offsets: Dict[str, Dict[str, int]]) -> List[str]:
         """Extract key therapeutic insights and interventions"""
         insights = []
         
-        patterns = [
-            r'ASSESSMENT\s*(.{100,500}?)(?=PLAN|$)',
-            r'therapeutic.*?insights?\s*(.{100,400}?)(?=\n\n|[A-Z]{2,})',
-            r'Clinical.*?observations?\s*(.{100,400}?)(?=\n\n|[A-Z]{2,})'
-        ]
-        
         for analysis in [openai_analysis, anthropic_analysis]:
             if analysis:
-                for pattern in patterns:
-                    match = re.search(pattern, analysis, re.IGNORECASE | re.DOTALL)
+                for header, pattern in INSIGHT_PATTERNS:
+                    start = _search_start(header, offsets[analysis])
+                    if start is None:
+                        continue
+                    match = pattern.search(analysis, start)
                     if match:
                         insight = match.group(1).strip()
-                        insight = re.sub(r'\s+', ' ', insight)
+                        insight = WHITESPACE_PATTERN.sub(' ', insight)
                         if len(insight) > 50:
                             insights.append(insight[:200])
         
         return insights[:3]
     
-    def _extract_action_items(self, openai_analysis: str, anthropic_analysis: str, gemini_analysis: str) -> List[str]:
+    def _extract_action_items(self, openai_analysis: str, anthropic_analysis: str, gemini_analysis: str,
+                              offsets: Dict[str, Dict[str, int]]) -> List[str]:
         """Extract specific action items and homework assignments"""
         action_items = []
         
-        patterns = [
-            r'PLAN\s*(.*?)(?=\n\n|[A-Z]{2,}|$)',
-            r'homework.*?assignments?\s*(.*?)(?=\n\n|[A-Z]{2,})',
-            r'action.*?items?\s*(.*?)(?=\n\n|[A-Z]{2,})',
-            r'follow-?up.*?appointments?\s*(.*?)(?=\n\n|[A-Z]{2,})'
-        ]
-        
         for analysis in [openai_analysis, anthropic_analysis, gemini_analysis]:
             if analysis:
-                for pattern in patterns:
-                    matches = re.findall(pattern, analysis, re.IGNORECASE | re.DOTALL)
+                for header, pattern in ACTION_ITEM_PATTERNS:
+                    start = _search_start(header, offsets[analysis])
+                    if start is None:
+                        continue
+                    matches = pattern.findall(analysis, start)
                     for match in matches:
                         # Extract specific actionable items
-                        items = re.findall(r'[•\-\*]\s*([^\n]{20,200})', match)
-                        action_items.extend(items)
+                        action_items.extend(_extract_bullets(match, 200))
         
         # Clean and deduplicate
         unique_actions = []
         for item in action_items:
-            clean_item = re.sub(r'\s+', ' ', item.strip())
+            clean_item = WHITESPACE_PATTERN.sub(' ', item.strip())
             if clean_item not in unique_actions and len(clean_item) > 15:
                 unique_actions.append(clean_item)
         
         return unique_actions[:5]
     
-    def _generate_follow_up_questions(self, openai_analysis: str, anthropic_analysis: str) -> List[str]:
+    def _generate_follow_up_questions(self, openai_analysis: str, anthropic_analysis: str,
+                                      offsets: Dict[str, Dict[str, int]]) -> List[str]:
         """Generate follow-up questions for next session"""
-        questions = []
-        
-        # Look for areas that need exploration
-        patterns = [
-            r'explore.*?further\s*(.{50,200}?)(?=\.|,|\n)',
-            r'follow.*?up.*?on\s*(.{50,200}?)(?=\.|,|\n)',
-            r'monitor.*?progress\s*(.{50,200}?)(?=\.|,|\n)'
-        ]
-        
         base_questions = [
             "How have you been feeling since our last session?",
             "What progress have you noticed with the strategies we discussed?",
@@ -171,77 +404,74 @@ class EmailSummaryService:
             "How effective were the coping techniques we practiced?"
         ]
         
+        # Base questions first; dict keys keep insertion order and drop repeats
+        questions = dict.fromkeys(base_questions)
+        
         for analysis in [openai_analysis, anthropic_analysis]:
             if analysis:
-                for pattern in patterns:
-                    matches = re.findall(pattern, analysis, re.IGNORECASE)
+                for literal, pattern in FOLLOW_UP_PATTERNS:
+                    start = _search_start(literal, offsets[analysis])
+                    if start is None:
+                        continue
+                    matches = pattern.findall(analysis, start)
                     for match in matches:
-                        question = f"How has {match.strip().lower()} been progressing?"
-                        if question not in questions:
-                            questions.append(question)
+                        questions[f"How has {match.strip().lower()} been progressing?"] = None
         
-        # Combine with base questions
-        all_questions = base_questions + questions
-        return all_questions[:6]
+        return list(questions)[:6]
     
-    def _identify_next_session_focus(self, openai_analysis: str, anthropic_analysis: str, gemini_analysis: str) -> List[str]:
+    def _identify_next_session_focus(self, openai_analysis: str, anthropic_analysis: str, gemini_analysis: str,
+                                     offsets: Dict[str, Dict[str, int]]) -> List[str]:
         """Identify key focus areas for next session"""
         focus_areas = []
         
-        patterns = [
-            r'next.*?session.*?focus\s*(.{50,300}?)(?=\n\n|[A-Z]{2,})',
-            r'continue.*?working.*?on\s*(.{50,200}?)(?=\.|,|\n)',
-            r'areas.*?requiring.*?attention\s*(.{50,200}?)(?=\.|,|\n)'
-        ]
-        
         for analysis in [openai_analysis, anthropic_analysis, gemini_analysis]:
             if analysis:
-                for pattern in patterns:
-                    matches = re.findall(pattern, analysis, re.IGNORECASE | re.DOTALL)
+                for literal, pattern in NEXT_SESSION_PATTERNS:
+                    start = _search_start(literal, offsets[analysis])
+                    if start is None:
+                        continue
+                    matches = pattern.findall(analysis, start)
                     focus_areas.extend(matches)
         
         # Clean and format
         cleaned_focus = []
         for area in focus_areas:
-            clean_area = re.sub(r'\s+', ' ', area.strip())
+            clean_area = WHITESPACE_PATTERN.sub(' ', area.strip())
             if len(clean_area) > 20 and clean_area not in cleaned_focus:
                 cleaned_focus.append(clean_area)
         
         return cleaned_focus[:4]
     
-    def _extract_significant_quotes(self, openai_analysis: str, anthropic_analysis: str) -> List[str]:
+    def _extract_significant_quotes(self, openai_analysis: str, anthropic_analysis: str,
+                                    offsets: Dict[str, Dict[str, int]]) -> List[str]:
         """Extract significant client quotes"""
         quotes = []
         
-        patterns = [
-            r'"([^"]{30,200})"',
-            r'SIGNIFICANT QUOTES\s*(.*?)(?=\n\n|[A-Z]{2,})'
-        ]
-        
         for analysis in [openai_analysis, anthropic_analysis]:
             if analysis:
-                for pattern in patterns:
-                    matches = re.findall(pattern, analysis, re.DOTALL)
+                for header, pattern in QUOTE_PATTERNS:
+                    start = _search_start(header, offsets[analysis])
+                    if start is None:
+                        continue
+                    matches = pattern.findall(analysis, start)
                     for match in matches:
                         if isinstance(match, str) and len(match) > 30:
                             quotes.append(match.strip())
         
         return quotes[:3]
     
-    def _extract_progress_indicators(self, openai_analysis: str, anthropic_analysis: str, gemini_analysis: str) -> List[str]:
+    def _extract_progress_indicators(self, openai_analysis: str, anthropic_analysis: str, gemini_analysis: str,
+                                     offsets: Dict[str, Dict[str, int]]) -> List[str]:
         """Extract progress indicators and improvements"""
         indicators = []
         
-        patterns = [
-            r'progress.*?noted\s*(.{50,200}?)(?=\.|,|\n)',
-            r'improvement.*?in\s*(.{50,200}?)(?=\.|,|\n)',
-            r'positive.*?changes?\s*(.{50,200}?)(?=\.|,|\n)'
-        ]
-        
         for analysis in [openai_analysis, anthropic_analysis, gemini_analysis]:
             if analysis:
-                for pattern in patterns:
-                    matches = re.findall(pattern, analysis, re.IGNORECASE)
+                for literal, pattern in PROGRESS_PATTERNS:
+                    start = _search_start(literal, offsets[analysis])
+                    if start is None:
+                        continue
+                    matches = pattern.findall(analysis, start)
                     indicators.extend(matches)
         
         return [ind.strip() for ind in indicators[:4] if len(ind.strip()) > 20]
@@ -251,94 +481,82 @@ class EmailSummaryService:
         
         subject = f"Therapy Session Summary - {client_name} - {session_date}"
         
-        html_content = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 800px; margin: 0 auto; padding: 20px;">
-                <h1 style="color: #2c5aa0; border-bottom: 2px solid #2c5aa0; padding-bottom: 10px;">
-                    Therapy Session Summary
-                </h1>
-                
-                <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                    <h3 style="margin-top: 0; color: #2c5aa0;">Session Details</h3>
-                    <p><strong>Client:</strong> {client_name}</p>
-                    <p><strong>Date:</strong> {session_date}</p>
-                    <p><strong>Generated:</strong> {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
-                </div>
-                
-                <h3 style="color: #2c5aa0;">Session Overview</h3>
-                <p style="background-color: #f8f9fa; padding: 15px; border-left: 4px solid #2c5aa0;">
-                    {summary_data.get('session_overview', 'No overview available')}
-                </p>
-                
-                <h3 style="color: #2c5aa0;">Key Topics Discussed</h3>
-                <ul>
-        """
+        # Each section is rendered twice, once as HTML and once as text
+        key_topics = summary_data.get('key_topics', [])
+        insights = summary_data.get('therapeutic_insights', [])
+        action_items = summary_data.get('action_items', [])
+        follow_up_questions = summary_data.get('follow_up_questions', [])
+        next_session_focus = summary_data.get('next_session_focus', [])
+        quotes = summary_data.get('significant_quotes', [])
+        progress_indicators = summary_data.get('progress_indicators', [])
+        
+        # One clock read, so the HTML and text parts show the same time
+        header_values = {
+            'client_name': client_name,
+            'session_date': session_date,
+            'generated_at': datetime.now().strftime('%B %d, %Y at %I:%M %p'),
+            'session_overview': summary_data.get('session_overview', 'No overview available'),
+        }
+        
+        html_parts = [HTML_HEADER_TEMPLATE.format_map(header_values)]
         
-        for topic in summary_data.get('key_topics', []):
-            html_content += f"<li>{topic}</li>"
+        html_parts.extend(f"<li>{topic}</li>" for topic in key_topics)
         
-        html_content += """
+        html_parts.append("""
                 </ul>
                 
                 <h3 style="color: #2c5aa0;">Therapeutic Insights</h3>
                 <ul>
-        """
+        """)
         
-        for insight in summary_data.get('therapeutic_insights', []):
-            html_content += f"<li>{insight}</li>"
+        html_parts.extend(f"<li>{insight}</li>" for insight in insights)
         
-        html_content += """
+        html_parts.append("""
                 </ul>
                 
                 <h3 style="color: #2c5aa0;">Action Items & Homework</h3>
                 <ul>
-        """
+        """)
         
-        for action in summary_data.get('action_items', []):
-            html_content += f"<li>{action}</li>"
+        html_parts.extend(f"<li>{action}</li>" for action in action_items)
         
-        html_content += """
+        html_parts.append("""
                 </ul>
                 
                 <h3 style="color: #2c5aa0;">Next Session Focus Questions</h3>
                 <ol>
-        """
+        """)
         
-        for question in summary_data.get('follow_up_questions', []):
-            html_content += f"<li>{question}</li>"
+        html_parts.extend(f"<li>{question}</li>" for question in follow_up_questions)
         
-        html_content += """
+        html_parts.append("""
                 </ol>
                 
                 <h3 style="color: #2c5aa0;">Areas for Next Session</h3>
                 <ul>
-        """
+        """)
         
-        for focus in summary_data.get('next_session_focus', []):
-            html_content += f"<li>{focus}</li>"
+        html_parts.extend(f"<li>{focus}</li>" for focus in next_session_focus)
         
-        if summary_data.get('significant_quotes'):
-            html_content += """
+        if quotes:
+            html_parts.append("""
                 </ul>
                 
                 <h3 style="color: #2c5aa0;">Significant Client Statements</h3>
                 <div style="background-color: #fff3cd; padding: 15px; border-radius: 5px;">
-            """
-            for quote in summary_data.get('significant_quotes', []):
-                html_content += f'<p style="font-style: italic; margin: 10px 0;">"{quote}"</p>'
-            html_content += "</div>"
+            """)
+            html_parts.extend(f'<p style="font-style: italic; margin: 10px 0;">"{quote}"</p>' for quote in quotes)
+            html_parts.append("</div>")
         
-        if summary_data.get('progress_indicators'):
-            html_content += """
+        if progress_indicators:
+            html_parts.append("""
                 <h3 style="color: #2c5aa0;">Progress Indicators</h3>
                 <ul style="color: #28a745;">
-            """
-            for indicator in summary_data.get('progress_indicators', []):
-                html_content += f"<li>{indicator}</li>"
-            html_content += "</ul>"
+            """)
+            html_parts.extend(f"<li>{indicator}</li>" for indicator in progress_indicators)
+            html_parts.append("</ul>")
         
-        html_content += """
+        html_parts.append("""
                 <div style="margin-top: 30px; padding: 15px; background-color: #e7f3ff; border-radius: 5px;">
                     <p style="margin: 0; font-size: 12px; color: #666;">
                         This summary was automatically generated from AI analysis of the therapy session transcript. 
@@ -348,52 +566,38 @@ class EmailSummaryService:
             </div>
         </body>
         </html>
-        """
+        """)
+        
+        html_content = "".join(html_parts)
         
         # Generate plain text version
-        text_content = f"""
-THERAPY SESSION SUMMARY
-
-Client: {client_name}
-Date: {session_date}
-Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
-
-SESSION OVERVIEW
-{summary_data.get('session_overview', 'No overview available')}
-
-KEY TOPICS DISCUSSED
-"""
+        text_parts = [TEXT_HEADER_TEMPLATE.format_map(header_values)]
         
-        for i, topic in enumerate(summary_data.get('key_topics', []), 1):
-            text_content += f"{i}. {topic}\n"
+        text_parts.extend(f"{i}. {topic}\n" for i, topic in enumerate(key_topics, 1))
         
-        text_content += "\nTHERAPEUTIC INSIGHTS\n"
-        for i, insight in enumerate(summary_data.get('therapeutic_insights', []), 1):
-            text_content += f"{i}. {insight}\n"
+        text_parts.append("\nTHERAPEUTIC INSIGHTS\n")
+        text_parts.extend(f"{i}. {insight}\n" for i, insight in enumerate(insights, 1))
         
-        text_content += "\nACTION ITEMS & HOMEWORK\n"
-        for i, action in enumerate(summary_data.get('action_items', []), 1):
-            text_content += f"{i}. {action}\n"
+        text_parts.append("\nACTION ITEMS & HOMEWORK\n")
+        text_parts.extend(f"{i}. {action}\n" for i, action in enumerate(action_items, 1))
         
-        text_content += "\nNEXT SESSION FOCUS QUESTIONS\n"
-        for i, question in enumerate(summary_data.get('follow_up_questions', []), 1):
-            text_content += f"{i}. {question}\n"
+        text_parts.append("\nNEXT SESSION FOCUS QUESTIONS\n")
+        text_parts.extend(f"{i}. {question}\n" for i, question in enumerate(follow_up_questions, 1))
         
-        text_content += "\nAREAS FOR NEXT SESSION\n"
-        for i, focus in enumerate(summary_data.get('next_session_focus', []), 1):
-            text_content += f"{i}. {focus}\n"
+        text_parts.append("\nAREAS FOR NEXT SESSION\n")
+        text_parts.extend(f"{i}. {focus}\n" for i, focus in enumerate(next_session_focus, 1))
         
-        if summary_data.get('significant_quotes'):
-            text_content += "\nSIGNIFICANT CLIENT STATEMENTS\n"
-            for quote in summary_data.get('significant_quotes', []):
-                text_content += f'- "{quote}"\n'
+        if quotes:
+            text_parts.append("\nSIGNIFICANT CLIENT STATEMENTS\n")
+            text_parts.extend(f'- "{quote}"\n' for quote in quotes)
         
-        if summary_data.get('progress_indicators'):
-            text_content += "\nPROGRESS INDICATORS\n"
-            for indicator in summary_data.get('progress_indicators', []):
-                text_content += f"- {indicator}\n"
+        if progress_indicators:
+            text_parts.append("\nPROGRESS INDICATORS\n")
+            text_parts.extend(f"- {indicator}\n" for indicator in progress_indicators)
         
-        text_content += "\n---\nThis summary was automatically generated from AI analysis of the therapy session transcript."
+        text_parts.append("\n---\nThis summary was automatically generated from AI analysis of the therapy session transcript.")
+        
+        text_content = "".join(text_parts)
         
         return {
             'subject': subject,
@@ -403,35 +607,37 @@ KEY TOPICS DISCUSSED
     
     def send_summary_email(self, recipient_email: str, email_content: Dict) -> bool:
         """Send the summary email using SendGrid"""
+        return self.send_summary_emails([(recipient_email, email_content)])[0]
+    
+    def send_summary_emails(self, emails: Iterable[Tuple[str, Dict]]) -> List[bool]:
+        """Send several summary emails over one SendGrid connection
+        
+        emails holds (recipient_email, email_content) pairs; the result says
+        whether each one was sent, in the same order.
+        """
+        emails = list(emails)
+        if not self.sendgrid_api_key:
+            logger.error("SendGrid API key not configured")
+            return [False] * len(emails)
+        
         try:
-            if not self.sendgrid_api_key:
-                logger.error("SendGrid API key not configured")
-                return False
-            
-            from sendgrid import SendGridAPIClient
-            from sendgrid.helpers.mail import Mail, Email, To, Content
-            
-            sg = SendGridAPIClient(self.sendgrid_api_key)
-            
-            message = Mail(
-                from_email=Email("therapynotes@replit.app", "Therapy Notes System"),
-                to_emails=To(recipient_email),
-                subject=email_content['subject']
-            )
-            
-            # Add both HTML and text content
-            message.content = [
-                Content("text/plain", email_content['text_content']),
-                Content("text/html", email_content['html_content'])
-            ]
-            
-            response = sg.send(message)
+            with SendGridSession(self.sendgrid_api_key) as session:
+                return [self._send_one(session, recipient_email, email_content)
+                        for recipient_email, email_content in emails]
+        except Exception as e:
+            logger.error(f"Error opening SendGrid session: {str(e)}")
+            return [False] * len(emails)
+    
+    def _send_one(self, session: SendGridSession, recipient_email: str, email_content: Dict) -> bool:
+        """Send one summary email through an open SendGridSession"""
+        try:
+            status_code = session.send(_mail_payload(recipient_email, email_content))
             
-            if response.status_code in [200, 202]:
+            if status_code in [200, 202]:
                 logger.info(f"Summary email sent successfully to {recipient_email}")
                 return True
             else:
-                logger.error(f"Failed to send email. Status code: {response.status_code}")
+                logger.error(f"Failed to send email. Status code: {status_code}")
                 return False
                 
         except Exception as e:
@@ -440,19 +646,32 @@ KEY TOPICS DISCUSSED
     
     def process_and_send_summary(self, transcript_data: Dict, recipient_email: str) -> bool:
         """Complete process: extract summary and send email"""
-        try:
-            # Extract session summary
-            summary_data = self.extract_session_summary(transcript_data)
-            
-            # Generate email content
-            client_name = transcript_data.get('client_name', 'Unknown Client')
-            session_date = transcript_data.get('session_date', 'Unknown Date')
-            
-            email_content = self.generate_email_content(client_name, session_date, summary_data)
-            
-            # Send email
-            return self.send_summary_email(recipient_email, email_content)
-            
-        except Exception as e:
-            logger.error(f"Error in process_and_send_summary: {str(e)}")
-            return False
\ No newline at end of file
+        return self.process_and_send_summaries([transcript_data], recipient_email)[0]
+    
+    def process_and_send_summaries(self, transcripts: Iterable[Dict], recipient_email: str) -> List[bool]:
+        """Summarize several transcripts and email them over one SendGrid connection
+        
+        The result says whether each transcript's summary was sent, in the
+        same order; one that fails to summarize does not stop the others.
+        """
+        contents = []
+        for transcript_data in transcripts:
+            try:
+                # Extract session summary
+                summary_data = self.extract_session_summary(transcript_data)
+                
+                # Generate email content
+                client_name = transcript_data.get('client_name', 'Unknown Client')
+                session_date = transcript_data.get('session_date', 'Unknown Date')
+                
+                contents.append(self.generate_email_content(client_name, session_date, summary_data))
+                
+            except Exception as e:
+                logger.error(f"Error in process_and_send_summaries: {str(e)}")
+                contents.append(None)
+        
+        # Send emails
+        sent = iter(self.send_summary_emails(
+            (recipient_email, email_content) for email_content in contents if email_content is not None
+        ))
+        return [email_content is not None and next(sent) for email_content in contents]
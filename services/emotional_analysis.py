@@ -2,17 +2,32 @@
 Emotional analysis service for adaptive color therapy and longitudinal visualization
 """
 
+import heapq
 import json
 import logging
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, date
 import re
 
 logger = logging.getLogger(__name__)
 
+# Processes used by analyze_sessions_bulk; keyword scoring is CPU-bound, so
+# threads would only take turns holding the GIL
+BULK_ANALYSIS_WORKERS = int(os.environ.get('EMOTIONAL_ANALYSIS_WORKERS', os.cpu_count() or 1))
+
+# Palettes remembered per instance, keyed on emotion names and intensity only
+PALETTE_CACHE_SIZE = 4096
+
 class EmotionalAnalysis:
     """Service for analyzing emotional content and generating adaptive visualizations"""
     
+    # Keyword alternations shared by every instance with the same keywords,
+    # so constructing a service per request does not recompile them
+    _keyword_patterns: Dict[Tuple[str, ...], re.Pattern] = {}
+    
     def __init__(self):
         # Emotional color mapping based on therapeutic color theory
         self.emotion_colors = {
@@ -30,6 +45,10 @@ class EmotionalAnalysis:
             'content': '#98FB98'     # Pale green - peaceful and restorative
         }
         
+        # The same colors as RGB tuples, parsed once rather than per palette
+        self.emotion_rgb = {emotion: self._hex_to_rgb(color) for emotion, color in self.emotion_colors.items()}
+        self._palette_cache = {}
+        
         # Emotional intensity levels
         self.intensity_levels = {
             'low': 0.3,
@@ -50,12 +69,27 @@ class EmotionalAnalysis:
             'confused': ['confused', 'lost', 'uncertain', 'unclear', 'mixed up', 'puzzled'],
             'content': ['content', 'satisfied', 'fulfilled', 'at peace', 'comfortable', 'stable']
         }
+        
+        # Words that intensify whatever emotion is expressed
+        self.intensity_markers = (
+            'very', 'extremely', 'really', 'so', 'incredibly', 'absolutely',
+            'completely', 'totally', 'entirely', 'utterly', 'deeply'
+        )
+        
+        # Compiled by _get_keyword_pattern on first use
+        self._keyword_pattern = None
     
     def analyze_session_emotions(self, transcript_content: str, ai_analysis: Dict) -> Dict:
         """Analyze emotional content of a therapy session"""
         
+        # Lower-case the transcript once; every scan below reads this copy
+        text_lower = transcript_content.lower()
+        keyword_counts = self._count_keywords(text_lower)
+        intensity_markers_found = self._count_intensity_markers(text_lower)
+        client_turns = self._client_turns(text_lower)
+        
         # Extract emotions from transcript content
-        detected_emotions = self._extract_emotions_from_text(transcript_content)
+        detected_emotions = self._extract_emotions_from_text(transcript_content, keyword_counts, client_turns)
         
         # Extract emotions from AI analysis if available
         ai_emotions = self._extract_emotions_from_ai_analysis(ai_analysis)
@@ -67,7 +101,7 @@ class EmotionalAnalysis:
         primary_emotion, secondary_emotion = self._determine_primary_emotions(combined_emotions)
         
         # Calculate emotional intensity
-        intensity = self._calculate_emotional_intensity(transcript_content, combined_emotions)
+        intensity = self._calculate_emotional_intensity(transcript_content, combined_emotions, intensity_markers_found)
         
         # Generate adaptive color palette
         color_palette = self._generate_adaptive_colors(primary_emotion, secondary_emotion, intensity)
@@ -78,38 +112,96 @@ class EmotionalAnalysis:
             'intensity': intensity,
             'detected_emotions': combined_emotions,
             'color_palette': color_palette,
-            'emotional_keywords_found': self._get_keywords_found(transcript_content),
+            'emotional_keywords_found': self._get_keywords_found(transcript_content, keyword_counts),
             'analysis_timestamp': datetime.now().isoformat()
         }
     
-    def _extract_emotions_from_text(self, text: str) -> Dict[str, float]:
-        """Extract emotions directly from transcript text"""
+    def _count_keywords(self, text_lower: str) -> Dict[str, int]:
+        """Count whole-word occurrences of each emotional keyword in lower-cased text"""
+        return Counter(match.group() for match in self._get_keyword_pattern().finditer(text_lower))
+    
+    def _get_keyword_pattern(self) -> re.Pattern:
+        """Every keyword in one alternation, so a transcript is scanned once rather than once per keyword"""
+        if self._keyword_pattern is None:
+            keywords = tuple(keyword for keywords in self.emotion_keywords.values() for keyword in keywords)
+            pattern = EmotionalAnalysis._keyword_patterns.get(keywords)
+            if pattern is None:
+                pattern = re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + r')\b')
+                EmotionalAnalysis._keyword_patterns[keywords] = pattern
+            self._keyword_pattern = pattern
+        return self._keyword_pattern
+    
+    def _client_turns(self, text_lower: str) -> List[str]:
+        """Split lower-cased text into what follows each "client:" up to the next colon
+        
+        A keyword counts as client speech once per turn it appears in. Text
+        without "client:" has no client turns.
+        """
+        return [turn.partition(':')[0] for turn in text_lower.split('client:')[1:]]
+    
+    def _extract_emotions_from_text(self, text: str, keyword_counts: Optional[Dict[str, int]] = None,
+                                    client_turns: Optional[List[str]] = None) -> Dict[str, float]:
+        """Extract emotions directly from transcript text
+        
+        keyword_counts and client_turns, from _count_keywords and
+        _client_turns, save lowering and rescanning text when the caller
+        already has them.
+        """
         emotions = {}
-        text_lower = text.lower()
+        if keyword_counts is None or client_turns is None:
+            text_lower = text.lower()
+            if keyword_counts is None:
+                keyword_counts = self._count_keywords(text_lower)
+            if client_turns is None:
+                # Weight based on context (client speech vs therapist speech)
+                client_turns = self._client_turns(text_lower)
+        
+        # Text length in hundreds of words, counted once when first needed
+        hundreds_of_words = None
         
         for emotion, keywords in self.emotion_keywords.items():
             score = 0
             for keyword in keywords:
                 # Count occurrences with context weighting
-                occurrences = len(re.findall(r'\b' + re.escape(keyword) + r'\b', text_lower))
+                occurrences = keyword_counts.get(keyword, 0)
                 
-                # Weight based on context (client speech vs therapist speech)
-                if 'client:' in text_lower or 'patient:' in text_lower:
-                    # Give more weight to client expressions
-                    client_context = re.findall(r'client:[^:]*?' + re.escape(keyword), text_lower)
-                    score += len(client_context) * 2
+                # Give more weight to client expressions
+                score += sum(1 for turn in client_turns if keyword in turn) * 2
                 
                 score += occurrences
             
             if score > 0:
                 # Normalize score based on text length
-                emotions[emotion] = min(score / (len(text.split()) / 100), 1.0)
+                if hundreds_of_words is None:
+                    hundreds_of_words = len(text.split()) / 100
+                emotions[emotion] = min(score / hundreds_of_words, 1.0)
         
         return emotions
     
+    def analyze_sessions_bulk(self, sessions: List[Tuple[str, Dict]]) -> List[Dict]:
+        """Analyze many sessions at once, spread over BULK_ANALYSIS_WORKERS processes
+        
+        sessions holds (transcript_content, ai_analysis) pairs; results come
+        back in the same order, exactly as analyze_session_emotions returns them.
+        
+        This forks worker processes, so call it only from batch scripts and
+        scheduled jobs, never from a Flask request handler: forking a
+        threaded server process is unsafe and every request would pay the
+        process start-up cost. Set EMOTIONAL_ANALYSIS_WORKERS=1 to stay in
+        process.
+        """
+        workers = min(BULK_ANALYSIS_WORKERS, len(sessions))
+        if workers <= 1:
+            return [self.analyze_session_emotions(content, ai_analysis) for content, ai_analysis in sessions]
+        
+        contents, ai_analyses = zip(*sessions)
+        chunksize = max(1, len(sessions) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.analyze_session_emotions, contents, ai_analyses, chunksize=chunksize))
+    
     def _extract_emotions_from_ai_analysis(self, ai_analysis: Dict) -> Dict[str, float]:
         """Extract emotional data from AI analysis results"""
-        emotions = {}
+        emotions = Counter()
         
         if not ai_analysis:
             return emotions
@@ -124,20 +216,20 @@ class EmotionalAnalysis:
                 if sentiment:
                     emotion_tone = sentiment.get('emotional_tone', '').lower()
                     if emotion_tone in self.emotion_keywords:
-                        emotions[emotion_tone] = emotions.get(emotion_tone, 0) + 0.7
+                        emotions[emotion_tone] += 0.7
                 
                 # Look for mood assessment
                 mood = provider_data.get('client_mood')
                 if mood and isinstance(mood, (int, float)):
                     # Convert mood scale to emotions
                     if mood <= 3:
-                        emotions['depressed'] = emotions.get('depressed', 0) + 0.8
+                        emotions['depressed'] += 0.8
                     elif mood <= 5:
-                        emotions['neutral'] = emotions.get('neutral', 0) + 0.6
+                        emotions['neutral'] += 0.6
                     elif mood <= 7:
-                        emotions['content'] = emotions.get('content', 0) + 0.7
+                        emotions['content'] += 0.7
                     else:
-                        emotions['hopeful'] = emotions.get('hopeful', 0) + 0.8
+                        emotions['hopeful'] += 0.8
         
         return emotions
     
@@ -160,14 +252,20 @@ class EmotionalAnalysis:
         if not emotions:
             return 'neutral', None
         
-        sorted_emotions = sorted(emotions.items(), key=lambda x: x[1], reverse=True)
+        # Only the top two are needed; nlargest breaks ties like a stable sort
+        top_emotions = heapq.nlargest(2, emotions.items(), key=lambda x: x[1])
         
-        primary = sorted_emotions[0][0]
-        secondary = sorted_emotions[1][0] if len(sorted_emotions) > 1 and sorted_emotions[1][1] > 0.3 else None
+        primary = top_emotions[0][0]
+        secondary = top_emotions[1][0] if len(top_emotions) > 1 and top_emotions[1][1] > 0.3 else None
         
         return primary, secondary
     
-    def _calculate_emotional_intensity(self, text: str, emotions: Dict[str, float]) -> float:
+    def _count_intensity_markers(self, text_lower: str) -> int:
+        """Count how many distinct intensity markers appear in lower-cased text"""
+        return sum(1 for marker in self.intensity_markers if marker in text_lower)
+    
+    def _calculate_emotional_intensity(self, text: str, emotions: Dict[str, float],
+                                       intensity_markers_found: Optional[int] = None) -> float:
         """Calculate overall emotional intensity"""
         if not emotions:
             return 0.3
@@ -176,13 +274,9 @@ class EmotionalAnalysis:
         max_emotion_score = max(emotions.values()) if emotions else 0
         
         # Adjust based on language intensity markers
-        intensity_markers = [
-            'very', 'extremely', 'really', 'so', 'incredibly', 'absolutely',
-            'completely', 'totally', 'entirely', 'utterly', 'deeply'
-        ]
-        
-        text_lower = text.lower()
-        intensity_boost = sum(1 for marker in intensity_markers if marker in text_lower) * 0.1
+        if intensity_markers_found is None:
+            intensity_markers_found = self._count_intensity_markers(text.lower())
+        intensity_boost = intensity_markers_found * 0.1
         
         # Calculate final intensity
         intensity = min(max_emotion_score + intensity_boost, 1.0)
@@ -190,12 +284,26 @@ class EmotionalAnalysis:
         return max(intensity, 0.3)  # Minimum intensity for visibility
     
     def _generate_adaptive_colors(self, primary: str, secondary: Optional[str], intensity: float) -> Dict:
-        """Generate adaptive color palette for therapy UI"""
+        """Generate adaptive color palette for therapy UI
+        
+        A palette depends only on its arguments, so repeats are served from
+        _palette_cache. Callers get their own copy to modify.
+        """
+        key = (primary, secondary, intensity)
+        palette = self._palette_cache.get(key)
+        if palette is None:
+            palette = self._build_palette(primary, secondary, intensity)
+            if len(self._palette_cache) >= PALETTE_CACHE_SIZE:
+                self._palette_cache.clear()
+            self._palette_cache[key] = palette
+        return dict(palette)
+    
+    def _build_palette(self, primary: str, secondary: Optional[str], intensity: float) -> Dict:
+        """Compute the adaptive color palette for an emotion pair and intensity"""
         
-        primary_color = self.emotion_colors.get(primary, self.emotion_colors['neutral'])
+        primary_rgb = self.emotion_rgb.get(primary, self.emotion_rgb['neutral'])
         
         # Adjust color intensity based on emotional intensity
-        primary_rgb = self._hex_to_rgb(primary_color)
         primary_adjusted = self._adjust_color_intensity(primary_rgb, intensity)
         
         # Generate complementary colors
@@ -219,12 +327,16 @@ class EmotionalAnalysis:
     
     def _hex_to_rgb(self, hex_color: str) -> Tuple[int, int, int]:
         """Convert hex color to RGB tuple"""
-        hex_color = hex_color.lstrip('#')
-        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+        value = int(hex_color.lstrip('#'), 16)
+        return (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF
     
     def _rgb_to_hex(self, rgb: Tuple[int, int, int]) -> str:
-        """Convert RGB tuple to hex color"""
-        return '#{:02x}{:02x}{:02x}'.format(*rgb)
+        """Convert RGB tuple to hex color
+        
+        Channels must be 0-255, which every palette helper guarantees.
+        """
+        r, g, b = rgb
+        return '#%06x' % ((r << 16) | (g << 8) | b)
     
     def _adjust_color_intensity(self, rgb: Tuple[int, int, int], intensity: float) -> Tuple[int, int, int]:
         """Adjust color intensity while maintaining therapeutic properties"""
@@ -284,16 +396,14 @@ class EmotionalAnalysis:
         
         return self._rgb_to_hex(adjusted)
     
-    def _get_keywords_found(self, text: str) -> Dict[str, List[str]]:
+    def _get_keywords_found(self, text: str, keyword_counts: Optional[Dict[str, int]] = None) -> Dict[str, List[str]]:
         """Get specific emotional keywords found in text"""
         found = {}
-        text_lower = text.lower()
+        if keyword_counts is None:
+            keyword_counts = self._count_keywords(text.lower())
         
         for emotion, keywords in self.emotion_keywords.items():
-            emotion_keywords = []
-            for keyword in keywords:
-                if re.search(r'\b' + re.escape(keyword) + r'\b', text_lower):
-                    emotion_keywords.append(keyword)
+            emotion_keywords = [keyword for keyword in keywords if keyword_counts.get(keyword)]
             
             if emotion_keywords:
                 found[emotion] = emotion_keywords
@@ -310,34 +420,35 @@ class EmotionalAnalysis:
         sorted_sessions = sorted(client_sessions, key=lambda x: x.get('session_date', ''))
         
         emotional_timeline = []
-        emotion_trends = {}
+        emotion_trends = Counter()
         intensity_timeline = []
         
         for session in sorted_sessions:
             session_emotions = session.get('emotional_analysis', {})
             
             if session_emotions:
+                primary = session_emotions.get('primary_emotion')
+                intensity = session_emotions.get('intensity', 0.5)
                 emotional_timeline.append({
                     'date': session.get('session_date'),
-                    'primary_emotion': session_emotions.get('primary_emotion'),
+                    'primary_emotion': primary,
                     'secondary_emotion': session_emotions.get('secondary_emotion'),
-                    'intensity': session_emotions.get('intensity', 0.5),
+                    'intensity': intensity,
                     'color_palette': session_emotions.get('color_palette', {})
                 })
                 
                 # Track emotion trends
-                primary = session_emotions.get('primary_emotion')
                 if primary:
-                    emotion_trends[primary] = emotion_trends.get(primary, 0) + 1
+                    emotion_trends[primary] += 1
                 
-                intensity_timeline.append(session_emotions.get('intensity', 0.5))
+                intensity_timeline.append(intensity)
         
         # Calculate trends and patterns
-        dominant_emotions = sorted(emotion_trends.items(), key=lambda x: x[1], reverse=True)[:3]
+        dominant_emotions = emotion_trends.most_common(3)
         average_intensity = sum(intensity_timeline) / len(intensity_timeline) if intensity_timeline else 0.5
         
         # Detect emotional patterns
-        patterns = self._detect_emotional_patterns(emotional_timeline)
+        patterns = self._detect_emotional_patterns(intensity_timeline)
         
         return {
             'emotional_timeline': emotional_timeline,
@@ -348,8 +459,8 @@ class EmotionalAnalysis:
             'analysis_generated': datetime.now().isoformat()
         }
     
-    def _detect_emotional_patterns(self, timeline: List[Dict]) -> Dict:
-        """Detect patterns in emotional progression"""
+    def _detect_emotional_patterns(self, intensities: List[float]) -> Dict:
+        """Detect patterns in emotional progression from session intensities in date order"""
         patterns = {
             'improvement_trend': False,
             'stability_periods': [],
@@ -357,12 +468,12 @@ class EmotionalAnalysis:
             'intensity_trend': 'stable'
         }
         
-        if len(timeline) < 3:
+        if len(intensities) < 3:
             return patterns
         
         # Analyze intensity trend
-        recent_intensities = [session.get('intensity', 0.5) for session in timeline[-5:]]
-        early_intensities = [session.get('intensity', 0.5) for session in timeline[:5]]
+        recent_intensities = intensities[-5:]
+        early_intensities = intensities[:5]
         
         if recent_intensities and early_intensities:
             recent_avg = sum(recent_intensities) / len(recent_intensities)
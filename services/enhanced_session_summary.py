@@ -7,9 +7,66 @@ import re
 from typing import Dict, List, Optional
 from datetime import datetime
 from services.ai_service import AIService
+from services.clinical_ai_service import _trim_to_tokens
 
 logger = logging.getLogger(__name__)
 
+# Markdown cleanup patterns, compiled once at import
+MARKDOWN_HEADER_PATTERN = re.compile(r'^#{1,6}\s*', re.MULTILINE)
+MARKDOWN_BOLD_PATTERN = re.compile(r'\*{1,3}([^*]+)\*{1,3}')
+MARKDOWN_ITALIC_PATTERN = re.compile(r'_{1,3}([^_]+)_{1,3}')
+MARKDOWN_BULLET_PATTERN = re.compile(r'^[\s]*[-*+]\s*', re.MULTILINE)
+MARKDOWN_CODE_BLOCK_PATTERN = re.compile(r'```[^`]*```', re.DOTALL)
+MARKDOWN_INLINE_CODE_PATTERN = re.compile(r'`([^`]+)`')
+MARKDOWN_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+BLANK_LINES_PATTERN = re.compile(r'\n\s*\n\s*\n')
+# Runs of spaces and tabs collapse to one space; single spaces already are one
+SPACE_RUN_PATTERN = re.compile(r'[ \t]{2,}|\t')
+
+# Section headers recognised by _extract_sections, mapped to the key their
+# lines are collected under
+SECTION_HEADERS = {
+    'SESSION OVERVIEW': 'session_overview',
+    'KEY INSIGHTS': 'key_insights',
+    'THERAPEUTIC PROGRESS': 'therapeutic_progress',
+    'RISK ASSESSMENT': 'risk_assessment',
+    'SESSION EFFECTIVENESS': 'session_rating',
+    'BRIDGE TO NEXT SESSION': 'bridge_questions',
+}
+
+# Field patterns searched within the extracted sections
+OVERALL_PROGRESS_PATTERN = re.compile(r'Overall Progress:\s*([^\n]+)')
+GOAL_ACHIEVEMENT_PATTERN = re.compile(r'Goal Achievement:\s*([^\n]+)')
+SUICIDE_RISK_PATTERN = re.compile(r'Suicide Risk:\s*([^\n]+)')
+SELF_HARM_RISK_PATTERN = re.compile(r'Self-Harm Risk:\s*([^\n]+)')
+SUBSTANCE_USE_PATTERN = re.compile(r'Substance Use:\s*([^\n]+)')
+RATING_PATTERN = re.compile(r'Rating:\s*([^\n]+)')
+NUMBER_PATTERN = re.compile(r'(\d+)')
+OPENING_QUESTIONS_PATTERN = re.compile(r'Suggested Opening Questions:(.*?)(?=Focus Areas|Reflection Prompts|$)', re.DOTALL)
+FOCUS_AREAS_PATTERN = re.compile(r'Focus Areas for Next Session:(.*?)(?=Reflection Prompts|$)', re.DOTALL)
+REFLECTION_PROMPTS_PATTERN = re.compile(r'Reflection Prompts for Client:(.*?)$', re.DOTALL)
+
+
+def _extract_bullets(text: str, limit: int, strip_quotes: bool = False) -> List[str]:
+    """Return up to limit '•' items from text, without their bullets
+
+    Only lines starting with a bullet count, so a '•' inside a sentence does
+    not. With strip_quotes, quotation marks around each item are removed.
+    """
+    items = []
+    for line in text.split('\n'):
+        line = line.lstrip()
+        if line.startswith('•'):
+            item = line[1:].strip()
+            if strip_quotes:
+                item = item.strip('"')
+            if item:
+                items.append(item)
+                if len(items) == limit:
+                    break
+    return items
+
+
 class EnhancedSessionSummaryService:
     def __init__(self):
         self.ai_service = AIService()
@@ -102,14 +159,14 @@ Reflection Prompts for Client:
 • "How are you feeling about the progress you're making?"
 
 Session Transcript:
-{raw_content[:3000]}
+{_trim_to_tokens(raw_content)}
 """
             
             # Get AI response using OpenAI
             if self.ai_service and self.ai_service.is_openai_available():
                 try:
                     # Use the analyze_transcript method which handles OpenAI calls
-                    ai_result = self.ai_service._analyze_with_openai(prompt[:4000])
+                    ai_result = self.ai_service._analyze_with_openai(prompt)
                     if ai_result and 'content' in ai_result:
                         response = ai_result['content']
                         return self._parse_ai_response(response)
@@ -145,26 +202,35 @@ Session Transcript:
         if not text:
             return ""
         
+        # A pass whose marker characters are not in the text cannot match,
+        # so it is skipped
+        cleaned = text
+        
         # Remove markdown headers
-        cleaned = re.sub(r'^#{1,6}\s*', '', text, flags=re.MULTILINE)
+        if '#' in cleaned:
+            cleaned = MARKDOWN_HEADER_PATTERN.sub('', cleaned)
         
         # Remove bold/italic markdown
-        cleaned = re.sub(r'\*{1,3}([^*]+)\*{1,3}', r'\1', cleaned)
-        cleaned = re.sub(r'_{1,3}([^_]+)_{1,3}', r'\1', cleaned)
+        if '*' in cleaned:
+            cleaned = MARKDOWN_BOLD_PATTERN.sub(r'\1', cleaned)
+        if '_' in cleaned:
+            cleaned = MARKDOWN_ITALIC_PATTERN.sub(r'\1', cleaned)
         
         # Convert markdown bullets to proper bullets
-        cleaned = re.sub(r'^[\s]*[-*+]\s*', '• ', cleaned, flags=re.MULTILINE)
+        cleaned = MARKDOWN_BULLET_PATTERN.sub('• ', cleaned)
         
         # Remove code blocks and inline code
-        cleaned = re.sub(r'```[^`]*```', '', cleaned, flags=re.DOTALL)
-        cleaned = re.sub(r'`([^`]+)`', r'\1', cleaned)
+        if '`' in cleaned:
+            cleaned = MARKDOWN_CODE_BLOCK_PATTERN.sub('', cleaned)
+            cleaned = MARKDOWN_INLINE_CODE_PATTERN.sub(r'\1', cleaned)
         
         # Remove markdown links
-        cleaned = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', cleaned)
+        if '](' in cleaned:
+            cleaned = MARKDOWN_LINK_PATTERN.sub(r'\1', cleaned)
         
         # Clean up extra whitespace while preserving structure
-        cleaned = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned)
-        cleaned = re.sub(r'[ \t]+', ' ', cleaned)
+        cleaned = BLANK_LINES_PATTERN.sub('\n\n', cleaned)
+        cleaned = SPACE_RUN_PATTERN.sub(' ', cleaned)
         
         return cleaned.strip()
     
@@ -172,25 +238,33 @@ Session Transcript:
         """Extract different sections from the formatted text"""
         sections = {}
         
+        # Collect the lines under each header in one pass over the text
+        section_lines = {}
+        current_lines = None
+        for line in text.split('\n'):
+            key = SECTION_HEADERS.get(line.strip().rstrip(':').upper())
+            if key:
+                current_lines = section_lines.setdefault(key, [])
+            elif current_lines is not None:
+                current_lines.append(line)
+        section_text = {key: '\n'.join(lines) for key, lines in section_lines.items()}
+        
         # Extract session overview
-        overview_match = re.search(r'SESSION OVERVIEW\s*\n(.*?)(?=\n[A-Z]|\n\n[A-Z]|$)', text, re.DOTALL | re.IGNORECASE)
-        if overview_match:
-            sections['session_overview'] = overview_match.group(1).strip()
+        overview_text = section_text.get('session_overview', '').strip()
+        if overview_text:
+            sections['session_overview'] = overview_text
         
         # Extract key insights
-        insights_match = re.search(r'KEY INSIGHTS\s*\n(.*?)(?=\n[A-Z]|\n\n[A-Z]|$)', text, re.DOTALL | re.IGNORECASE)
-        if insights_match:
-            insights_text = insights_match.group(1)
-            insights = [line.strip().lstrip('• ') for line in insights_text.split('\n') if line.strip() and '•' in line]
-            sections['key_insights'] = insights[:5]
+        if 'key_insights' in section_text:
+            insights_text = section_text['key_insights']
+            sections['key_insights'] = _extract_bullets(insights_text, 5)
         
         # Extract therapeutic progress
-        progress_match = re.search(r'THERAPEUTIC PROGRESS\s*\n(.*?)(?=\n[A-Z]|\n\n[A-Z]|$)', text, re.DOTALL | re.IGNORECASE)
-        if progress_match:
-            progress_text = progress_match.group(1)
+        if 'therapeutic_progress' in section_text:
+            progress_text = section_text['therapeutic_progress']
             
-            overall_match = re.search(r'Overall Progress:\s*([^\n]+)', progress_text)
-            goal_match = re.search(r'Goal Achievement:\s*([^\n]+)', progress_text)
+            overall_match = OVERALL_PROGRESS_PATTERN.search(progress_text)
+            goal_match = GOAL_ACHIEVEMENT_PATTERN.search(progress_text)
             
             sections['therapeutic_progress'] = {
                 'overall_progress': overall_match.group(1).strip() if overall_match else 'Moderate',
@@ -198,13 +272,12 @@ Session Transcript:
             }
         
         # Extract risk assessment
-        risk_match = re.search(r'RISK ASSESSMENT\s*\n(.*?)(?=\n[A-Z]|\n\n[A-Z]|$)', text, re.DOTALL | re.IGNORECASE)
-        if risk_match:
-            risk_text = risk_match.group(1)
+        if 'risk_assessment' in section_text:
+            risk_text = section_text['risk_assessment']
             
-            suicide_match = re.search(r'Suicide Risk:\s*([^\n]+)', risk_text)
-            harm_match = re.search(r'Self-Harm Risk:\s*([^\n]+)', risk_text)
-            substance_match = re.search(r'Substance Use:\s*([^\n]+)', risk_text)
+            suicide_match = SUICIDE_RISK_PATTERN.search(risk_text)
+            harm_match = SELF_HARM_RISK_PATTERN.search(risk_text)
+            substance_match = SUBSTANCE_USE_PATTERN.search(risk_text)
             
             sections['risk_assessment'] = {
                 'suicide_risk': suicide_match.group(1).strip() if suicide_match else 'Low',
@@ -213,46 +286,45 @@ Session Transcript:
             }
         
         # Extract session rating
-        rating_match = re.search(r'Rating:\s*([^\n]+)', text)
+        rating_match = RATING_PATTERN.search(text)
         if rating_match:
             rating_text = rating_match.group(1).strip()
-            rating_num = re.search(r'(\d+)', rating_text)
+            rating_num = NUMBER_PATTERN.search(rating_text)
             sections['session_rating'] = {
                 'overall_rating': int(rating_num.group(1)) if rating_num else 7,
                 'rating_rationale': 'Session showed positive therapeutic progress and engagement'
             }
         
         # Extract bridge questions
-        bridge_match = re.search(r'BRIDGE TO NEXT SESSION\s*\n(.*?)$', text, re.DOTALL | re.IGNORECASE)
-        if bridge_match:
-            bridge_text = bridge_match.group(1)
+        if 'bridge_questions' in section_text:
+            bridge_text = section_text['bridge_questions']
             
             opening_questions = []
             focus_areas = []
             reflection_prompts = []
             
             # Extract opening questions
-            opening_match = re.search(r'Suggested Opening Questions:(.*?)(?=Focus Areas|Reflection Prompts|$)', bridge_text, re.DOTALL)
+            opening_match = OPENING_QUESTIONS_PATTERN.search(bridge_text)
             if opening_match:
                 opening_text = opening_match.group(1)
-                opening_questions = [line.strip().lstrip('• ').strip('"') for line in opening_text.split('\n') if line.strip() and '•' in line]
+                opening_questions = _extract_bullets(opening_text, 3, strip_quotes=True)
             
             # Extract focus areas
-            focus_match = re.search(r'Focus Areas for Next Session:(.*?)(?=Reflection Prompts|$)', bridge_text, re.DOTALL)
+            focus_match = FOCUS_AREAS_PATTERN.search(bridge_text)
             if focus_match:
                 focus_text = focus_match.group(1)
-                focus_areas = [line.strip().lstrip('• ') for line in focus_text.split('\n') if line.strip() and '•' in line]
+                focus_areas = _extract_bullets(focus_text, 3)
             
             # Extract reflection prompts
-            reflection_match = re.search(r'Reflection Prompts for Client:(.*?)$', bridge_text, re.DOTALL)
+            reflection_match = REFLECTION_PROMPTS_PATTERN.search(bridge_text)
             if reflection_match:
                 reflection_text = reflection_match.group(1)
-                reflection_prompts = [line.strip().lstrip('• ').strip('"') for line in reflection_text.split('\n') if line.strip() and '•' in line]
+                reflection_prompts = _extract_bullets(reflection_text, 3, strip_quotes=True)
             
             sections['bridge_questions'] = {
-                'opening_questions': opening_questions[:3],
-                'next_session_focus': focus_areas[:3],
-                'reflection_prompts': reflection_prompts[:3]
+                'opening_questions': opening_questions,
+                'next_session_focus': focus_areas,
+                'reflection_prompts': reflection_prompts
             }
         
         return sections
@@ -1,39 +1,30 @@
 """
 Enhanced Session Summary Service - Implements specific clinical prompts with rich text formatting
 """
+import asyncio
 import json
 import logging
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from services.clinical_ai_service import _trim_to_tokens
 
 logger = logging.getLogger(__name__)
 
-class EnhancedSessionSummaryService:
-    """Enhanced service for generating clinical session summaries using specific therapeutic prompts"""
-    
-    def __init__(self):
-        self.openai_client = None
-        self._initialize_openai()
-    
-    def _initialize_openai(self):
-        """Initialize OpenAI client"""
-        try:
-            api_key = os.environ.get("OPENAI_API_KEY")
-            if api_key:
-                self.openai_client = OpenAI(api_key=api_key)
-                logger.info("OpenAI client initialized for session summaries")
-        except Exception as e:
-            logger.error(f"Failed to initialize OpenAI client: {e}")
+# Summaries requested from OpenAI at once by generate_session_summaries;
+# OpenAI rate limits well before more would help
+SUMMARY_CONCURRENCY = 10
 
-    def get_clinical_summary_prompt(self, client_name: str) -> str:
-        """Get the specific clinical progress note prompt"""
-        return f"""You are an expert clinical therapist with extensive training in psychotherapy, clinical documentation, and therapeutic modalities including ACT, DBT, Narrative Therapy, and Existentialism. Create a comprehensive clinical progress note that demonstrates clinical sophistication and analytical rigor.
+# System prompt for clinical progress notes. It is the same for every request,
+# so OpenAI can reuse its cached prefix; the client name, session date and
+# transcript go in the user message after it.
+CLINICAL_SUMMARY_PROMPT = """You are an expert clinical therapist with extensive training in psychotherapy, clinical documentation, and therapeutic modalities including ACT, DBT, Narrative Therapy, and Existentialism. Create a comprehensive clinical progress note that demonstrates clinical sophistication and analytical rigor.
 
 **Document Structure Required:**
 
-**Title:** Comprehensive Clinical Progress Note for {client_name}'s Therapy Session on [Date]
+**Title:** Comprehensive Clinical Progress Note for [Client Name]'s Therapy Session on [Date]
 
 **SUBJECTIVE:**
 Provide detailed account of client's reported experiences, feelings, concerns, and significant life events. Include specific quotes expressing feelings, thoughts, and experiences. Note significant life events or stressors mentioned.
@@ -68,62 +59,196 @@ Outline comprehensive management plan with specific therapeutic interventions. N
 - Professional clinical voice
 - Demonstrate therapeutic sophistication and clinical expertise"""
 
+class EnhancedSessionSummaryService:
+    """Enhanced service for generating clinical session summaries using specific therapeutic prompts"""
+    
+    def __init__(self):
+        self.openai_client = None
+        self.openai_api_key = None
+        self._initialize_openai()
+    
+    def _initialize_openai(self):
+        """Initialize OpenAI client"""
+        try:
+            api_key = os.environ.get("OPENAI_API_KEY")
+            if api_key:
+                self.openai_client = OpenAI(api_key=api_key)
+                self.openai_api_key = api_key
+                logger.info("OpenAI client initialized for session summaries")
+        except Exception as e:
+            logger.error(f"Failed to initialize OpenAI client: {e}")
+
+    def get_clinical_summary_prompt(self) -> str:
+        """Get the specific clinical progress note prompt"""
+        return CLINICAL_SUMMARY_PROMPT
+
     def generate_session_summary(self, transcript_data: Dict) -> Dict:
         """Generate enhanced session summary with clinical sophistication"""
         try:
-            client_name = transcript_data.get('client_name', 'Client')
-            session_date = transcript_data.get('session_date', 'Unknown Date')
-            filename = transcript_data.get('original_filename', 'Unknown File')
-            raw_content = transcript_data.get('raw_content', '')
-            
-            # Format session date
-            if isinstance(session_date, str) and session_date != 'Unknown Date':
-                try:
-                    date_obj = datetime.fromisoformat(session_date.replace('Z', '+00:00'))
-                    formatted_date = date_obj.strftime('%B %d, %Y')
-                except:
-                    formatted_date = session_date
-            else:
-                formatted_date = 'Date to be determined'
+            client_name, formatted_date, raw_content = self._summary_inputs(transcript_data)
             
             # Generate clinical summary
             if self.openai_client and raw_content:
                 summary_content = self._generate_openai_clinical_summary(
-                    raw_content[:4000], client_name, formatted_date
+                    _trim_to_tokens(raw_content), client_name, formatted_date
                 )
             else:
                 summary_content = self._generate_structured_fallback_summary(
                     transcript_data, client_name, formatted_date
                 )
             
-            return {
-                'summary_title': f"Comprehensive Clinical Progress Note for {client_name}",
-                'session_date': formatted_date,
-                'filename': filename,
-                'summary_content': summary_content,
-                'generated_at': datetime.now().isoformat(),
-                'format': 'rich_text_clinical',
-                'contains_bridge_questions': True,
-                'clinical_sections': ['subjective', 'objective', 'assessment', 'plan', 'bridge_questions']
-            }
+            return self._summary_result(transcript_data, client_name, formatted_date, summary_content)
             
         except Exception as e:
             logger.error(f"Error generating session summary: {e}")
             return self._generate_error_response(transcript_data, str(e))
 
+    def stream_session_summary(self, transcript_data: Dict) -> Iterator[str]:
+        """Yield the clinical summary content as OpenAI generates it
+
+        For callers that show the note progressively; joined, the chunks are
+        the summary_content generate_session_summary would return. Without
+        OpenAI or transcript content, the structured fallback is yielded as
+        one chunk. If the stream fails before any content arrives the fallback
+        is yielded instead; after that the stream just ends.
+        """
+        client_name, formatted_date, raw_content = self._summary_inputs(transcript_data)
+        if not (self.openai_client and raw_content):
+            yield self._generate_structured_fallback_summary(transcript_data, client_name, formatted_date)
+            return
+
+        content = _trim_to_tokens(raw_content)
+        streamed = False
+        try:
+            stream = self.openai_client.chat.completions.create(
+                **self._clinical_summary_request(content, client_name, formatted_date), stream=True
+            )
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    streamed = True
+                    yield delta
+        except Exception as e:
+            logger.error(f"OpenAI clinical summary stream error: {e}")
+            if not streamed:
+                yield self._generate_structured_fallback_summary({
+                    'client_name': client_name,
+                    'raw_content': content
+                }, client_name, formatted_date)
+
+    def generate_session_summaries(self, transcripts: List[Dict]) -> List[Dict]:
+        """Generate summaries for several transcripts, requesting them from OpenAI concurrently
+
+        For synchronous callers; runs generate_session_summaries_async in a new event loop.
+        """
+        return asyncio.run(self.generate_session_summaries_async(transcripts))
+
+    async def generate_session_summaries_async(self, transcripts: List[Dict]) -> List[Dict]:
+        """Generate summaries for several transcripts, at most SUMMARY_CONCURRENCY OpenAI requests at a time
+
+        Results are in the same order as transcripts. One AsyncOpenAI client is
+        shared by the batch and closed when it finishes.
+        """
+        if not self.openai_api_key:
+            return [self.generate_session_summary(transcript_data) for transcript_data in transcripts]
+
+        semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+
+        async def summarize(client: AsyncOpenAI, transcript_data: Dict) -> Dict:
+            async with semaphore:
+                return await self._generate_session_summary_async(client, transcript_data)
+
+        async with AsyncOpenAI(api_key=self.openai_api_key) as client:
+            return await asyncio.gather(*(summarize(client, transcript_data) for transcript_data in transcripts))
+
+    async def _generate_session_summary_async(self, client: AsyncOpenAI, transcript_data: Dict) -> Dict:
+        """Generate one session summary for generate_session_summaries_async"""
+        try:
+            client_name, formatted_date, raw_content = self._summary_inputs(transcript_data)
+            
+            if raw_content:
+                summary_content = await self._generate_openai_clinical_summary_async(
+                    client, _trim_to_tokens(raw_content), client_name, formatted_date
+                )
+            else:
+                summary_content = self._generate_structured_fallback_summary(
+                    transcript_data, client_name, formatted_date
+                )
+            
+            return self._summary_result(transcript_data, client_name, formatted_date, summary_content)
+            
+        except Exception as e:
+            logger.error(f"Error generating session summary: {e}")
+            return self._generate_error_response(transcript_data, str(e))
+
+    def _summary_inputs(self, transcript_data: Dict):
+        """Return the client name, formatted session date and raw content of a transcript"""
+        client_name = transcript_data.get('client_name', 'Client')
+        session_date = transcript_data.get('session_date', 'Unknown Date')
+        raw_content = transcript_data.get('raw_content', '')
+        
+        # Format session date
+        if isinstance(session_date, str) and session_date != 'Unknown Date':
+            try:
+                date_obj = datetime.fromisoformat(session_date.replace('Z', '+00:00'))
+                formatted_date = date_obj.strftime('%B %d, %Y')
+            except:
+                formatted_date = session_date
+        else:
+            formatted_date = 'Date to be determined'
+        
+        return client_name, formatted_date, raw_content
+
+    def _summary_result(self, transcript_data: Dict, client_name: str, formatted_date: str, summary_content: str) -> Dict:
+        """Wrap generated summary content with the fields callers expect"""
+        return {
+            'summary_title': f"Comprehensive Clinical Progress Note for {client_name}",
+            'session_date': formatted_date,
+            'filename': transcript_data.get('original_filename', 'Unknown File'),
+            'summary_content': summary_content,
+            'generated_at': datetime.now().isoformat(),
+            'format': 'rich_text_clinical',
+            'contains_bridge_questions': True,
+            'clinical_sections': ['subjective', 'objective', 'assessment', 'plan', 'bridge_questions']
+        }
+
+    def _clinical_summary_request(self, content: str, client_name: str, session_date: str) -> Dict:
+        """Build the chat completion arguments for a clinical summary"""
+        return {
+            'model': "gpt-4o",
+            'messages': [
+                {"role": "system", "content": self.get_clinical_summary_prompt()},
+                {"role": "user", "content": (
+                    f"Client name: {client_name}\nSession date: {session_date}\n\n"
+                    f"Analyze this therapy session transcript:\n\n{content}"
+                )}
+            ],
+            'max_tokens': 2500,
+            'temperature': 0.3
+        }
+
     def _generate_openai_clinical_summary(self, content: str, client_name: str, session_date: str) -> str:
         """Generate clinical summary using OpenAI with specific prompts"""
         try:
-            prompt = self.get_clinical_summary_prompt(client_name)
-            
             response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Analyze this therapy session transcript for {client_name} on {session_date}:\n\n{content}"}
-                ],
-                max_tokens=2500,
-                temperature=0.3
+                **self._clinical_summary_request(content, client_name, session_date)
+            )
+            
+            return response.choices[0].message.content
+            
+        except Exception as e:
+            logger.error(f"OpenAI clinical summary error: {e}")
+            return self._generate_structured_fallback_summary({
+                'client_name': client_name,
+                'raw_content': content
+            }, client_name, session_date)
+
+    async def _generate_openai_clinical_summary_async(self, client: AsyncOpenAI, content: str, client_name: str,
+                                                      session_date: str) -> str:
+        """Generate clinical summary using AsyncOpenAI with specific prompts"""
+        try:
+            response = await client.chat.completions.create(
+                **self._clinical_summary_request(content, client_name, session_date)
             )
             
             return response.choices[0].message.content
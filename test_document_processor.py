@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test document text extraction and validation
+"""
+
+import io
+import threading
+import time
+from datetime import datetime
+
+import docx
+import pytest
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+
+from services.document_processor import DocumentProcessor, ProcessedDocument
+
+SAMPLE_TRANSCRIPT = (
+    "Session: 03/05/2024\n"
+    "Therapist: How have your thoughts and feelings been since our last session?\n"
+    "Client: I wanted to share that therapy is helping. \"I slept better,\" I told my partner.\n"
+    "About 20 minutes into the discussion we reviewed coping skills.\n"
+)
+
+
+def test_clean_text():
+    processor = DocumentProcessor()
+    text = "\n--- Page 1 ---\nHello\x00   world\r\n\n\n\nagain\t"
+    assert processor._clean_text(text) == "Hello world again"
+    assert processor._clean_text("") == ""
+    assert processor._clean_text("bell\x07 \u200bzero width, caf\u00e9 \U0001F600") == "bell zero width, caf\u00e9 \U0001F600"
+
+
+def test_extract_session_date():
+    processor = DocumentProcessor()
+    assert processor._extract_session_date(SAMPLE_TRANSCRIPT) == datetime(2024, 3, 5)
+    assert processor._extract_session_date("no dates in here") is None
+
+
+def test_extract_client_identifier():
+    processor = DocumentProcessor()
+    assert processor.extract_client_identifier("", "Sarah_2024-03-05.txt") == "Sarah"
+    assert processor.extract_client_identifier("Client: John Smith\n", "notes.txt") == "John Smith"
+    assert processor.extract_client_identifier("no header", "notes.txt") == "notes"
+
+
+def test_validate_content():
+    processor = DocumentProcessor()
+    result = processor.validate_content(SAMPLE_TRANSCRIPT)
+    assert result['is_valid']
+    assert result['characteristics'] == [
+        "Contains therapy-related terminology",
+        "Contains dialogue structure",
+        "Contains time references",
+    ]
+    assert processor.validate_content("too short")['is_valid'] is False
+
+
+def test_process_txt_encodings():
+    processor = DocumentProcessor()
+    assert processor._process_txt("héllo".encode('utf-8')) == "héllo"
+    assert processor._process_txt("héllo".encode('utf-16')) == "héllo"
+    assert processor._process_txt("héllo".encode('cp1252')) == "héllo"
+
+
+def test_extract_session_date_falls_back_past_header():
+    processor = DocumentProcessor()
+    text = ("small talk about the weather " * 300) + "\nSession: 11/12/2023\n"
+    assert processor._extract_session_date(text) == datetime(2023, 11, 12)
+
+
+def test_count_therapy_keywords():
+    processor = DocumentProcessor()
+    assert processor._count_therapy_keywords("a therapist and a client talk") == 3
+    assert processor._count_therapy_keywords("therapy therapy therapy") == 1
+    assert processor._count_therapy_keywords("nothing relevant") == 0
+    assert processor._count_therapy_keywords("Therapy THERAPY therapy") == 1
+    assert processor._count_therapy_keywords("The THERAPIST asked the Client to Talk") == 3
+    assert processor._process_txt("﻿héllo".encode('utf-8')) == "héllo"
+    assert processor._process_txt("héllo wörld".encode('utf-16-le')) == "héllo wörld"
+    assert processor._process_txt(b"smart \x93quotes\x94") == "smart “quotes”"
+
+
+def make_pdf(page_texts):
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf:
+        for page_text in page_texts:
+            fig = plt.figure()
+            fig.text(0.1, 0.5, page_text)
+            pdf.savefig(fig)
+            plt.close(fig)
+    return buffer.getvalue()
+
+
+def test_process_pdf():
+    processor = DocumentProcessor()
+    text = processor._process_pdf(make_pdf(["Client page one", "Client page two"]))
+    assert text == "\n--- Page 1 ---\nClient page one\n--- Page 2 ---\nClient page two"
+
+
+def test_process_docx():
+    document = docx.Document()
+    document.add_paragraph("Client: Bob")
+    document.add_paragraph("")
+    document.add_paragraph("Therapist: Welcome back")
+    table = document.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "Mood"
+    table.cell(0, 1).text = "Calm"
+    buffer = io.BytesIO()
+    document.save(buffer)
+
+    processor = DocumentProcessor()
+    assert processor._process_docx(buffer.getvalue()) == "Client: Bob\nTherapist: Welcome back\nMood Calm \n"
+
+
+def test_process_pdf_in_parallel_keeps_page_order():
+    page_texts = [f"Client page {n}" for n in range(1, 11)]
+    processor = DocumentProcessor()
+    text = processor._process_pdf(make_pdf(page_texts))
+    assert text == "".join(f"\n--- Page {n} ---\nClient page {n}" for n in range(1, 11))
+
+
+def test_process_document_accepts_file_objects():
+    processor = DocumentProcessor()
+    result = processor.process_document(io.BytesIO(SAMPLE_TRANSCRIPT.encode('utf-16')), "notes.txt")
+    assert result['raw_content'] == SAMPLE_TRANSCRIPT
+    assert result['extracted_date'] == datetime(2024, 3, 5)
+
+    pdf_stream = io.BytesIO(make_pdf([f"Client page {n}" for n in range(1, 10)]))
+    pdf_stream.seek(0, io.SEEK_END)
+    text = processor._process_pdf(pdf_stream)
+    assert text.startswith("\n--- Page 1 ---\nClient page 1")
+    assert text.endswith("\n--- Page 9 ---\nClient page 9")
+
+
+def test_count_dialogue_patterns():
+    processor = DocumentProcessor()
+    assert processor._count_dialogue_patterns("Therapist: hello there") == 1
+    assert processor._count_dialogue_patterns('"Therapist: hello," she said') == 2
+    assert processor._count_dialogue_patterns("T: hi\nC: hey\nP: yo") == 1
+    assert processor._count_dialogue_patterns("no speakers") == 0
+
+
+def test_process_document_computes_fields_lazily(monkeypatch):
+    calls = []
+    original_clean_text = DocumentProcessor._clean_text
+
+    def counting_clean_text(self, text):
+        calls.append(text)
+        return original_clean_text(self, text)
+
+    monkeypatch.setattr(DocumentProcessor, '_clean_text', counting_clean_text)
+    processor = DocumentProcessor()
+    result = processor.process_document(SAMPLE_TRANSCRIPT.encode('utf-8'), "notes.txt")
+
+    assert result['raw_content'] == SAMPLE_TRANSCRIPT
+    assert result.get('character_count') == len(SAMPLE_TRANSCRIPT)
+    assert calls == []
+
+    assert result.get('cleaned_content', '') == original_clean_text(processor, SAMPLE_TRANSCRIPT)
+    assert result['cleaned_content'] is result['cleaned_content']
+    assert len(calls) == 1
+
+    data = result.to_dict()
+    assert list(data) == list(result)
+    assert data['word_count'] == len(SAMPLE_TRANSCRIPT.split())
+    assert data['extracted_date'] == datetime(2024, 3, 5)
+    assert data['file_type'] == 'txt'
+    assert result.get('missing') is None
+
+
+def test_processed_document_lazy_fields_are_thread_safe():
+    calls = []
+
+    def slow_factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return "cleaned"
+
+    document = ProcessedDocument({'raw_content': "text"}, {'cleaned_content': slow_factory})
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(document['cleaned_content'])) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["cleaned"] * 4
+    assert calls == [1]
+    with pytest.raises(KeyError):
+        document['missing']
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Test Dropbox folder listing and file filtering
+"""
+
+import os
+import stat
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import dropbox
+
+from services import dropbox_service
+from services.dropbox_service import DropboxService
+
+
+def make_entry(name, size=100, modified=datetime(2024, 3, 5)):
+    return dropbox.files.FileMetadata(
+        name=name,
+        id=f"id:{name}",
+        client_modified=modified,
+        server_modified=datetime(2024, 3, 5),
+        rev='0123456789abcdef',
+        size=size,
+        path_lower=f"/apps/otter/{name.lower()}",
+        content_hash='a' * 64,
+    )
+
+
+class FakeListResult:
+    def __init__(self, entries, cursor, has_more):
+        self.entries = entries
+        self.cursor = cursor
+        self.has_more = has_more
+
+
+class FakeDropboxClient:
+    """Serves a folder listing split into pages"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.continue_calls = []
+        self.list_options = []
+
+    def files_list_folder(self, path, **options):
+        self.list_options.append(options)
+        return self._page(0)
+
+    def files_list_folder_continue(self, cursor):
+        self.continue_calls.append(cursor)
+        return self._page(int(cursor))
+
+    def _page(self, index):
+        # Past the last page there are no changes and the cursor stays put
+        if index >= len(self.pages):
+            return FakeListResult([], str(index), False)
+        return FakeListResult(self.pages[index], str(index + 1), index + 1 < len(self.pages))
+
+
+def make_service(pages):
+    service = DropboxService.__new__(DropboxService)
+    service.client = FakeDropboxClient(pages)
+    service.monitor_folder = '/apps/otter'
+    service._validated_folder = '/apps/otter'
+    service._account_id = 'dbid:therapist'
+    service._listing_lock = threading.Lock()
+    service._listing_cursor = None
+    service._listing_files = {}
+    service._thread_clients = threading.local()
+    service._metadata_cache = OrderedDict()
+    service._metadata_cache_lock = threading.Lock()
+    return service
+
+
+def test_list_files_filters_entries():
+    folder = dropbox.files.FolderMetadata(name='archive', id='id:archive', path_lower='/apps/otter/archive')
+    service = make_service([[
+        make_entry('Session_2024-03-05.PDF'),
+        make_entry('notes.txt'),
+        make_entry('Supervision notes.docx'),
+        make_entry('audio.mp3'),
+        folder,
+    ]])
+    files = service.list_files()
+    assert [f['name'] for f in files] == ['Session_2024-03-05.PDF', 'notes.txt']
+    assert files[1] == {
+        'name': 'notes.txt',
+        'path': '/apps/otter/notes.txt',
+        'size': 100,
+        'modified': datetime(2024, 3, 5),
+        'content_hash': 'a' * 64,
+    }
+    assert service.client.continue_calls == []
+    assert service.client.list_options == [dropbox_service.LIST_FOLDER_OPTIONS]
+
+
+def test_list_files_follows_pagination_in_order():
+    pages = [[make_entry(f"page{p}_{n}.txt") for n in range(3)] for p in range(4)]
+    service = make_service(pages)
+    files = service.list_files()
+    assert [f['name'] for f in files] == [f"page{p}_{n}.txt" for p in range(4) for n in range(3)]
+    assert service.client.continue_calls == ['1', '2', '3']
+
+
+def test_scan_for_new_files_applies_folder_changes():
+    now = datetime.utcnow()
+    service = make_service([[make_entry('a.txt', modified=now), make_entry('b.txt', modified=now)]])
+    assert [f['name'] for f in service.scan_for_new_files(['/apps/otter/a.txt'])] == ['b.txt']
+    assert service.client.continue_calls == []
+
+    # No changes: one continue call, same result
+    assert [f['name'] for f in service.scan_for_new_files(['/apps/otter/a.txt'])] == ['b.txt']
+    assert service.client.continue_calls == ['1']
+
+    deleted = dropbox.files.DeletedMetadata(name='b.txt', path_lower='/apps/otter/b.txt')
+    service.client.pages.append([deleted, make_entry('c.txt', modified=now), make_entry('c.mp3', modified=now)])
+    assert [f['name'] for f in service.scan_for_new_files(['/apps/otter/a.txt'])] == ['c.txt']
+    assert service.client.continue_calls == ['1', '1']
+
+
+class FakeDownloadResponse:
+    def __init__(self, body):
+        self.body = body
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+
+def test_download_file_to_stream():
+    body = b"Client: Bob\n" * 20000
+    response = FakeDownloadResponse(body)
+    service = make_service([[]])
+    service.client.files_download = lambda path: (None, response)
+    with service.download_file_to_stream('/apps/otter/notes.txt') as stream:
+        assert stream.read() == body
+    assert response.closed
+
+
+def test_scan_for_new_files_relists_after_cursor_reset():
+    now = datetime.utcnow()
+    service = make_service([[make_entry('a.txt', modified=now)]])
+    service.scan_for_new_files([])
+
+    def reset(cursor):
+        raise dropbox.exceptions.ApiError('req', dropbox.files.ListFolderContinueError.reset, None, None)
+
+    service.client.files_list_folder_continue = reset
+    service.client.pages[0].append(make_entry('b.txt', modified=now))
+    assert [f['name'] for f in service.scan_for_new_files([])] == ['a.txt', 'b.txt']
+    assert service._listing_cursor == '1'
+
+
+def test_download_files_uses_worker_clients(monkeypatch):
+    clients = []
+
+    class FakeWorkerClient:
+        def __init__(self):
+            clients.append(self)
+
+        def files_download(self, path):
+            if path.endswith('missing.txt'):
+                raise dropbox.exceptions.ApiError('req', 'not_found', None, None)
+            body = path.encode()
+            return make_entry(path.rsplit('/', 1)[-1], size=len(body)), FakeDownloadResponse(body)
+
+    monkeypatch.setattr(DropboxService, '_build_client', lambda self: FakeWorkerClient())
+    service = make_service([[]])
+    paths = [f"/apps/otter/{n}.txt" for n in range(6)] + ['/apps/otter/missing.txt']
+    results = dict(service.download_files(paths))
+    assert results == {**{p: p.encode() for p in paths[:-1]}, '/apps/otter/missing.txt': None}
+    assert 1 <= len(clients) <= len(paths)
+
+
+def test_download_file_streams_into_buffer():
+    body = b"Therapist: hello\n" * 10000
+    response = FakeDownloadResponse(body)
+    service = make_service([[]])
+    service.client.files_download = lambda path: (make_entry('notes.txt', size=len(body)), response)
+    assert service.download_file('/apps/otter/notes.txt') == body
+    assert response.closed
+
+    service.client.files_download = lambda path: (make_entry('notes.txt', size=len(body) + 1), FakeDownloadResponse(body))
+    assert service.download_file('/apps/otter/notes.txt') is None
+
+    service.client.files_download = lambda path: (make_entry('empty.txt', size=0), FakeDownloadResponse(b""))
+    assert service.download_file('/apps/otter/empty.txt') == b""
+
+
+def test_download_file_with_hash_returns_dropbox_hash():
+    service = make_service([[]])
+    service.client.files_download = lambda path: (make_entry('notes.txt', size=5), FakeDownloadResponse(b"hello"))
+    assert service.download_file_with_hash('/apps/otter/notes.txt') == (b"hello", 'a' * 64)
+
+    service.client.files_download = lambda path: (make_entry('notes.txt', size=6), FakeDownloadResponse(b"hello"))
+    assert service.download_file_with_hash('/apps/otter/notes.txt') is None
+
+
+def test_get_file_metadata_uses_cache(monkeypatch):
+    service = make_service([[make_entry('a.txt')]])
+    lookups = []
+
+    def files_get_metadata(path):
+        lookups.append(path)
+        return make_entry('b.txt', size=7)
+
+    service.client.files_get_metadata = files_get_metadata
+    service.list_files()
+    assert service.get_file_metadata('/Apps/Otter/A.txt')['name'] == 'a.txt'
+    assert service.get_file_metadata('/apps/otter/b.txt')['size'] == 7
+    service.get_file_metadata('/apps/otter/b.txt')['size'] = 0
+    assert service.get_file_metadata('/apps/otter/b.txt')['size'] == 7
+    assert lookups == ['/apps/otter/b.txt']
+
+    monkeypatch.setattr(dropbox_service, 'METADATA_CACHE_TTL_SECONDS', 0)
+    service.list_files()
+    service.get_file_metadata('/apps/otter/a.txt')
+    assert lookups == ['/apps/otter/b.txt', '/apps/otter/a.txt']
+
+
+def test_scan_for_new_files_accepts_any_iterable():
+    now = datetime.utcnow()
+    service = make_service([[make_entry('a.txt', modified=now), make_entry('b.txt', modified=now)]])
+    processed = (path for path in ['/apps/otter/b.txt'])
+    assert [f['name'] for f in service.scan_for_new_files(processed)] == ['a.txt']
+
+
+def test_scan_for_new_files_logs_one_summary(caplog):
+    now = datetime.utcnow()
+    entries = [make_entry(f'new{n:02}.txt', modified=now) for n in range(25)]
+    entries += [make_entry(f'old{n}.txt', modified=datetime(2020, 1, 1)) for n in range(5)]
+    service = make_service([entries])
+    with caplog.at_level('INFO', logger=dropbox_service.__name__):
+        assert len(service.scan_for_new_files(set())) == 25
+    messages = [record.getMessage() for record in caplog.records]
+    assert not any(message.startswith('Skipping old file') for message in messages)
+    assert "Skipped 5 unprocessed files that are too old, too large or unsupported" in messages
+    summary = [message for message in messages if message.startswith("Found 25 new files")]
+    assert len(summary) == 1
+    assert summary[0].endswith("new19.txt, ...")
+
+
+def test_file_extension_matches_splitext():
+    for name in ['notes.TXT', 'archive.tar.gz', '.hidden', '..txt', 'a..pdf', 'no_extension', '', 'trailing.']:
+        assert dropbox_service._file_extension(name) == os.path.splitext(name)[1].lower()
+
+
+def test_folder_changes_replay_after_failed_page():
+    now = datetime.utcnow()
+    service = make_service([[make_entry('a.txt', modified=now)]])
+    service.scan_for_new_files([])
+    service.client.pages.append([make_entry('b.txt', modified=now)])
+    service.client.pages.append([make_entry('c.txt', modified=now)])
+
+    continue_page = service.client.files_list_folder_continue
+
+    def fail_on_second_page(cursor):
+        if cursor == '2':
+            raise ConnectionError("dropped")
+        return continue_page(cursor)
+
+    service.client.files_list_folder_continue = fail_on_second_page
+    assert service.scan_for_new_files([]) == []
+    assert service._listing_cursor == '1'
+
+    service.client.files_list_folder_continue = continue_page
+    assert [f['name'] for f in service.scan_for_new_files([])] == ['a.txt', 'b.txt', 'c.txt']
+
+
+class FakeAccount:
+    account_id = 'dbid:therapist'
+
+    class name:
+        display_name = 'Therapist'
+
+
+class FakeAccountClient:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+
+    def users_get_current_account(self):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_connection_refreshes_changed_token(monkeypatch):
+    service = make_service([[]])
+    service.access_token = 'old-token'
+    service.client = FakeAccountClient(dropbox.exceptions.AuthError('req', 'expired_access_token'))
+    monkeypatch.setenv('DROPBOX_ACCESS_TOKEN', 'new-token')
+    monkeypatch.setattr(DropboxService, '_build_client', lambda self: FakeAccountClient(FakeAccount()))
+    assert service.test_connection() is True
+    assert service.access_token == 'new-token'
+
+
+def test_connection_gives_up_on_unchanged_token(monkeypatch):
+    service = make_service([[]])
+    service.access_token = 'same-token'
+    service.client = FakeAccountClient(dropbox.exceptions.AuthError('req', 'invalid_access_token'))
+    monkeypatch.setenv('DROPBOX_ACCESS_TOKEN', 'same-token')
+    assert service.test_connection() is False
+    assert service.client is None
+
+
+def test_refresh_token_ignores_placeholder(monkeypatch):
+    service = make_service([[]])
+    service.access_token = None
+    monkeypatch.setenv('DROPBOX_ACCESS_TOKEN', 'your_dropbox_token')
+    assert service.refresh_token() is False
+    monkeypatch.setenv('DROPBOX_ACCESS_TOKEN', 'real-token')
+    monkeypatch.setattr(DropboxService, '_build_client', lambda self: FakeAccountClient(FakeAccount()))
+    assert service.refresh_token() is True
+    assert service.access_token == 'real-token'
+
+
+def test_connection_retries_transient_errors(monkeypatch):
+    delays = []
+    monkeypatch.setattr(dropbox_service.time, 'sleep', delays.append)
+    service = make_service([[]])
+    service.client = FakeAccountClient(
+        dropbox.exceptions.InternalServerError('req', 503, ''),
+        dropbox.exceptions.RateLimitError('req', backoff=60),
+        FakeAccount(),
+    )
+    assert service.test_connection() is True
+    assert delays == [1, dropbox_service.CONNECTION_MAX_BACKOFF_SECONDS]
+
+
+def test_validated_folder_is_cached_on_disk(monkeypatch, tmp_path):
+    cache_file = tmp_path / 'cache' / 'folders.json'
+    monkeypatch.setattr(dropbox_service, 'FOLDER_CACHE_FILE', str(cache_file))
+    probes = []
+
+    class ProbeClient:
+        """Only a root-level Otter folder exists; paths match case-insensitively"""
+
+        def users_get_current_account(self):
+            return FakeAccount()
+
+        def files_list_folder(self, path, **options):
+            probes.append(path)
+            if path.lower() != '/otter':
+                raise dropbox.exceptions.ApiError('req', 'not_found', None, None)
+
+        def files_create_folder_v2(self, path):
+            raise dropbox.exceptions.ApiError('req', 'no_write_permission', None, None)
+
+    service = make_service([[]])
+    del service._validated_folder
+    service._account_id = None
+    service.client = ProbeClient()
+    # Case variants of the failed path are not probed again
+    assert service._validate_folder_path('/apps/otter') == '/Otter'
+    assert probes == ['/apps/otter', '/Otter']
+    # Only the owner can read the cache, and no temp files are left behind
+    assert stat.S_IMODE(cache_file.stat().st_mode) == 0o600
+    assert stat.S_IMODE(cache_file.parent.stat().st_mode) == 0o700
+    assert [path.name for path in cache_file.parent.iterdir()] == ['folders.json']
+
+    restarted = make_service([[]])
+    del restarted._validated_folder
+    restarted._account_id = None
+    restarted.client = ProbeClient()
+    assert restarted._validate_folder_path('/apps/otter') == '/Otter'
+    assert probes == ['/apps/otter', '/Otter']
+
+    # Entries belong to one account and monitor folder
+    assert dropbox_service._load_cached_folder('dbid:therapist', '/apps/otter') == '/Otter'
+    assert dropbox_service._load_cached_folder('dbid:someone-else', '/apps/otter') is None
+    assert dropbox_service._load_cached_folder('dbid:therapist', '/apps/other') is None
+
+    restarted._forget_validated_folder()
+    assert dropbox_service._load_cached_folder('dbid:therapist', '/apps/otter') is None
+
+
+def test_is_valid_file():
+    service = make_service([[]])
+    now = datetime(2024, 4, 1, tzinfo=dropbox_service.timezone.utc)
+    recent = {'name': 'a.txt', 'size': 10, 'modified': datetime(2024, 3, 20)}
+    assert service._is_valid_file(recent, now)
+    assert not service._is_valid_file({**recent, 'modified': datetime(2024, 2, 1)}, now)
+    assert not service._is_valid_file({**recent, 'size': dropbox_service.MAX_FILE_SIZE_BYTES + 1}, now)
+    assert not service._is_valid_file({**recent, 'name': 'a.mp3'}, now)
+    assert service._is_valid_file({**recent, 'modified': None})
+
+
+def test_scan_for_new_files_compares_content_hashes():
+    now = datetime.utcnow()
+    entries = [make_entry(name, modified=now) for name in ('same.txt', 'edited.txt', 'copy.txt', 'legacy.txt', 'new.txt')]
+    for entry, content_hash in zip(entries, ('1' * 64, '2' * 64, '1' * 64, '3' * 64, '4' * 64)):
+        entry.content_hash = content_hash
+    service = make_service([entries])
+    processed = {
+        '/apps/otter/same.txt': '1' * 64,
+        '/apps/otter/edited.txt': 'f' * 64,
+        '/apps/otter/legacy.txt': None,
+    }
+    assert [f['name'] for f in service.scan_for_new_files(processed)] == ['edited.txt', 'new.txt']
+
+
+def test_get_files_metadata_lists_each_parent_once():
+    service = make_service([[make_entry('a.txt'), make_entry('b.txt'), make_entry('c.txt')]])
+    lookups = []
+
+    def files_get_metadata(path):
+        lookups.append(path)
+        if path.endswith('missing.txt'):
+            raise dropbox.exceptions.ApiError('req', 'not_found', None, None)
+        return dropbox.files.FileMetadata(
+            name='d.txt', id='id:d', client_modified=datetime(2024, 3, 5), server_modified=datetime(2024, 3, 5),
+            rev='0123456789abcdef', size=5, path_lower='/archive/d.txt', content_hash='d' * 64,
+        )
+
+    service.client.files_get_metadata = files_get_metadata
+    results = service.get_files_metadata([
+        '/Apps/Otter/A.txt', '/apps/otter/c.txt', '/archive/d.txt', '/elsewhere/missing.txt',
+    ])
+    assert sorted(results) == ['/apps/otter/a.txt', '/apps/otter/c.txt', '/archive/d.txt']
+    assert len(service.client.list_options) == 1
+    assert lookups == ['/archive/d.txt', '/elsewhere/missing.txt']
+
+    # Everything found is now cached
+    service.get_files_metadata(['/apps/otter/b.txt', '/archive/d.txt'])
+    assert len(service.client.list_options) == 1
+    assert len(lookups) == 2
+
+
+def test_clients_share_one_http_session():
+    service = make_service([[]])
+    service.access_token = 'token'
+    first, second = service._build_client(), service._build_client()
+    assert first._session is second._session is dropbox_service._SESSION
+    assert first._timeout == dropbox_service.REQUEST_TIMEOUT_SECONDS
+    assert dropbox_service._SESSION.get_adapter("https://content.dropboxapi.com")._pool_maxsize >= dropbox_service.DOWNLOAD_WORKERS
+
+
+class RejectingClient:
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            raise dropbox.exceptions.AuthError('req', 'expired_access_token')
+        return call
+
+
+def test_fast_init_skips_account_check(monkeypatch):
+    monkeypatch.setattr(dropbox_service, 'FAST_INIT', True)
+    monkeypatch.setenv('DROPBOX_ACCESS_TOKEN', 'token')
+    monkeypatch.setattr(DropboxService, '_build_client', lambda self: FakeAccountClient())
+    service = DropboxService()
+    assert isinstance(service.client, FakeAccountClient)
+
+
+def test_fast_init_is_opt_in():
+    assert dropbox_service.FAST_INIT is (os.environ.get('DROPBOX_FAST_INIT') == '1')
+
+
+def test_auth_error_while_validating_monitor_folder_drops_the_client():
+    service = make_service([[]])
+    service._validated_folder = None
+    service._account_id = None
+    service.client = RejectingClient()
+    assert service.scan_for_new_files(set()) == []
+    assert service.client is None
+
+
+def test_auth_errors_drop_the_client():
+    service = make_service([[]])
+    service.client = RejectingClient()
+    assert service.list_files() == []
+    assert service.client is None
+
+    service.client = RejectingClient()
+    assert service.download_file('/apps/otter/a.txt') is None
+    assert service.client is None
+
+    service.client = RejectingClient()
+    assert service.download_file_to_stream('/apps/otter/a.txt') is None
+    assert service.client is None
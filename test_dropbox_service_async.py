@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test asyncio Dropbox listing and concurrent downloads
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import httpx
+
+import services.dropbox_service_async as dropbox_service_async
+from services.dropbox_service_async import AsyncDropboxService
+
+
+def make_json_entry(name, size=100, modified="2024-03-05T10:00:00Z", tag="file"):
+    return {
+        '.tag': tag,
+        'name': name,
+        'path_lower': f"/apps/otter/{name.lower()}",
+        'size': size,
+        'client_modified': modified,
+        'content_hash': f"hash-{name}",
+    }
+
+
+def run_with_service(handler, call):
+    async def run():
+        async with AsyncDropboxService(access_token="token", transport=httpx.MockTransport(handler)) as service:
+            return await call(service)
+    return asyncio.run(run())
+
+
+def test_list_files_follows_cursor_and_filters():
+    requests = []
+    pages = {
+        'list_folder': {
+            'entries': [make_json_entry("Alice.txt"), make_json_entry("archive", tag="folder")],
+            'cursor': "c1", 'has_more': True,
+        },
+        'continue': {
+            'entries': [make_json_entry("Supervision notes.pdf"), make_json_entry("Bob.JPG"), make_json_entry("Carol.docx")],
+            'cursor': "c2", 'has_more': False,
+        },
+    }
+
+    def handler(request):
+        requests.append((request.url.path, json.loads(request.content), request.headers['Authorization']))
+        return httpx.Response(200, json=pages[request.url.path.rsplit('/', 1)[-1]])
+
+    files = run_with_service(handler, lambda service: service.list_files("/apps/otter"))
+
+    assert [f['name'] for f in files] == ["Alice.txt", "Carol.docx"]
+    assert files[0] == {
+        'name': "Alice.txt", 'path': "/apps/otter/alice.txt", 'size': 100,
+        'modified': datetime(2024, 3, 5, 10, 0), 'content_hash': "hash-Alice.txt",
+    }
+    assert requests[0][0] == "/2/files/list_folder"
+    assert requests[0][1]['path'] == "/apps/otter" and requests[0][1]['limit'] == 2000
+    assert requests[1][:2] == ("/2/files/list_folder/continue", {'cursor': "c1"})
+    assert all(auth == "Bearer token" for _, _, auth in requests)
+
+
+def test_list_files_returns_empty_on_api_error():
+    files = run_with_service(lambda request: httpx.Response(409, json={'error_summary': "path/not_found/"}),
+                             lambda service: service.list_files())
+    assert files == []
+
+
+def test_download_files_bounds_concurrency(monkeypatch):
+    monkeypatch.setattr(dropbox_service_async, 'ASYNC_DOWNLOAD_CONCURRENCY', 3)
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        path = json.loads(request.headers['Dropbox-API-Arg'])['path']
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if path == "/missing.txt":
+            return httpx.Response(409, json={'error_summary': "path/not_found/"})
+        return httpx.Response(200, content=path.encode())
+
+    paths = [f"/file{n}.txt" for n in range(8)] + ["/missing.txt", "/café.txt"]
+    contents = run_with_service(handler, lambda service: service.download_files(paths))
+
+    assert list(contents) == paths
+    assert contents["/file0.txt"] == b"/file0.txt"
+    assert contents["/café.txt"] == "/café.txt".encode()
+    assert contents["/missing.txt"] is None
+    assert peak == 3
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test session summary extraction and email formatting
+"""
+
+import json
+
+import requests
+
+from services.email_summary_service import EmailSummaryService, _extract_bullets, _mail_payload
+
+SAMPLE_ANALYSIS = (
+    "SUBJECTIVE\n"
+    "Client reported feeling \"overwhelmed by the constant demands at work and at home lately\" and "
+    "described a pattern of avoidance around difficult conversations with her partner. She noted "
+    "improvement in sleep after using the breathing technique practiced last session.\n\n"
+    "OBJECTIVE\nClient presented with anxious affect and rapid speech.\n\n"
+    "ASSESSMENT\nClient demonstrates increasing insight into the link between workplace stress and "
+    "avoidance at home, with progress noted in use of coping skills such as diaphragmatic breathing.\n\n"
+    "PLAN\n- Continue practicing diaphragmatic breathing twice daily\n"
+)
+
+
+def test_extract_session_summary():
+    service = EmailSummaryService()
+    summary = service.extract_session_summary({'openai_analysis': SAMPLE_ANALYSIS})
+    assert summary['session_overview'].startswith("Client reported feeling")
+    assert "OBJECTIVE" not in summary['session_overview']
+    assert summary['therapeutic_insights'][0].startswith("Client demonstrates increasing insight")
+    assert summary['significant_quotes'] == ["overwhelmed by the constant demands at work and at home lately"]
+    assert summary['follow_up_questions'][0] == "How have you been feeling since our last session?"
+
+
+def test_extract_session_summary_without_analyses():
+    service = EmailSummaryService()
+    summary = service.extract_session_summary({})
+    assert summary['session_overview'] == "Session focused on therapeutic progress and client concerns."
+    assert summary['key_topics'] == []
+    assert summary['significant_quotes'] == []
+
+
+def test_section_patterns_search_from_their_header():
+    service = EmailSummaryService()
+    analysis = (
+        "The significant quotes below were noted.\n"
+        "SIGNIFICANT QUOTES\n"
+        "\"I finally said no to my manager without apologising for it\"\n"
+    )
+    summary = service.extract_session_summary({'openai_analysis': analysis})
+    assert summary['significant_quotes'] == ["I finally said no to my manager without apologising for it"]
+
+    progress = service.extract_session_summary({'gemini_analysis': (
+        "PROGRESS NOTED in sleep quality since the last appointment with fewer night wakings, "
+        "reported by the client."
+    )})
+    assert progress['progress_indicators'] == [
+        "in sleep quality since the last appointment with fewer night wakings"
+    ]
+    assert progress['next_session_focus'] == []
+
+    without_headers = service.extract_session_summary({'openai_analysis': "Client discussed stress " * 20})
+    assert without_headers['session_overview'] == "Session focused on therapeutic progress and client concerns."
+    assert without_headers['therapeutic_insights'] == []
+
+
+def test_extract_bullets():
+    text = (
+        "Themes from a self-care focused conversation with the client\n"
+        "  - Boundary setting with family members over holidays\n"
+        "* Short item\n"
+        "\u2022 Sleep hygiene and evening screen time routines\n"
+        "- Returning to regular exercise after the injury\n"
+    )
+    assert _extract_bullets(text, 150) == [
+        "Boundary setting with family members over holidays",
+        "Sleep hygiene and evening screen time routines",
+        "Returning to regular exercise after the injury",
+    ]
+    assert _extract_bullets(text, 20, limit=2) == ["Boundary setting wit", "Sleep hygiene and ev"]
+
+
+def test_generate_email_content():
+    service = EmailSummaryService()
+    summary = {
+        'session_overview': "Discussed sleep and work stress.",
+        'key_topics': ["Work stress", "Sleep hygiene"],
+        'follow_up_questions': ["How is sleep?"],
+        'significant_quotes': ["I need more rest"],
+    }
+    email = service.generate_email_content("Jane Doe", "March 5, 2024", summary)
+    assert email['subject'] == "Therapy Session Summary - Jane Doe - March 5, 2024"
+    assert "<li>Work stress</li><li>Sleep hygiene</li>" in email['html_content']
+    assert '"I need more rest"</p></div>' in email['html_content']
+    assert "Progress Indicators" not in email['html_content']
+    text = email['text_content']
+    assert "KEY TOPICS DISCUSSED\n1. Work stress\n2. Sleep hygiene\n\nTHERAPEUTIC INSIGHTS\n\nACTION ITEMS" in text
+    assert '\nSIGNIFICANT CLIENT STATEMENTS\n- "I need more rest"\n' in text
+    assert text.endswith("generated from AI analysis of the therapy session transcript.")
+    generated = text.split("Generated: ", 1)[1].split("\n", 1)[0]
+    assert f"<strong>Generated:</strong> {generated}</p>" in email['html_content']
+
+
+class FakeSendGridHTTP:
+    """Stands in for requests.Session, recording each posted payload"""
+
+    instances = []
+
+    def __init__(self):
+        self.headers = {}
+        self.posts = []
+        self.closed = False
+        FakeSendGridHTTP.instances.append(self)
+
+    def post(self, url, data=None, timeout=None):
+        payload = json.loads(data.decode('utf-8'))
+        self.posts.append(payload)
+        status_code = 429 if payload['personalizations'][0]['to'][0]['email'] == 'busy@example.com' else 202
+        return type('Response', (), {'status_code': status_code})()
+
+    def close(self):
+        self.closed = True
+
+
+def test_send_summary_emails_share_one_connection(monkeypatch):
+    FakeSendGridHTTP.instances = []
+    monkeypatch.setattr(requests, 'Session', FakeSendGridHTTP)
+    monkeypatch.setenv('SENDGRID_API_KEY', 'SG.test')
+    service = EmailSummaryService()
+    content = service.generate_email_content("Zoë Doe", "March 5, 2024", {})
+
+    results = service.send_summary_emails([
+        ('a@example.com', content), ('busy@example.com', content), ('b@example.com', content),
+    ])
+
+    assert results == [True, False, True]
+    [http] = FakeSendGridHTTP.instances
+    assert http.closed
+    assert http.headers['Authorization'] == 'Bearer SG.test'
+    assert http.headers['Content-Type'] == 'application/json'
+    assert [post['subject'] for post in http.posts] == [content['subject']] * 3
+    assert http.posts[0]['content'][0] == {'type': 'text/plain', 'value': content['text_content']}
+
+
+def test_process_and_send_summaries(monkeypatch):
+    FakeSendGridHTTP.instances = []
+    monkeypatch.setattr(requests, 'Session', FakeSendGridHTTP)
+    monkeypatch.setenv('SENDGRID_API_KEY', 'SG.test')
+    service = EmailSummaryService()
+
+    results = service.process_and_send_summaries([
+        {'client_name': "Jane Doe", 'session_date': "March 5, 2024", 'openai_analysis': SAMPLE_ANALYSIS},
+        None,
+        {'client_name': "John Roe", 'session_date': "March 6, 2024"},
+    ], 'therapist@example.com')
+
+    assert results == [True, False, True]
+    [http] = FakeSendGridHTTP.instances
+    assert [post['subject'] for post in http.posts] == [
+        "Therapy Session Summary - Jane Doe - March 5, 2024",
+        "Therapy Session Summary - John Roe - March 6, 2024",
+    ]
+
+
+def test_send_summary_email_requires_api_key(monkeypatch):
+    monkeypatch.delenv('SENDGRID_API_KEY', raising=False)
+    service = EmailSummaryService()
+    assert service.send_summary_email('a@example.com', {}) is False
+
+
+def test_mail_payload_matches_sendgrid_helper():
+    from sendgrid.helpers.mail import Content, Email, Mail, To
+
+    content = {'subject': "Summary", 'text_content': "plain", 'html_content': "<p>html</p>"}
+    for recipient in ('a@example.com', 'Jane Doe <jane@example.com>'):
+        message = Mail(from_email=Email("therapynotes@replit.app", "Therapy Notes System"),
+                       to_emails=To(recipient), subject="Summary")
+        message.content = [Content("text/plain", "plain"), Content("text/html", "<p>html</p>")]
+        assert _mail_payload(recipient, content) == message.get()
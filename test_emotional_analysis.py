@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test emotional keyword detection and adaptive colour palettes
+"""
+
+import pytest
+
+from services.emotional_analysis import EmotionalAnalysis
+
+SAMPLE_TRANSCRIPT = (
+    "Therapist: How was the week?\n"
+    "Client: I felt anxious and worried most days, and really low on Sunday.\n"
+    "Therapist: What helped?\n"
+    "Client: Walking helped me feel calm. I can't cope with the workload though, it's too much.\n"
+)
+
+
+def test_keywords_found():
+    analysis = EmotionalAnalysis()
+    found = analysis._get_keywords_found(SAMPLE_TRANSCRIPT)
+    assert found == {
+        'anxious': ['anxious', 'worried'],
+        'depressed': ['low'],
+        'calm': ['calm'],
+        'overwhelmed': ['too much', "can't cope"],
+    }
+    # Whole words only: "allowed" and "following" do not contain "low"
+    assert analysis._get_keywords_found("Client: allowed following") == {}
+
+
+def test_analyze_session_emotions():
+    analysis = EmotionalAnalysis()
+    result = analysis.analyze_session_emotions(SAMPLE_TRANSCRIPT, {})
+    detected = result['detected_emotions']
+    assert detected[result['primary_emotion']] == max(detected.values())
+    assert set(detected) == {'anxious', 'depressed', 'calm', 'overwhelmed'}
+    assert result['emotional_keywords_found'] == analysis._get_keywords_found(SAMPLE_TRANSCRIPT)
+    assert 0.3 <= result['intensity'] <= 1.0
+    assert result['color_palette']['intensity_level'] == result['intensity']
+
+
+def test_analyze_session_emotions_without_keywords():
+    analysis = EmotionalAnalysis()
+    result = analysis.analyze_session_emotions("Client: We talked about the weekend.", None)
+    assert result['primary_emotion'] == 'neutral'
+    assert result['secondary_emotion'] is None
+    assert result['intensity'] == 0.3
+    assert result['emotional_keywords_found'] == {}
+
+
+def test_client_speech_weighs_more():
+    analysis = EmotionalAnalysis()
+    filler = " We went through the plan for next week together." * 60
+    client = analysis._extract_emotions_from_text("Client: I was anxious." + filler)
+    therapist = analysis._extract_emotions_from_text("Therapist: You seemed anxious." + filler)
+    assert client['anxious'] == pytest.approx(3 * therapist['anxious'])
+    assert analysis._client_turns("client: sad. therapist: ok client: calm: fine") == [" sad. therapist", " calm"]
+
+
+def test_generate_adaptive_colors():
+    analysis = EmotionalAnalysis()
+    assert analysis._generate_adaptive_colors('anxious', 'calm', 0.5) == {
+        'primary': '#d08d1d',
+        'primary_light': '#deaf60',
+        'primary_dark': '#a67017',
+        'secondary': '#4A90E2',
+        'background': '#f7eddd',
+        'text': '#2C3E50',
+        'accent': '#2a67cd',
+        'intensity_level': 0.5,
+    }
+    # Unknown emotions fall back to the neutral color
+    palette = analysis._generate_adaptive_colors('unknown', None, 1.0)
+    assert palette['primary'] == '#8e9aaf'
+    assert palette['secondary'] is None
+
+
+def test_analyze_sessions_bulk(monkeypatch):
+    analysis = EmotionalAnalysis()
+    sessions = [
+        (SAMPLE_TRANSCRIPT, {}),
+        ("Client: We talked about the weekend.", None),
+        ("Client: I feel hopeful and calm.", {'openai_analysis': {'client_mood': 8}}),
+    ]
+
+    def without_timestamps(results):
+        return [{k: v for k, v in result.items() if k != 'analysis_timestamp'} for result in results]
+
+    expected = without_timestamps(analysis.analyze_session_emotions(*session) for session in sessions)
+    for workers in (2, 1):
+        monkeypatch.setattr('services.emotional_analysis.BULK_ANALYSIS_WORKERS', workers)
+        assert without_timestamps(analysis.analyze_sessions_bulk(sessions)) == expected
+    assert analysis.analyze_sessions_bulk([]) == []
+
+
+def test_adaptive_colors_are_cached_per_instance():
+    analysis = EmotionalAnalysis()
+    first = analysis._generate_adaptive_colors('calm', None, 0.4)
+    first['primary'] = '#000000'
+    assert analysis._generate_adaptive_colors('calm', None, 0.4)['primary'] != '#000000'
+    assert list(analysis._palette_cache) == [('calm', None, 0.4)]
+
+
+def test_generate_longitudinal_emotional_data():
+    analysis = EmotionalAnalysis()
+    sessions = [
+        {'session_date': f'2024-03-0{day}', 'emotional_analysis': {'primary_emotion': emotion, 'intensity': intensity}}
+        for day, emotion, intensity in (
+            (4, 'anxious', 0.6), (1, 'anxious', 0.9), (2, 'anxious', 0.8), (3, 'calm', 0.8),
+            (6, 'calm', 0.3), (5, 'anxious', 0.5),
+        )
+    ]
+    sessions.append({'session_date': '2024-03-07', 'emotional_analysis': {}})
+
+    data = analysis.generate_longitudinal_emotional_data(sessions)
+    assert [entry['date'] for entry in data['emotional_timeline']] == [f'2024-03-0{day}' for day in range(1, 7)]
+    assert data['dominant_emotions'] == [('anxious', 4), ('calm', 2)]
+    assert data['average_intensity'] == pytest.approx(0.65)
+    assert data['total_sessions'] == 7
+    # The first five sessions average 0.72 and the last five 0.6
+    assert data['emotional_patterns']['intensity_trend'] == 'improving'
+    assert data['emotional_patterns']['improvement_trend'] is True
+
+
+def test_keyword_pattern_shared_between_instances():
+    first, second = EmotionalAnalysis(), EmotionalAnalysis()
+    assert first._get_keyword_pattern() is second._get_keyword_pattern()
+
+    custom = EmotionalAnalysis()
+    custom.emotion_keywords = {'calm': ['grounded']}
+    assert custom._get_keywords_found("Client: I feel grounded and calm.") == {'calm': ['grounded']}
+    assert custom._get_keyword_pattern() is not first._get_keyword_pattern()
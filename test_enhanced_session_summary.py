@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test markdown cleanup and section extraction for enhanced session summaries
+"""
+
+from services.enhanced_session_summary import EnhancedSessionSummaryService, _extract_bullets
+
+AI_RESPONSE = (
+    "## SESSION OVERVIEW\n"
+    "Client explored **work stress** and its effect on sleep.\n\n"
+    "KEY INSIGHTS\n"
+    "- Avoidance of difficult conversations maintains anxiety\n"
+    "* Breathing practice is helping with sleep onset\n\n"
+    "THERAPEUTIC PROGRESS\n"
+    "Overall Progress: Good\n"
+    "Goal Achievement: Significant Progress\n\n"
+    "RISK ASSESSMENT\n"
+    "Suicide Risk: Low\n"
+    "Self-Harm Risk: Low\n"
+    "Substance Use: None reported\n\n"
+    "SESSION EFFECTIVENESS\n"
+    "Rating: 8/10\n\n"
+    "BRIDGE TO NEXT SESSION\n\n"
+    "Suggested Opening Questions:\n"
+    "• \"How did the conversation with your manager go?\"\n\n"
+    "Focus Areas for Next Session:\n"
+    "• Continue `boundary` practice\n"
+    "• Explore [sleep routines](https://example.com)\n\n"
+    "Reflection Prompts for Client:\n"
+    "• \"What felt different this week?\"\n"
+)
+
+
+def test_clean_markdown():
+    service = EnhancedSessionSummaryService()
+    assert service._clean_markdown("") == ""
+    assert service._clean_markdown("# Title\n**bold** and _italic_\n- item\n```\ncode\n```\n`x` [a](b)") == (
+        "Title\nbold and italic\n• item\n\nx a"
+    )
+    assert service._clean_markdown("one\n\n\n\ntwo   three\t\tfour") == "one\n\ntwo three four"
+
+
+def test_parse_ai_response():
+    service = EnhancedSessionSummaryService()
+    summary = service._parse_ai_response(AI_RESPONSE)
+    assert summary['session_overview'] == "Client explored work stress and its effect on sleep."
+    assert summary['key_insights'] == [
+        "Avoidance of difficult conversations maintains anxiety",
+        "Breathing practice is helping with sleep onset",
+    ]
+    assert summary['therapeutic_progress'] == {
+        'overall_progress': "Good",
+        'goal_achievement': "Significant Progress",
+    }
+    assert summary['risk_assessment'] == {
+        'suicide_risk': "Low",
+        'self_harm_risk': "Low",
+        'substance_use': "None reported",
+    }
+    assert summary['session_rating']['overall_rating'] == 8
+    assert summary['bridge_questions'] == {
+        'opening_questions': ["How did the conversation with your manager go?"],
+        'next_session_focus': ["Continue boundary practice", "Explore sleep routines"],
+        'reflection_prompts': ["What felt different this week?"],
+    }
+    assert "**" not in summary['formatted_summary']
+
+
+def test_parse_ai_response_without_sections():
+    service = EnhancedSessionSummaryService()
+    summary = service._parse_ai_response("The client discussed the weekend.")
+    assert summary['session_overview'] == "Session overview not available"
+    assert summary['key_insights'] == []
+    assert summary['bridge_questions'] == {}
+
+
+def test_extract_sections_collects_lines_until_next_header():
+    service = EnhancedSessionSummaryService()
+    sections = service._extract_sections(
+        "Session Overview:\nFirst paragraph.\n\nSecond paragraph.\n"
+        "RISK ASSESSMENT\nSuicide Risk: Moderate\nSelf-Harm Risk: Low\n"
+        "Rating: 6\n"
+    )
+    assert sections['session_overview'] == "First paragraph.\n\nSecond paragraph."
+    assert sections['risk_assessment']['self_harm_risk'] == "Low"
+    assert sections['session_rating']['overall_rating'] == 6
+    assert 'key_insights' not in sections
+
+
+def test_extract_bullets():
+    text = (
+        "Themes • noted in passing\n"
+        "  • \"How did the week go?\"\n"
+        "•\n"
+        "•• Doubled bullet\n"
+        "• Third\n"
+        "• Fourth\n"
+    )
+    assert _extract_bullets(text, 5) == ['"How did the week go?"', "• Doubled bullet", "Third", "Fourth"]
+    assert _extract_bullets(text, 2, strip_quotes=True) == ["How did the week go?", "• Doubled bullet"]
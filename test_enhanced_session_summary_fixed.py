@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test clinical progress note generation, including concurrent batches
+"""
+
+import json
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+import services.clinical_ai_service as clinical_ai_service
+import services.enhanced_session_summary_fixed as enhanced_session_summary_fixed
+from services.enhanced_session_summary_fixed import EnhancedSessionSummaryService
+
+
+def completion(content):
+    return {
+        'id': "chatcmpl-test", 'object': "chat.completion", 'created': 0, 'model': "gpt-4o",
+        'choices': [{'index': 0, 'finish_reason': "stop", 'message': {'role': "assistant", 'content': content}}],
+    }
+
+
+def test_generate_session_summary_without_openai(monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    service = EnhancedSessionSummaryService()
+    summary = service.generate_session_summary({
+        'client_name': "Jane Doe", 'session_date': "2024-03-05", 'original_filename': "jane.txt",
+        'raw_content': "Client: I slept better this week.",
+    })
+    assert summary['summary_title'] == "Comprehensive Clinical Progress Note for Jane Doe"
+    assert summary['session_date'] == "March 05, 2024"
+    assert summary['filename'] == "jane.txt"
+    assert summary['summary_content'].startswith(
+        "Comprehensive Clinical Progress Note for Jane Doe's Therapy Session on March 05, 2024"
+    )
+
+
+def test_generate_session_summaries_shares_one_async_client(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', "sk-test")
+    requests = []
+    clients = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        requests.append(body)
+        user_message = body['messages'][1]['content']
+        if "fails" in user_message:
+            return httpx.Response(400, json={'error': {'message': "bad request"}})
+        return httpx.Response(200, json=completion(f"Note for {user_message.splitlines()[0]}"))
+
+    def mock_async_openai(api_key):
+        client = AsyncOpenAI(api_key=api_key, max_retries=0,
+                             http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        clients.append(client)
+        return client
+
+    monkeypatch.setattr(enhanced_session_summary_fixed, 'AsyncOpenAI', mock_async_openai)
+    service = EnhancedSessionSummaryService()
+
+    summaries = service.generate_session_summaries([
+        {'client_name': "Jane Doe", 'session_date': "2024-03-05", 'raw_content': "Client: I slept better."},
+        {'client_name': "John Roe", 'raw_content': "Client: this request fails."},
+        {'client_name': "Kim Poe", 'raw_content': ""},
+    ])
+
+    assert len(clients) == 1 and clients[0].is_closed()
+    assert len(requests) == 2
+    assert all(body['model'] == "gpt-4o" and body['max_tokens'] == 2500 for body in requests)
+    # The system prompt is identical for every client; per-session details follow it
+    assert requests[0]['messages'][0] == requests[1]['messages'][0]
+    assert "Jane Doe" not in requests[0]['messages'][0]['content']
+    user_messages = sorted(body['messages'][1]['content'] for body in requests)
+    assert user_messages[0].startswith("Client name: Jane Doe\nSession date: March 05, 2024\n\n")
+    assert summaries[0]['summary_content'] == "Note for Client name: Jane Doe"
+    assert summaries[0]['session_date'] == "March 05, 2024"
+    # Failed requests and empty transcripts fall back to the structured note
+    assert summaries[1]['summary_content'].startswith("Comprehensive Clinical Progress Note for John Roe's")
+    assert summaries[2]['summary_title'] == "Comprehensive Clinical Progress Note for Kim Poe"
+
+
+def test_transcript_is_trimmed_to_token_budget(monkeypatch):
+    class WordEncoder:
+        def encode(self, text, disallowed_special=()):
+            return text.split(' ')
+
+        def decode(self, tokens):
+            return ' '.join(tokens)
+
+    class RecordingCompletions:
+        def create(self, **kwargs):
+            self.kwargs = kwargs
+            return type('Response', (), {'choices': [
+                type('Choice', (), {'message': type('Message', (), {'content': "Note"})()})()
+            ]})()
+
+    monkeypatch.setattr(clinical_ai_service, '_get_token_encoder', lambda: WordEncoder())
+    service = EnhancedSessionSummaryService()
+    completions = RecordingCompletions()
+    service.openai_client = type('Client', (), {'chat': type('Chat', (), {'completions': completions})()})()
+
+    words = [f"word{i}" for i in range(clinical_ai_service.TRANSCRIPT_TOKEN_BUDGET + 100)]
+    summary = service.generate_session_summary({'client_name': "Jane Doe", 'raw_content': ' '.join(words)})
+
+    assert summary['summary_content'] == "Note"
+    transcript = completions.kwargs['messages'][1]['content'].split(":\n\n", 1)[1]
+    assert transcript.split(' ') == words[:clinical_ai_service.TRANSCRIPT_TOKEN_BUDGET]
+
+
+def test_stream_session_summary(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', "sk-test")
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        events = [
+            {'id': "chatcmpl-test", 'object': "chat.completion.chunk", 'created': 0, 'model': "gpt-4o",
+             'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]}
+            for piece in ("SUBJECTIVE:\n", "Client reported ", "better sleep.")
+        ]
+        body = ''.join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, content=body.encode(), headers={'content-type': "text/event-stream"})
+
+    service = EnhancedSessionSummaryService()
+    service.openai_client = OpenAI(api_key="sk-test", max_retries=0,
+                                   http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+
+    chunks = list(service.stream_session_summary({'client_name': "Jane Doe", 'raw_content': "Client: I slept better."}))
+
+    assert chunks == ["SUBJECTIVE:\n", "Client reported ", "better sleep."]
+    assert requests[0]['stream'] is True
+    assert requests[0]['model'] == "gpt-4o"
+
+
+def test_stream_session_summary_without_openai(monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    service = EnhancedSessionSummaryService()
+    [chunk] = service.stream_session_summary({'client_name': "Jane Doe", 'raw_content': "Client: hi"})
+    assert chunk.startswith("Comprehensive Clinical Progress Note for Jane Doe's")